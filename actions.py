@@ -3,17 +3,19 @@ actions.py - 完整的攻击和移动系统
 整合了yaoqi_attack.py, advanced_movement.py, speed_calculator.py的功能
 """
 
-import cv2
 import numpy as np
-import mss
 import time
 import random
 import math
 import os
 import re
-from ultralytics import YOLO
+from model_registry import model_registry
 import pygetwindow as gw
 from input_controllers import create_input_controller
+from frame_analysis import FrameAnalyzer
+from pipeline import PerceptionPipeline
+from tracker import ObjectTracker
+from skill_bar import is_region_ready, skill_bar_analyzer, skill_key_regions
 import easyocr
 
 
@@ -526,7 +528,8 @@ class AdvancedMovementController:
 class YaoqiAttacker:
     """妖气攻击器 - 完整的攻击系统"""
     
-    def __init__(self, input_controller=None, yolo_model_path='models/best.pt', yolo_model=None):
+    def __init__(self, input_controller=None, yolo_model_path='models/best.pt', yolo_model=None, frame_analyzer=None,
+                 pipeline=None):
         """初始化攻击器"""
         self.input_controller = input_controller or create_input_controller("默认")
         
@@ -536,12 +539,16 @@ class YaoqiAttacker:
             print("YaoqiAttacker使用共享YOLO模型")
         else:
             # 只有在没有传入模型时才加载新模型
-            try:
-                self.yolo_model = YOLO(yolo_model_path)
+            self.yolo_model = model_registry.acquire("PyTorch", model_path=yolo_model_path)
+            if self.yolo_model is not None:
                 print("YaoqiAttacker独立加载YOLO模型")
-            except Exception as e:
-                print(f"YaoqiAttacker YOLO模型加载失败: {e}")
-                self.yolo_model = None
+            else:
+                print("YaoqiAttacker YOLO模型加载失败")
+        
+        # 帧分析器：同一帧的角色/怪物检测只推理一次（可与自动化器共享）
+        self.frame_analyzer = frame_analyzer or FrameAnalyzer(self.yolo_model)
+        # 感知流水线：自动化器运行时由后台线程持续检测，未启动时同步截图+检测
+        self.pipeline = pipeline or PerceptionPipeline(self.frame_analyzer, tracker=ObjectTracker())
         
         # 技能键位配置
         self.skill_keys = ['a', 's', 'd', 'f', 'g', 'h', 'q', 'w', 'e', 'r', 't', 'y']
@@ -591,60 +598,12 @@ class YaoqiAttacker:
     
     def _get_skill_key_regions(self):
         """获取技能键位区域"""
-        SKILL_AREA_X1, SKILL_AREA_Y1 = 434, 534
-        SKILL_AREA_X2, SKILL_AREA_Y2 = 619, 593
-        
-        skill_width = (SKILL_AREA_X2 - SKILL_AREA_X1) // 6
-        skill_height = (SKILL_AREA_Y2 - SKILL_AREA_Y1) // 2
-        convergence_y = 9
-        convergence_x = 4
-
-        skill_regions = {}
-        row1_keys = ['q', 'w', 'e', 'r', 't', 'y']
-        for i, key in enumerate(row1_keys):
-            x1 = SKILL_AREA_X1 + i * skill_width + convergence_x
-            y1 = SKILL_AREA_Y1 + convergence_y
-            x2 = SKILL_AREA_X1 + (i + 1) * skill_width - convergence_x
-            y2 = SKILL_AREA_Y1 + skill_height - convergence_y
-            skill_regions[key] = (x1, y1, x2, y2)
-
-        row2_keys = ['a', 's', 'd', 'f', 'g', 'h']
-        for i, key in enumerate(row2_keys):
-            x1 = SKILL_AREA_X1 + i * skill_width + convergence_x
-            y1 = SKILL_AREA_Y1 + skill_height + convergence_y
-            x2 = SKILL_AREA_X1 + (i + 1) * skill_width - convergence_x
-            y2 = SKILL_AREA_Y2 - convergence_y
-            skill_regions[key] = (x1, y1, x2, y2)
-
-        return skill_regions
+        return skill_key_regions()
     
     def _is_skill_available(self, frame, region, target_color=(106, 230, 248), tolerance=20):
         """检查技能是否可用"""
         try:
-            x1, y1, x2, y2 = region
-            
-            if x1 < 0 or y1 < 0 or x2 <= x1 or y2 <= y1:
-                return False
-                
-            if y2 > frame.shape[0] or x2 > frame.shape[1]:
-                return False
-                
-            skill_patch = frame[y1:y2, x1:x2]
-            
-            if skill_patch.size == 0:
-                return False
-                
-            lower_color = np.array([max(0, c - tolerance) for c in target_color])
-            upper_color = np.array([min(255, c + tolerance) for c in target_color])
-
-            for py in range(skill_patch.shape[0]):
-                for px in range(skill_patch.shape[1]):
-                    bgr_value = skill_patch[py, px]
-                    if (lower_color[0] <= bgr_value[0] <= upper_color[0] and
-                        lower_color[1] <= bgr_value[1] <= upper_color[1] and
-                        lower_color[2] <= bgr_value[2] <= upper_color[2]):
-                        return True
-            return False
+            return is_region_ready(frame, region, target_color, tolerance)
         except Exception as e:
             print(f"技能检测错误: {e}")
             return False
@@ -653,32 +612,24 @@ class YaoqiAttacker:
         """获取可用技能列表"""
         available_skills = []
         try:
-            for skill_key in self.skill_keys:
-                if skill_key in self.skill_regions:
-                    region = self.skill_regions[skill_key]
-                    if self._is_skill_available(frame, region):
-                        available_skills.append(skill_key)
+            # 技能栏一次 inRange + 积分图得到 12 个技能的就绪掩码
+            available_skills = skill_bar_analyzer.available(frame, self.skill_keys)
             print(f"可用技能: {available_skills}")
         except Exception as e:
             print(f"获取可用技能错误: {e}")
         return available_skills
     
-    def get_positions(self, frame_rgb):
+    def analyze(self, frame_rgb, analysis=None):
+        """获取帧分析结果（已传入则直接复用）"""
+        if analysis is not None:
+            return analysis
+        return self.frame_analyzer.analyze(frame_rgb)
+    
+    def get_positions(self, frame_rgb, analysis=None):
         """获取角色位置"""
-        if self.yolo_model is not None:
-            results = self.yolo_model.predict(frame_rgb)
-            for result in results:
-                for box in result.boxes:
-                    cls_id = int(box.cls)
-                    if cls_id in result.names:
-                        cls_name = result.names[cls_id]
-                        # 兼容Intel模型和YOLO模型的chenghao检测
-                        if cls_name in ['chenghao', 'cheng_hao']:
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            cheng_hao_x = x1 + (x2 - x1) // 2
-                            cheng_hao_y = y1 + (y2 - y1) // 2 + 80
-                            return cheng_hao_x, cheng_hao_y
-        return None, None
+        if self.yolo_model is None and analysis is None:
+            return None, None
+        return self.analyze(frame_rgb, analysis).character_position
     
     def calculate_distance(self, pos1, pos2):
         """计算两点之间的距离"""
@@ -732,11 +683,11 @@ class YaoqiAttacker:
         try:
             print(f"🎯 开始移动到固定点: ({target_x}, {target_y})")
             
-            # 获取当前角色位置
-            with mss.mss() as sct:
-                screenshot = sct.grab(self.region)
-                frame_rgb = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2RGB)
-                current_x, current_y = self.get_positions(frame_rgb)
+            # 获取当前角色位置（共享截图服务）
+            current_x, current_y = None, None
+            perception = self.pipeline.get_result()
+            if perception is not None:
+                current_x, current_y = self.get_positions(None, perception.analysis)
             
             if current_x is not None and current_y is not None:
                 # 使用高级移动控制器的智能移动方法
@@ -764,34 +715,16 @@ class YaoqiAttacker:
             print(f"移动到固定点失败: {e}")
             return False
     
-    def detect_monsters(self, frame_rgb):
+    def detect_monsters(self, frame_rgb, analysis=None):
         """检测怪物"""
-        monsters = []
-        
-        if self.yolo_model is not None:
-            results = self.yolo_model.predict(frame_rgb)
-            for result in results:
-                for box in result.boxes:
-                    cls_id = int(box.cls)
-                    if cls_id in result.names:
-                        cls_name = result.names[cls_id]
-                        if cls_name in ['monster', 'boss']:
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            monster_x = x1 + (x2 - x1) // 2
-                            monster_y = y1 + (y2 - y1) // 2
-                            monsters.append({
-                                'type': cls_name,
-                                'x': monster_x,
-                                'y': monster_y,
-                                'bbox': (x1, y1, x2, y2)
-                            })
-        
-        return monsters
+        if self.yolo_model is None and analysis is None:
+            return []
+        return self.analyze(frame_rgb, analysis).monster_dicts()
 
-    def find_nearest_monster(self, frame_rgb, character_x, character_y):
+    def find_nearest_monster(self, frame_rgb, character_x, character_y, analysis=None):
         """找到最近的怪物"""
         try:
-            monsters = self.detect_monsters(frame_rgb)
+            monsters = self.detect_monsters(frame_rgb, analysis)
             if not monsters:
                 return None
             
@@ -823,16 +756,16 @@ class YaoqiAttacker:
             except Exception as e:
                 print(f"激活窗口失败: {e}")
             
-            # 获取角色位置
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            cheng_hao_x, cheng_hao_y = self.get_positions(frame_rgb)
+            # 获取角色位置（角色和怪物共用同一次检测）
+            analysis = self.frame_analyzer.analyze_bgr(frame)
+            cheng_hao_x, cheng_hao_y = self.get_positions(None, analysis)
             
             if cheng_hao_x is None or cheng_hao_y is None:
                 print("⚠️ 未检测到角色位置，但继续攻击")
                 return self._execute_attack(frame, 500, 300, False)  # 使用默认位置
             
             # 找到最近的怪物
-            nearest_monster = self.find_nearest_monster(frame_rgb, cheng_hao_x, cheng_hao_y)
+            nearest_monster = self.find_nearest_monster(None, cheng_hao_x, cheng_hao_y, analysis)
             
             if nearest_monster:
                 monster_x = nearest_monster['x']
@@ -872,8 +805,7 @@ class YaoqiAttacker:
             except Exception as e:
                 print(f"激活窗口失败: {e}")
             
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            cheng_hao_x, cheng_hao_y = self.get_positions(frame_rgb)
+            cheng_hao_x, cheng_hao_y = self.get_positions(None, self.frame_analyzer.analyze_bgr(frame))
             
             if cheng_hao_x is not None and cheng_hao_y is not None:
                 print(f"🤖 角色位置: ({cheng_hao_x}, {cheng_hao_y})")
@@ -891,91 +823,119 @@ class YaoqiAttacker:
     
     def _execute_attack(self, frame, monster_x, monster_y, is_boss=False):
         """执行攻击循环"""
-        with mss.mss() as sct:
-            attack_rounds = 0
-            max_attack_rounds = 10  # 最大攻击轮数
+        attack_rounds = 0
+        max_attack_rounds = 10  # 最大攻击轮数
+        target_track_id = None  # 目标的跟踪ID，锁定后按ID确认击杀
+        
+        while attack_rounds < max_attack_rounds:
+            attack_rounds += 1
             
-            while attack_rounds < max_attack_rounds:
-                attack_rounds += 1
-                
-                # 获取当前截图
-                screenshot = sct.grab(self.region)
-                frame_bgr = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2BGR)
-                frame_rgb = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2RGB)
-                
-                # 检查角色位置
-                cheng_hao_x, cheng_hao_y = self.get_positions(frame_rgb)
-                if cheng_hao_x is not None and cheng_hao_y is not None:
-                    current_distance = self.calculate_distance((cheng_hao_x, cheng_hao_y), (monster_x, monster_y))
-                    self.face_monster(cheng_hao_x, monster_x)
-                    print(f"🤖 角色位置: ({cheng_hao_x}, {cheng_hao_y}), 距离: {current_distance:.1f}像素")
+            # 获取最新的画面和检测结果（感知流水线）
+            perception = self.pipeline.get_result()
+            if perception is None:
+                print("⚠️ 截图服务未返回画面，跳过本轮攻击")
+                time.sleep(0.5)
+                continue
+            frame_bgr = perception.frame
+            
+            # 重新定位目标（跟踪中的目标直接使用预测位置）
+            target_track_id, monster_x, monster_y = self._reacquire_target(
+                perception.analysis, target_track_id, monster_x, monster_y, is_boss)
+            
+            # 检查角色位置
+            cheng_hao_x, cheng_hao_y = self.get_positions(None, perception.analysis)
+            if cheng_hao_x is not None and cheng_hao_y is not None:
+                current_distance = self.calculate_distance((cheng_hao_x, cheng_hao_y), (monster_x, monster_y))
+                self.face_monster(cheng_hao_x, monster_x)
+                print(f"🤖 角色位置: ({cheng_hao_x}, {cheng_hao_y}), 距离: {current_distance:.1f}像素")
+            else:
+                print("未检测到角色位置，默认攻击")
+            
+            # 获取可用技能
+            available_skills = self.get_available_skills(frame_bgr)
+            
+            # 释放技能
+            skill_count = random.randint(2, 3)
+            print(f"计划释放 {skill_count} 个技能")
+            used_skills = []
+            
+            for i in range(skill_count):
+                if available_skills:
+                    skill_key = random.choice(available_skills)
+                    available_skills.remove(skill_key)
+                    used_skills.append(skill_key)
                 else:
-                    print("未检测到角色位置，默认攻击")
-                
-                # 获取可用技能
-                available_skills = self.get_available_skills(frame_bgr)
+                    skill_key = random.choice(self.skill_keys)
                 
-                # 释放技能
-                skill_count = random.randint(2, 3)
-                print(f"计划释放 {skill_count} 个技能")
-                used_skills = []
+                key_code = self.skill_key_map[skill_key]
+                press_duration = random.uniform(0.1311, 0.1511)
+                sleep_duration = random.uniform(0.1011, 0.1511)
                 
-                for i in range(skill_count):
-                    if available_skills:
-                        skill_key = random.choice(available_skills)
-                        available_skills.remove(skill_key)
-                        used_skills.append(skill_key)
-                    else:
-                        skill_key = random.choice(self.skill_keys)
-                    
-                    key_code = self.skill_key_map[skill_key]
-                    press_duration = random.uniform(0.1311, 0.1511)
-                    sleep_duration = random.uniform(0.1011, 0.1511)
-                    
-                    print(f"⚔️ 释放技能 {skill_key} (第 {i+1}/{skill_count})")
-                    self.input_controller.press_key(key_code, press_duration)
-                    time.sleep(sleep_duration)
-                
-                # 普通攻击
-                x_press_duration = random.uniform(0.01011, 0.03011)
-                x_sleep_duration = random.uniform(0.01011, 0.03011)
-                print("🗡️ 执行普通攻击 X")
-                self.input_controller.press_key(88, x_press_duration)  # X键
-                time.sleep(x_sleep_duration)
-                
-                # 检查怪物是否还存在
-                current_frame_rgb = cv2.cvtColor(np.array(sct.grab(self.region)), cv2.COLOR_BGRA2RGB)
-                monster_still_exists = self._check_monster_exists(current_frame_rgb, monster_x, monster_y, is_boss)
-                
-                if not monster_still_exists:
-                    print("怪物已消失，停止攻击")
-                    return True
-                
-                # 短暂休息
+                print(f"⚔️ 释放技能 {skill_key} (第 {i+1}/{skill_count})")
+                self.input_controller.press_key(key_code, press_duration)
+                time.sleep(sleep_duration)
+            
+            # 普通攻击
+            x_press_duration = random.uniform(0.01011, 0.03011)
+            x_sleep_duration = random.uniform(0.01011, 0.03011)
+            print("🗡️ 执行普通攻击 X")
+            self.input_controller.press_key(88, x_press_duration)  # X键
+            time.sleep(x_sleep_duration)
+            attack_end_time = time.time()
+            
+            # 检查怪物是否还存在（取攻击结束之后的新画面）
+            current_perception = self.pipeline.get_result(after=attack_end_time)
+            if current_perception is None:
+                print("⚠️ 截图服务未返回攻击后的画面，继续攻击")
                 time.sleep(0.5)
+                continue
+            if target_track_id is not None and self.pipeline.tracker is not None:
+                monster_still_exists = not self._target_lost(current_perception.analysis, target_track_id)
+            else:
+                monster_still_exists = self._check_monster_exists(None, monster_x, monster_y, is_boss,
+                                                                  current_perception.analysis)
             
-            print(f"攻击轮数达到上限({max_attack_rounds})，停止攻击")
-            return False
-    
-    def _check_monster_exists(self, frame_rgb, monster_x, monster_y, is_boss=False):
-        """检查怪物是否还存在"""
-        if self.yolo_model is not None:
-            results = self.yolo_model.predict(frame_rgb)
-            monster_type = 'boss' if is_boss else 'monster'
-            
-            for result in results:
-                for box in result.boxes:
-                    cls_id = int(box.cls)
-                    if cls_id in result.names and result.names[cls_id] == monster_type:
-                        mx1, my1, mx2, my2 = map(int, box.xyxy[0])
-                        detected_x = mx1 + (mx2 - mx1) // 2
-                        detected_y = my1 + (my2 - my1) // 2
-                        
-                        # 检查是否是同一个怪物（位置相近）
-                        if abs(monster_x - detected_x) < 100 and abs(monster_y - detected_y) < 100:
-                            return True
+            if not monster_still_exists:
+                print("怪物已消失，停止攻击")
+                return True
+            
+            # 短暂休息
+            time.sleep(0.5)
         
+        print(f"攻击轮数达到上限({max_attack_rounds})，停止攻击")
         return False
+    
+    def _reacquire_target(self, analysis, track_id, monster_x, monster_y, is_boss=False):
+        """根据跟踪ID或位置重新定位目标，返回 (跟踪ID, x, y)"""
+        tracker = self.pipeline.tracker
+        if tracker is not None and track_id is not None:
+            track = tracker.get_track(track_id)
+            if track is not None:
+                return track_id, track.x, track.y
+        monster_type = 'boss' if is_boss else 'monster'
+        detection = analysis.find_near(monster_type, monster_x, monster_y, 100)
+        if detection is not None:
+            return detection.track_id, detection.x, detection.y
+        return track_id, monster_x, monster_y
+    
+    def _target_lost(self, analysis, track_id):
+        """跟踪目标是否已击杀
+
+        检测器实际运行的帧里没有匹配到该轨迹即视为击杀，不等轨迹累计 max_misses 次后被删除；
+        预测帧按轨迹状态判断（已删除或最近一次检测未匹配）
+        """
+        if not analysis.predicted and all(det.track_id != track_id for det in analysis.enemies):
+            return True
+        track = self.pipeline.tracker.get_track(track_id)
+        return track is None or track.misses > 0
+    
+    def _check_monster_exists(self, frame_rgb, monster_x, monster_y, is_boss=False, analysis=None):
+        """检查怪物是否还存在"""
+        if self.yolo_model is None and analysis is None:
+            return False
+        monster_type = 'boss' if is_boss else 'monster'
+        # 检查是否是同一个怪物（位置相近）
+        return self.analyze(frame_rgb, analysis).find_near(monster_type, monster_x, monster_y, 100) is not None
 
 
 if __name__ == "__main__":
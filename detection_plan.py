@@ -0,0 +1,125 @@
+"""
+detection_plan.py - 按状态制定每帧的检测计划
+自动化流程处于不同状态（城镇导航、副本战斗、地图锁定……）时能发生的事件不同，
+每个状态声明需要运行哪些检测、每隔几帧运行一次、在哪个区域内运行；
+规划器根据当前状态生成本帧的检测计划，不可能发生的事件不再花时间检测。
+"""
+
+import threading
+
+
+class DetectorSpec:
+    """状态中的一项检测声明"""
+
+    __slots__ = ('name', 'every', 'roi')
+
+    def __init__(self, name, every=1, roi=None):
+        """
+        Args:
+            name: 检测项名称（由调用方解释，如 'fanpai'、'yolo'、模板名称）
+            every: 每隔几帧运行一次，1 为每帧
+            roi: 检测区域 (x1, y1, x2, y2)，None 为整张画面
+        """
+        self.name = name
+        self.every = max(1, every)
+        self.roi = tuple(roi) if roi else None
+
+    def __repr__(self):
+        return f"DetectorSpec({self.name}, every={self.every}, roi={self.roi})"
+
+
+class DetectionPlan:
+    """一帧的检测计划"""
+
+    __slots__ = ('state', 'frame_index', '_specs')
+
+    def __init__(self, state, frame_index, specs):
+        self.state = state
+        self.frame_index = frame_index
+        self._specs = {spec.name: spec for spec in specs}
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    @property
+    def names(self):
+        return list(self._specs)
+
+    def roi(self, name):
+        """检测项的区域，未声明返回None"""
+        spec = self._specs.get(name)
+        return spec.roi if spec else None
+
+    def crop(self, name, frame):
+        """按检测项的区域裁剪画面
+
+        Returns:
+            tuple: (区域画面, (x偏移, y偏移))
+        """
+        roi = self.roi(name)
+        if roi is None:
+            return frame, (0, 0)
+        x1, y1, x2, y2 = roi
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def __repr__(self):
+        return f"DetectionPlan({self.state}, #{self.frame_index}, {self.names})"
+
+
+class DetectionPlanner:
+    """检测规划器 - 维护当前状态，按状态声明生成每帧的检测计划"""
+
+    def __init__(self, states, initial_state):
+        """初始化检测规划器
+
+        Args:
+            states: {状态名称: [DetectorSpec, ...]}
+            initial_state: 初始状态
+        """
+        if initial_state not in states:
+            raise ValueError(f"未知的初始状态: {initial_state}")
+        self.states = states
+        self.state = initial_state
+        self._frame_index = 0  # 进入当前状态后的帧序号
+        self._lock = threading.Lock()
+        self.planned_count = {}  # 检测项 -> 计划运行次数
+        self.skipped_count = {}  # 检测项 -> 因频率跳过的次数
+
+    def transition(self, state):
+        """切换状态（状态不变时无操作），进入新状态的第一帧运行该状态的全部检测"""
+        if state not in self.states:
+            raise ValueError(f"未知的检测状态: {state}")
+        with self._lock:
+            if state == self.state:
+                return
+            print(f"🧭 检测状态: {self.state} -> {state}")
+            self.state = state
+            self._frame_index = 0
+
+    def declares(self, name):
+        """当前状态是否声明了该检测项（不考虑频率）"""
+        with self._lock:
+            return any(spec.name == name for spec in self.states[self.state])
+
+    def plan(self):
+        """生成本帧的检测计划"""
+        with self._lock:
+            frame_index = self._frame_index
+            self._frame_index += 1
+            specs = []
+            for spec in self.states[self.state]:
+                if frame_index % spec.every == 0:
+                    specs.append(spec)
+                    self.planned_count[spec.name] = self.planned_count.get(spec.name, 0) + 1
+                else:
+                    self.skipped_count[spec.name] = self.skipped_count.get(spec.name, 0) + 1
+            return DetectionPlan(self.state, frame_index, specs)
+
+    def get_stats(self):
+        """获取各检测项的运行/跳过次数"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'planned': dict(self.planned_count),
+                'skipped': dict(self.skipped_count),
+            }
@@ -0,0 +1,477 @@
+"""
+detectors.py - 目标检测后端
+统一的检测接口 detect(frame_rgb) -> DetectionArrays，支持：
+- PyTorch：ultralytics 加载 models/best.pt
+- OpenVINO：直接加载 models/best.xml，自行完成 letterbox、解码和NMS
+- ONNX Runtime：加载 models/best.onnx（由 model_tools.py export-onnx 导出），线程数可调
+"""
+
+import ast
+import os
+import threading
+
+import cv2
+import numpy as np
+
+
+# 不同模型的类别名称统一映射
+CLASS_NAME_ALIASES = {
+    'cheng_hao': 'chenghao',
+}
+
+# models/best.xml 中记录的类别顺序（IR 缺少 labels 信息时使用）
+DEFAULT_CLASS_NAMES = [
+    'monster', 'cheng_hao', 'door', 'material_yu_rong', 'money', 'zhuang_bei',
+    'material_zuan_shi_ying_bi', 'boss', 'material_hai_lan_bao_shi', 'bi_xie_yu',
+    'wei_yang_ji_tan', 'material_he_lun_huang_di_de_ying_zhang', 'material_sheng_xiu_de_tie_pian',
+    'material_po_jiu_de_pi_ge', 'material_feng_hua_de_sui_gu', 'material_hui_zhang',
+    'material_zui_xia_ji_ying_hua_ji', 'material_hei_yao_shi', 'material_zhong_mo_zhi_heng',
+    'material_heng_ji_yan_jiu_cai_liao_li_he', 'shen_yuan_dong',
+]
+
+
+class Detection:
+    """单个检测目标"""
+
+    __slots__ = ('cls_name', 'confidence', 'bbox', 'x', 'y', 'track_id')
+
+    def __init__(self, cls_name, confidence, bbox):
+        x1, y1, x2, y2 = bbox
+        self.cls_name = CLASS_NAME_ALIASES.get(cls_name, cls_name)
+        self.confidence = confidence
+        self.bbox = (x1, y1, x2, y2)
+        self.x = x1 + (x2 - x1) // 2
+        self.y = y1 + (y2 - y1) // 2
+        self.track_id = None  # 由 tracker.ObjectTracker 分配
+
+    def to_dict(self):
+        """转换为旧接口使用的字典格式 {'type', 'x', 'y', 'bbox'}"""
+        return {
+            'type': self.cls_name,
+            'x': self.x,
+            'y': self.y,
+            'bbox': self.bbox
+        }
+
+    def __repr__(self):
+        return f"Detection({self.cls_name}, {self.confidence:.2f}, {self.bbox})"
+
+
+class DetectionArrays:
+    """一帧检测结果的连续数组表示
+
+    xyxy: (N, 4) int32，cls: (N,) uint8，conf: (N,) float32，按置信度从高到低；
+    names: 类别名称查找表（已做别名映射），cls 中的值是它的下标
+    """
+
+    __slots__ = ('xyxy', 'cls', 'conf', 'names', '_name_to_id')
+
+    def __init__(self, xyxy, cls, conf, names):
+        self.xyxy = np.ascontiguousarray(xyxy, dtype=np.int32).reshape(-1, 4)
+        self.cls = np.ascontiguousarray(cls, dtype=np.uint8).reshape(-1)
+        self.conf = np.ascontiguousarray(conf, dtype=np.float32).reshape(-1)
+        self.names = tuple(CLASS_NAME_ALIASES.get(name, name) for name in names)
+        self._name_to_id = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def empty(cls, names=()):
+        return cls(np.empty((0, 4), np.int32), np.empty(0, np.uint8), np.empty(0, np.float32), names)
+
+    @classmethod
+    def from_ultralytics(cls, results):
+        """把 ultralytics 结果一次性转换为数组（每个结果只做一次张量拷贝）"""
+        xyxy, cls_ids, conf = [], [], []
+        names = ()
+        for result in results:
+            names = tuple(result.names[i] for i in range(max(result.names) + 1)) if result.names else names
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                continue
+            data = boxes.data.cpu().numpy()  # (N, 6): x1, y1, x2, y2, [track_id,] conf, cls
+            xyxy.append(data[:, :4])
+            conf.append(data[:, -2])
+            cls_ids.append(data[:, -1])
+        if not xyxy:
+            return cls.empty(names)
+        return cls(np.concatenate(xyxy), np.concatenate(cls_ids), np.concatenate(conf), names)
+
+    @classmethod
+    def from_detections(cls, detections):
+        """由 Detection 列表构建（如跟踪预测结果）"""
+        names = tuple(dict.fromkeys(det.cls_name for det in detections))
+        name_to_id = {name: i for i, name in enumerate(names)}
+        return cls([det.bbox for det in detections], [name_to_id[det.cls_name] for det in detections],
+                   [det.confidence for det in detections], names)
+
+    def __len__(self):
+        return len(self.cls)
+
+    def mask(self, *cls_names):
+        """指定类别的布尔掩码"""
+        ids = [self._name_to_id[name] for name in cls_names if name in self._name_to_id]
+        if not ids:
+            return np.zeros(len(self.cls), dtype=bool)
+        return np.isin(self.cls, ids)
+
+    def centers(self):
+        """中心点 (N, 2) int32，与 Detection.x/y 的取整方式一致"""
+        return self.xyxy[:, :2] + (self.xyxy[:, 2:] - self.xyxy[:, :2]) // 2
+
+    def to_detections(self):
+        """转换为 Detection 列表（按置信度从高到低）"""
+        names = self.names
+        return [Detection(names[c] if c < len(names) else str(c), s, tuple(b))
+                for b, c, s in zip(self.xyxy.tolist(), self.cls.tolist(), self.conf.tolist())]
+
+    def __repr__(self):
+        return f"DetectionArrays({len(self)} boxes)"
+
+
+def letterbox(image, new_shape=(640, 640), pad_value=114):
+    """等比缩放并居中填充到 new_shape (宽, 高)
+
+    Returns:
+        tuple: (填充后的图像, 缩放比例, (左侧填充, 顶部填充))
+    """
+    height, width = image.shape[:2]
+    new_w, new_h = new_shape
+    ratio = min(new_w / width, new_h / height)
+    resized_w, resized_h = int(round(width * ratio)), int(round(height * ratio))
+    if (resized_w, resized_h) != (width, height):
+        image = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_w = (new_w - resized_w) / 2
+    pad_h = (new_h - resized_h) / 2
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                                value=(pad_value, pad_value, pad_value))
+    return padded, ratio, (left, top)
+
+
+def decode_yolo_output(output, ratio, pad, image_shape, class_names,
+                       conf_threshold=0.25, iou_threshold=0.7, max_det=30):
+    """解码YOLOv8原始输出 (1, 4+类别数, 锚点数) 并做按类别NMS
+
+    Args:
+        output: 模型原始输出
+        ratio, pad: letterbox 返回的缩放比例和填充
+        image_shape: 原图 (高, 宽)
+        class_names: 类别名称列表
+
+    Returns:
+        DetectionArrays: 检测结果，按置信度从高到低
+    """
+    preds = np.squeeze(output, 0).T  # (锚点数, 4+类别数)
+    class_scores = preds[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+    keep = scores > conf_threshold
+    if not np.any(keep):
+        return DetectionArrays.empty(class_names)
+    preds, class_ids, scores = preds[keep], class_ids[keep], scores[keep]
+
+    # cx, cy, w, h -> x1, y1, x2, y2，并还原到原图坐标
+    boxes = np.empty((len(preds), 4), dtype=np.float32)
+    boxes[:, 0] = preds[:, 0] - preds[:, 2] / 2
+    boxes[:, 1] = preds[:, 1] - preds[:, 3] / 2
+    boxes[:, 2] = preds[:, 0] + preds[:, 2] / 2
+    boxes[:, 3] = preds[:, 1] + preds[:, 3] / 2
+    boxes[:, [0, 2]] -= pad[0]
+    boxes[:, [1, 3]] -= pad[1]
+    boxes /= ratio
+    height, width = image_shape[:2]
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+
+    # 按类别NMS：不同类别的框加上偏移后互不重叠，一次NMS即可
+    offsets = class_ids.astype(np.float32)[:, None] * 4096.0
+    nms_boxes = boxes[:, :2] + offsets
+    nms_xywh = np.concatenate([nms_boxes, boxes[:, 2:] - boxes[:, :2]], axis=1)
+    indices = cv2.dnn.NMSBoxes(nms_xywh.tolist(), scores.tolist(), conf_threshold, iou_threshold)
+    indices = np.array(indices, dtype=np.int64).reshape(-1)[:max_det]
+    return DetectionArrays(boxes[indices], class_ids[indices], scores[indices], class_names)
+
+
+class DetectorBackend:
+    """检测后端基类"""
+
+    name = "基类"
+
+    def __init__(self, model_path, conf_threshold=0.25, iou_threshold=0.7, max_det=30, input_size=None):
+        """
+        Args:
+            input_size: 推理输入尺寸 (宽, 高)，需为32的倍数；None 使用模型自身尺寸。
+                游戏画面 1067x600，用 640x384 这类与画面同比例的矩形输入可省去大部分填充
+        """
+        self.model_path = model_path
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_det = max_det
+        self.input_size = tuple(input_size) if input_size else None
+
+    @classmethod
+    def is_available(cls, model_path=None):
+        """当前环境是否可以使用该后端"""
+        raise NotImplementedError
+
+    def detect(self, frame_rgb):
+        """检测一帧RGB图像，返回 DetectionArrays"""
+        raise NotImplementedError
+
+
+class UltralyticsDetector(DetectorBackend):
+    """PyTorch 后端 - ultralytics YOLO"""
+
+    name = "PyTorch"
+    default_model_path = 'models/best.pt'
+
+    def __init__(self, model_path=None, conf_threshold=0.25, iou_threshold=0.7, max_det=30,
+                 input_size=None, device='cpu', model=None, num_threads=0):
+        super().__init__(model_path or self.default_model_path, conf_threshold, iou_threshold, max_det, input_size)
+        if num_threads:
+            # 限制PyTorch线程池，多个实例同机运行时避免抢占CPU
+            import torch
+            torch.set_num_threads(num_threads)
+        if model is None:
+            from ultralytics import YOLO
+            model = YOLO(self.model_path)
+            # 优化YOLO设置，减少日志和资源占用
+            model.overrides['verbose'] = False
+            model.overrides['max_det'] = max_det
+            model.overrides['device'] = device
+        self.model = model
+
+    @classmethod
+    def is_available(cls, model_path=None):
+        try:
+            import ultralytics  # noqa: F401
+        except ImportError:
+            return False
+        return os.path.exists(model_path or cls.default_model_path)
+
+    def detect(self, frame_rgb):
+        if self.input_size:
+            input_w, input_h = self.input_size
+            results = self.model.predict(frame_rgb, verbose=False, imgsz=(input_h, input_w))
+        else:
+            results = self.model.predict(frame_rgb, verbose=False)
+        return DetectionArrays.from_ultralytics(results)
+
+
+class OpenVINODetector(DetectorBackend):
+    """OpenVINO 后端 - 直接推理 IR 模型（CPU）"""
+
+    name = "OpenVINO"
+    default_model_path = 'models/best.xml'
+
+    def __init__(self, model_path=None, conf_threshold=0.25, iou_threshold=0.7, max_det=30,
+                 input_size=None, device='CPU', num_streams=1, num_threads=0, performance_hint='LATENCY'):
+        """初始化OpenVINO检测器
+
+        Args:
+            input_size: (宽, 高)，与 IR 尺寸不同时把模型 reshape 为该尺寸
+            device: OpenVINO 设备名
+            num_streams: 推理流数量（多实例同机运行时保持1）
+            num_threads: 推理线程数，0 表示由 OpenVINO 自动决定
+            performance_hint: 'LATENCY' 或 'THROUGHPUT'
+        """
+        super().__init__(model_path or self.default_model_path, conf_threshold, iou_threshold, max_det, input_size)
+        import openvino as ov
+
+        core = ov.Core()
+        model = core.read_model(self.model_path)
+        self.class_names = self._read_class_names(model)
+        if self.input_size:
+            self._reshape(model, ov)
+
+        config = {'PERFORMANCE_HINT': performance_hint}
+        if num_streams:
+            config['NUM_STREAMS'] = str(num_streams)
+        if num_threads:
+            config['INFERENCE_NUM_THREADS'] = str(num_threads)
+        self.compiled_model = core.compile_model(model, device, config)
+        self.infer_request = self.compiled_model.create_infer_request()
+        self._infer_lock = threading.Lock()
+
+        _, _, input_h, input_w = self.compiled_model.input(0).shape
+        self.input_size = (int(input_w), int(input_h))
+        print(f"OpenVINO检测器加载成功: {self.model_path}, 输入 {self.input_size[0]}x{self.input_size[1]}, "
+              f"流数 {num_streams}, 线程数 {num_threads or '自动'}")
+
+    @classmethod
+    def is_available(cls, model_path=None):
+        try:
+            import openvino  # noqa: F401
+        except ImportError:
+            return False
+        return os.path.exists(model_path or cls.default_model_path)
+
+    def _reshape(self, model, ov):
+        """把输入 reshape 为矩形尺寸；IR 内含固定锚点等无法 reshape 时保持原尺寸"""
+        input_w, input_h = self.input_size
+        try:
+            model.reshape({model.input(0): ov.PartialShape([1, 3, input_h, input_w])})
+        except Exception as e:
+            print(f"⚠️ OpenVINO模型无法reshape为 {input_w}x{input_h}，使用原始尺寸: {e}")
+
+    @staticmethod
+    def _read_class_names(model):
+        """从 IR 的 rt_info 读取类别名称"""
+        try:
+            labels = model.get_rt_info(['model_info', 'labels']).astype(str)
+            names = labels.split()
+            if names:
+                return names
+        except Exception:
+            pass
+        return list(DEFAULT_CLASS_NAMES)
+
+    def detect(self, frame_rgb):
+        padded, ratio, pad = letterbox(frame_rgb, self.input_size)
+        blob = np.ascontiguousarray(padded.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+        with self._infer_lock:
+            self.infer_request.infer({0: blob})
+            output = self.infer_request.get_output_tensor(0).data.copy()
+        return decode_yolo_output(output, ratio, pad, frame_rgb.shape, self.class_names,
+                                  self.conf_threshold, self.iou_threshold, self.max_det)
+
+
+class OnnxRuntimeDetector(DetectorBackend):
+    """ONNX Runtime 后端 - CPU推理，可调节线程和会话选项"""
+
+    name = "ONNX Runtime"
+    default_model_path = 'models/best.onnx'
+
+    # 图优化级别名称 -> onnxruntime.GraphOptimizationLevel 属性名
+    GRAPH_OPTIMIZATION_LEVELS = {
+        'disable': 'ORT_DISABLE_ALL',
+        'basic': 'ORT_ENABLE_BASIC',
+        'extended': 'ORT_ENABLE_EXTENDED',
+        'all': 'ORT_ENABLE_ALL',
+    }
+
+    def __init__(self, model_path=None, conf_threshold=0.25, iou_threshold=0.7, max_det=30,
+                 input_size=None, intra_op_num_threads=2, inter_op_num_threads=1, graph_optimization_level='all',
+                 enable_mem_arena=True):
+        """初始化ONNX Runtime检测器
+
+        Args:
+            input_size: (宽, 高)，仅对动态尺寸导出的模型生效（export-onnx --dynamic）
+            intra_op_num_threads: 单个算子内部的并行线程数，0 表示使用全部核心
+            inter_op_num_threads: 算子之间的并行线程数
+            graph_optimization_level: 'disable' / 'basic' / 'extended' / 'all'
+            enable_mem_arena: 是否启用CPU内存池（关闭可降低常驻内存）
+        """
+        super().__init__(model_path or self.default_model_path, conf_threshold, iou_threshold, max_det, input_size)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_num_threads
+        options.inter_op_num_threads = inter_op_num_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        level_name = self.GRAPH_OPTIMIZATION_LEVELS.get(graph_optimization_level, 'ORT_ENABLE_ALL')
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, level_name)
+        options.enable_cpu_mem_arena = enable_mem_arena
+
+        self.session = ort.InferenceSession(self.model_path, sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.class_names = self._read_class_names(self.session)
+
+        # 动态尺寸的模型按指定尺寸（默认 640x640）推理，静态尺寸的模型只能用导出时的尺寸
+        _, _, input_h, input_w = self.session.get_inputs()[0].shape
+        if not isinstance(input_h, int) or not isinstance(input_w, int):
+            input_w, input_h = self.input_size or (640, 640)
+        elif self.input_size and self.input_size != (input_w, input_h):
+            print(f"⚠️ ONNX模型为固定尺寸 {input_w}x{input_h}，忽略 input_size={self.input_size}")
+        self.input_size = (input_w, input_h)
+        print(f"ONNX Runtime检测器加载成功: {self.model_path}, 输入 {input_w}x{input_h}, "
+              f"线程数 {intra_op_num_threads}/{inter_op_num_threads}, 图优化 {graph_optimization_level}, "
+              f"内存池 {'开' if enable_mem_arena else '关'}")
+
+    @classmethod
+    def is_available(cls, model_path=None):
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError:
+            return False
+        return os.path.exists(model_path or cls.default_model_path)
+
+    @staticmethod
+    def _read_class_names(session):
+        """从 ultralytics 导出时写入的元数据读取类别名称"""
+        try:
+            names = session.get_modelmeta().custom_metadata_map.get('names')
+            if names:
+                names = ast.literal_eval(names)
+                return [names[i] for i in sorted(names)]
+        except Exception:
+            pass
+        return list(DEFAULT_CLASS_NAMES)
+
+    def detect(self, frame_rgb):
+        padded, ratio, pad = letterbox(frame_rgb, self.input_size)
+        blob = np.ascontiguousarray(padded.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return decode_yolo_output(output, ratio, pad, frame_rgb.shape, self.class_names,
+                                  self.conf_threshold, self.iou_threshold, self.max_det)
+
+
+# 后端注册表：名称 -> 实现类
+DETECTOR_BACKENDS = {
+    UltralyticsDetector.name: UltralyticsDetector,
+    OpenVINODetector.name: OpenVINODetector,
+    OnnxRuntimeDetector.name: OnnxRuntimeDetector,
+}
+
+
+def create_detector(backend="PyTorch", model_path=None, **kwargs):
+    """
+    创建指定后端的检测器
+
+    Args:
+        backend: 后端名称 ("PyTorch"、"OpenVINO" 或 "ONNX Runtime")
+        model_path: 模型路径，默认使用各后端的默认模型
+        **kwargs: 传给后端构造函数的参数（max_det、num_threads 等）
+
+    Returns:
+        DetectorBackend: 检测器实例，创建失败返回None
+    """
+    detector_cls = DETECTOR_BACKENDS.get(backend)
+    if detector_cls is None:
+        print(f"未知的检测后端: {backend}，使用 PyTorch 后端")
+        detector_cls = UltralyticsDetector
+    try:
+        return detector_cls(model_path=model_path, **kwargs)
+    except Exception as e:
+        print(f"创建 {detector_cls.name} 检测器失败: {e}")
+        return None
+
+
+def get_available_backends():
+    """
+    获取可用的检测后端列表
+
+    Returns:
+        list: 可用后端名称列表
+    """
+    backends = [name for name, detector_cls in DETECTOR_BACKENDS.items() if detector_cls.is_available()]
+    if not backends:
+        print("未检测到可用的检测后端，保留 PyTorch 选项")
+        backends = [UltralyticsDetector.name]
+    return backends
+
+
+if __name__ == "__main__":
+    # 测试代码
+    print("=== 检测后端测试 ===")
+    available = get_available_backends()
+    print(f"可用后端: {available}")
+
+    test_frame = np.zeros((600, 1067, 3), dtype=np.uint8)
+    for backend_name in available:
+        detector = create_detector(backend_name)
+        if detector is not None:
+            print(f"{backend_name}: {detector.detect(test_frame)}")
@@ -0,0 +1,166 @@
+"""
+frame_analysis.py - 单帧检测结果共享
+同一帧只跑一次YOLO推理，角色框、怪物、Boss、门等结果以字段形式提供给所有调用方
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from detectors import DetectionArrays, UltralyticsDetector
+
+
+# 角色（称号）的y轴偏移：称号框在角色头顶，脚下位置约向下80像素
+CHARACTER_Y_OFFSET = 80
+
+
+class FrameAnalysis:
+    """一帧画面的检测结果"""
+
+    def __init__(self, frame_id, timestamp, arrays, predicted=False, detections=None):
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.arrays = arrays          # DetectionArrays，按置信度从高到低
+        self.predicted = predicted    # True 表示本帧未运行检测器，位置来自跟踪预测
+        # 整帧只转换一次 Detection 对象，各字段按类别掩码取子集
+        self.detections = detections if detections is not None else arrays.to_detections()
+
+        character_idx = np.flatnonzero(arrays.mask('chenghao'))
+        self.character = self.detections[character_idx[0]] if len(character_idx) else None  # 置信度最高的chenghao
+        self.enemies = self._select('monster', 'boss')  # 怪物和Boss，保持输出顺序
+        self.monsters = self._select('monster')
+        self.bosses = self._select('boss')
+        self.doors = self._select('door')
+
+    def _select(self, *cls_names):
+        return [self.detections[i] for i in np.flatnonzero(self.arrays.mask(*cls_names))]
+
+    @property
+    def others(self):
+        """其余类别: {类别名: [Detection, ...]}"""
+        others = {}
+        rest = ~self.arrays.mask('chenghao', 'monster', 'boss', 'door')
+        for i in np.flatnonzero(rest):
+            det = self.detections[i]
+            others.setdefault(det.cls_name, []).append(det)
+        return others
+
+    @property
+    def character_box(self):
+        """角色称号框 [x1, y1, x2, y2]，未检测到返回None"""
+        return list(self.character.bbox) if self.character is not None else None
+
+    @property
+    def character_position(self):
+        """角色脚下位置 (x, y)，未检测到返回 (None, None)"""
+        if self.character is None:
+            return None, None
+        return self.character.x, self.character.y + CHARACTER_Y_OFFSET
+
+    def monster_dicts(self):
+        """怪物和Boss列表（旧接口的字典格式）"""
+        return [det.to_dict() for det in self.enemies]
+
+    def find_near(self, cls_name, x, y, max_offset=100):
+        """查找指定位置附近的同类目标（置信度最高的一个），找不到返回None"""
+        centers = self.arrays.centers()
+        near = (self.arrays.mask(cls_name)
+                & (np.abs(centers[:, 0] - x) < max_offset)
+                & (np.abs(centers[:, 1] - y) < max_offset))
+        indices = np.flatnonzero(near)
+        return self.detections[indices[0]] if len(indices) else None
+
+    def __repr__(self):
+        return (f"FrameAnalysis(frame={self.frame_id}, character={self.character_box}, "
+                f"monsters={len(self.monsters)}, bosses={len(self.bosses)}, doors={len(self.doors)})")
+
+
+class FrameAnalyzer:
+    """帧分析器 - 同一帧只推理一次，结果按帧编号缓存"""
+
+    def __init__(self, yolo_model, cache_size=4, change_gate=None):
+        """初始化帧分析器
+
+        Args:
+            yolo_model: 检测器（detectors.DetectorBackend），也兼容直接传入 ultralytics YOLO 模型
+            cache_size: 缓存的帧结果数量
+            change_gate: 画面变化门控（frame_gate.FrameChangeGate），画面未变化时复用上次的检测结果
+        """
+        if yolo_model is not None and not hasattr(yolo_model, 'detect'):
+            yolo_model = UltralyticsDetector(model=yolo_model)
+        self.yolo_model = yolo_model
+        self.change_gate = change_gate
+        self._cache = deque(maxlen=cache_size)  # [(frame_id, 源图像, FrameAnalysis), ...]
+        self._lock = threading.Lock()
+        self.inference_count = 0
+        self.cache_hits = 0
+
+    def analyze(self, frame_rgb, frame_id=None):
+        """分析一帧RGB图像
+
+        有 frame_id 时按编号缓存；没有时按图像对象本身缓存，
+        同一个数组被多次传入（如先取角色位置再找怪物）只推理一次
+        """
+        return self._analyze(frame_rgb, frame_id, is_bgr=False)
+
+    def analyze_bgr(self, frame_bgr, frame_id=None):
+        """分析一帧BGR图像（截图服务的原始格式）"""
+        return self._analyze(frame_bgr, frame_id, is_bgr=True)
+
+    def analyze_captured(self, captured):
+        """分析截图服务返回的 CapturedFrame，按帧编号缓存"""
+        if captured is None:
+            return None
+        return self._analyze(captured.image, captured.frame_id, is_bgr=True, timestamp=captured.timestamp)
+
+    def _analyze(self, image, frame_id, is_bgr, timestamp=None):
+        with self._lock:
+            for cached_id, cached_image, analysis in self._cache:
+                if (frame_id is not None and cached_id == frame_id) or cached_image is image:
+                    self.cache_hits += 1
+                    return analysis
+
+            detect = lambda: self._detect(cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if is_bgr else image)
+            if self.change_gate is not None:
+                # RGB 与 BGR 输入的灰度缩略图不同，分开保存参考
+                arrays = self.change_gate.reuse('yolo' if is_bgr else 'yolo_rgb', image, detect)
+            else:
+                arrays = detect()
+            analysis = FrameAnalysis(frame_id, timestamp or time.time(), arrays)
+            # 持有图像引用，保证按对象匹配时不会误用被回收后复用的 id
+            self._cache.append((frame_id, image, analysis))
+            return analysis
+
+    def _detect(self, frame_rgb):
+        """运行一次检测并返回 DetectionArrays"""
+        if self.yolo_model is None:
+            return DetectionArrays.empty()
+        try:
+            self.inference_count += 1
+            return self.yolo_model.detect(frame_rgb)
+        except Exception as e:
+            print(f"YOLO检测失败: {e}")
+            return DetectionArrays.empty()
+
+    def remember(self, captured, analysis):
+        """把外部得到的结果（如跟踪预测）登记为该帧的分析结果"""
+        with self._lock:
+            self._cache.append((captured.frame_id, captured.image, analysis))
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self):
+        """获取推理/缓存命中统计"""
+        stats = {
+            'inference_count': self.inference_count,
+            'cache_hits': self.cache_hits,
+        }
+        if self.change_gate is not None:
+            stats['change_gate'] = self.change_gate.get_stats()
+        return stats
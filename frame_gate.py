@@ -0,0 +1,158 @@
+"""
+frame_gate.py - 画面变化门控
+加载画面、菜单、翻牌动画、导航等待期间连续多帧几乎相同，却仍在反复做模板匹配和YOLO推理。
+这里对画面做一次缩小后的逐块绝对差（每块约 32x32 像素），检测区域内所有块都没有变化时，
+下游检测直接复用上一次的结果：
+- 每个检测项（如 'yolo'、'fanpai'、'map'）各自保存上次运行时的缩略图作为参考，
+  与参考比较而不是与上一帧比较，缓慢累积的变化也不会被漏掉
+- 可指定检测区域，只比较该区域内的块（如小地图变化才重新识别地图）
+- 连续复用次数有上限，到达上限时强制重新检测
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+
+class FrameChangeGate:
+    """画面变化门控 - 区域未变化时复用检测项的上次结果"""
+
+    def __init__(self, scale=8, tile=4, threshold=3.0, max_reuse=30):
+        """初始化画面变化门控
+
+        Args:
+            scale: 缩略图的缩小倍数
+            tile: 每块包含的缩略图像素数（边长），即每块约 scale*tile 像素
+            threshold: 块内平均灰度差超过该值视为变化
+            max_reuse: 同一检测项最多连续复用的次数
+        """
+        self.scale = max(1, scale)
+        self.tile = max(1, tile)
+        self.threshold = threshold
+        self.max_reuse = max(0, max_reuse)
+        self._lock = threading.Lock()
+        self._thumb_source = None  # 最近一次生成缩略图的画面（按对象判断是否同一帧）
+        self._thumb = None
+        self._entries = {}  # 检测项 -> [参考缩略图, 区域, 上次结果, 连续复用次数]
+        self.check_count = {}  # 检测项 -> 检查次数
+        self.reuse_count = {}  # 检测项 -> 复用次数
+
+    def thumbnail(self, frame):
+        """缩小后的灰度图（同一帧只生成一次）"""
+        with self._lock:
+            if self._thumb_source is frame:
+                return self._thumb
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (max(1, width // self.scale), max(1, height // self.scale)),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY if small.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        with self._lock:
+            self._thumb_source = frame
+            self._thumb = small
+        return small
+
+    def _crop(self, thumb, roi):
+        """按原图坐标的区域裁剪缩略图（向外取整到缩略图像素）"""
+        if roi is None:
+            return thumb
+        x1, y1, x2, y2 = roi
+        s = self.scale
+        return thumb[max(0, y1 // s):-(-y2 // s), max(0, x1 // s):-(-x2 // s)]
+
+    def changed_tiles(self, current, reference):
+        """逐块比较两张缩略图，返回每块是否变化的布尔矩阵（尺寸不同时全部视为变化）"""
+        if reference is None or current.shape != reference.shape:
+            rows = -(-current.shape[0] // self.tile)
+            cols = -(-current.shape[1] // self.tile)
+            return np.ones((max(1, rows), max(1, cols)), dtype=bool)
+        diff = cv2.absdiff(current, reference)
+        rows = -(-diff.shape[0] // self.tile)
+        cols = -(-diff.shape[1] // self.tile)
+        tile_means = cv2.resize(diff, (max(1, cols), max(1, rows)), interpolation=cv2.INTER_AREA)
+        return tile_means.reshape(max(1, rows), max(1, cols)) > self.threshold
+
+    def reuse(self, key, frame, compute, roi=None):
+        """区域未变化时返回检测项的上次结果，否则调用 compute() 重新检测并记录为新的参考
+
+        Args:
+            key: 检测项名称
+            frame: 当前画面（BGR 或灰度）
+            compute: 无参函数，返回检测结果
+            roi: 只比较该区域 (x1, y1, x2, y2)，None 为整张画面
+
+        Returns:
+            检测结果（复用或新计算的）
+        """
+        if frame is None or frame.size == 0:
+            return compute()
+        current = self._crop(self.thumbnail(frame), roi)
+        with self._lock:
+            self.check_count[key] = self.check_count.get(key, 0) + 1
+            entry = self._entries.get(key)
+        if (entry is not None and entry[1] == roi and entry[3] < self.max_reuse
+                and not self.changed_tiles(current, entry[0]).any()):
+            with self._lock:
+                entry[3] += 1
+                self.reuse_count[key] = self.reuse_count.get(key, 0) + 1
+            return entry[2]
+
+        result = compute()
+        with self._lock:
+            self._entries[key] = [current, roi, result, 0]
+        return result
+
+    def invalidate(self, key=None):
+        """丢弃检测项（None 为全部）的参考，下一次必定重新检测"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self):
+        """获取各检测项的检查次数、复用次数和跳过比例"""
+        with self._lock:
+            checks = dict(self.check_count)
+            reuses = dict(self.reuse_count)
+        total_checks = sum(checks.values())
+        total_reuses = sum(reuses.values())
+        return {
+            'skip_ratio': total_reuses / total_checks if total_checks else 0.0,
+            'detectors': {
+                key: {
+                    'checks': count,
+                    'reused': reuses.get(key, 0),
+                    'skip_ratio': reuses.get(key, 0) / count,
+                }
+                for key, count in checks.items()
+            },
+        }
+
+
+if __name__ == "__main__":
+    import time
+
+    # 简单自测：静止画面复用结果，局部变化（只在区域内）触发重新检测
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (600, 1067, 3), dtype=np.uint8), (9, 9), 0)
+    gate = FrameChangeGate()
+    calls = []
+    detect = lambda: calls.append(1) or len(calls)
+
+    assert gate.reuse('yolo', frame, detect) == 1
+    noisy = np.clip(frame.astype(np.int16) + rng.integers(-2, 3, frame.shape), 0, 255).astype(np.uint8)
+    assert gate.reuse('yolo', noisy, detect) == 1, "噪声不应触发重新检测"
+
+    moved = frame.copy()
+    moved[300:330, 500:530] = 255  # 30x30 的目标出现在画面中部
+    assert gate.reuse('yolo', moved, detect) == 2, "局部变化应触发重新检测"
+    assert gate.reuse('minimap', frame, detect, roi=(929, 53, 1059, 108)) == 3
+    assert gate.reuse('minimap', moved, detect, roi=(929, 53, 1059, 108)) == 3, "区域外的变化应被忽略"
+
+    start_time = time.perf_counter()
+    for _ in range(100):
+        gate.reuse('yolo', moved.copy(), detect)
+    elapsed = (time.perf_counter() - start_time) * 10
+    print(f"门控平均耗时 {elapsed:.3f}ms（含复制画面），统计: {gate.get_stats()}")
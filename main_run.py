@@ -19,9 +19,12 @@ from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
 from PyQt5.QtGui import QPixmap, QImage
 import cv2
 import numpy as np
-import mss
 from window_manager import WindowManager
 from input_controllers import get_available_controllers, create_input_controller
+from screen_capture import capture_service
+from detectors import get_available_backends
+from model_registry import model_registry
+from frame_analysis import FrameAnalyzer
 
 
 def get_machine_code():
@@ -46,6 +49,7 @@ class GameAutomationWindow(QWidget):
         self.stop_event = threading.Event()
         self.automation_thread = None
         self.detection_thread = None
+        self.detector_backend = "PyTorch"
         
         # 自动化模块（延迟导入）
         self.zhongmo_automator = None
@@ -211,6 +215,29 @@ class GameAutomationWindow(QWidget):
         input_layout.addStretch()
         config_container.addLayout(input_layout)
         
+        # 推理后端选择
+        backend_layout = QHBoxLayout()
+        backend_layout.setContentsMargins(0, 0, 0, 0)
+        
+        backend_label = QLabel("推理后端:")
+        backend_label.setMinimumWidth(80)
+        backend_label.setAlignment(Qt.AlignLeft)
+        backend_layout.addWidget(backend_label)
+        
+        self.backend_combo = QComboBox()
+        available_backends = get_available_backends()
+        self.backend_combo.addItems(available_backends)
+        self.backend_combo.setCurrentIndex(0)
+        self.backend_combo.setMinimumWidth(120)
+        backend_layout.addWidget(self.backend_combo)
+        
+        backend_info_label = QLabel("(OpenVINO使用models/best.xml, ONNX使用models/best.onnx)")
+        backend_info_label.setStyleSheet("font-size: 10px; color: #666; margin-left: 10px;")
+        backend_layout.addWidget(backend_info_label)
+        
+        backend_layout.addStretch()
+        config_container.addLayout(backend_layout)
+        
         # 将配置区域添加到主水平布局的左侧
         config_and_control_layout.addLayout(config_container)
         
@@ -535,8 +562,9 @@ class GameAutomationWindow(QWidget):
             selected_mode = self.mode_combo.currentText()
             total_roles = int(self.role_combo.currentText())
             input_method = self.input_combo.currentText()
+            self.detector_backend = self.backend_combo.currentText()
             
-            self.log(f"开始 {selected_mode} 自动化，角色数量: {total_roles}，键鼠控制: {input_method}")
+            self.log(f"开始 {selected_mode} 自动化，角色数量: {total_roles}，键鼠控制: {input_method}，推理后端: {self.detector_backend}")
             
             # 创建选择的输入控制器
             try:
@@ -569,7 +597,8 @@ class GameAutomationWindow(QWidget):
             # 导入新的妖气追踪模块
             from yaoqi import YaoqiAutomator
             
-            self.yaoqi_automator = YaoqiAutomator(input_controller=input_controller)
+            self.yaoqi_automator = YaoqiAutomator(input_controller=input_controller,
+                                                  detector_backend=self.detector_backend)
             
             # 在新线程中运行
             self.automation_thread = threading.Thread(
@@ -589,7 +618,8 @@ class GameAutomationWindow(QWidget):
             # 导入新的深渊地图模块
             from shenyuan import ShenyuanAutomator
             
-            self.shenyuan_automator = ShenyuanAutomator(input_controller=input_controller)
+            self.shenyuan_automator = ShenyuanAutomator(input_controller=input_controller,
+                                                        detector_backend=self.detector_backend)
             
             # 在新线程中运行
             self.automation_thread = threading.Thread(
@@ -645,7 +675,7 @@ class GameAutomationWindow(QWidget):
     def start_detection(self):
         """开始实时检测"""
         try:
-            self.detection_thread = DetectionThread()
+            self.detection_thread = DetectionThread(self.backend_combo.currentText())
             self.detection_thread.frame_ready.connect(self.update_detection_display)
             self.detection_thread.start()
             
@@ -767,6 +797,9 @@ class GameAutomationWindow(QWidget):
                 
             if self.detection_thread and self.detection_thread.isRunning():
                 self.detection_thread.wait(3000)
+            
+            # 停止共享截图服务
+            capture_service.stop()
                 
             event.accept()
             
@@ -781,253 +814,236 @@ class DetectionThread(QThread):
     
     frame_ready = pyqtSignal(np.ndarray)
     
-    def __init__(self):
+    def __init__(self, detector_backend="PyTorch"):
         super().__init__()
         self.running = False
         self.show_connections = True  # 控制是否显示连线
+        self.detector_backend = detector_backend
         
     def run(self):
         """运行检测线程 - 优化版本"""
         self.running = True
         error_count = 0
         max_errors = 5
+        model = None
         
         try:
-            # 延迟导入YOLO和相关模块
-            from ultralytics import YOLO
+            # 延迟导入相关模块
             from actions import YaoqiAttacker
             
-            # 加载模型（使用CPU模式提高稳定性）
-            model = YOLO('models/best.pt')
-            # 优化YOLO设置，减少资源占用
-            model.overrides['verbose'] = False
-            model.overrides['max_det'] = 20  # 进一步降低最大检测数量
-            model.overrides['device'] = 'cpu'  # 强制使用CPU模式
+            # 与自动化共用注册表中的模型，不重复加载
+            model = model_registry.acquire(self.detector_backend, max_det=30)
+            if model is None:
+                print(f"检测线程加载 {self.detector_backend} 模型失败")
             
             # 小地图区域配置
             MAP_X1, MAP_Y1, MAP_X2, MAP_Y2 = 929, 53, 1059, 108
             
             # 只初始化攻击器用于基本检测，移除复杂的小地图检测
-            attacker = YaoqiAttacker(yolo_model=model)
+            frame_analyzer = FrameAnalyzer(model)
+            attacker = YaoqiAttacker(yolo_model=model, frame_analyzer=frame_analyzer)
             
-            with mss.mss() as sct:
-                region = {'left': 0, 'top': 0, 'width': 1067, 'height': 600}
-                
-                while self.running:
-                    try:
-                        screenshot = sct.grab(region)
-                        frame = np.array(screenshot)
-                        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        
-                        # 使用YOLO检测怪物和角色
-                        monsters = attacker.detect_monsters(frame_rgb)
-                        character_x, character_y = attacker.get_positions(frame_rgb)
-                        
-                        # 检测chenghao位置和door位置
-                        chenghao_box = None
-                        doors = []
+            
+            while self.running:
+                try:
+                    # 从共享截图服务取帧，整帧只做一次YOLO检测
+                    captured = capture_service.get_latest()
+                    if captured is None:
+                        self.msleep(150)
+                        continue
+                    analysis = frame_analyzer.analyze_captured(captured)
+                    frame = captured.image.copy()  # 副本，后面会在上面绘制
+                    
+                    # 怪物和角色位置
+                    monsters = attacker.detect_monsters(None, analysis)
+                    character_x, character_y = attacker.get_positions(None, analysis)
+                    
+                    # chenghao位置和door位置
+                    chenghao_box = analysis.character_box
+                    if chenghao_box is not None:
+                        # 调整chenghao边界框的y轴坐标
+                        chenghao_box[1] += 80  # y1
+                        chenghao_box[3] += 80  # y2
+                    doors = [{'bbox': list(door.bbox), 'x': door.x, 'y': door.y} for door in analysis.doors]
+                    
+                    # 简化检测，移除小地图高级检测避免冲突
+                    character_grid, door_states, boss_grid = None, {}, None
+                    
+                    # 绘制怪物检测结果并添加连线
+                    for monster in monsters:
                         try:
-                            if model is not None:
-                                results = model.predict(frame_rgb, verbose=False)
-                                for result in results:
-                                    for box in result.boxes:
-                                        cls_id = int(box.cls)
-                                        if cls_id in result.names:
-                                            cls_name = result.names[cls_id]
-                                            if cls_name == 'chenghao':
-                                                chenghao_box = list(map(int, box.xyxy[0]))
-                                                # 调整chenghao边界框的y轴坐标
-                                                chenghao_box[1] += 80  # y1
-                                                chenghao_box[3] += 80  # y2
-                                            elif cls_name == 'door':
-                                                door_box = list(map(int, box.xyxy[0]))
-                                                door_center_x = door_box[0] + (door_box[2] - door_box[0]) // 2
-                                                door_center_y = door_box[1] + (door_box[3] - door_box[1]) // 2
-                                                doors.append({
-                                                    'bbox': door_box,
-                                                    'x': door_center_x,
-                                                    'y': door_center_y
-                                                })
-                        except Exception:
-                            pass
-                        
-                        # 简化检测，移除小地图高级检测避免冲突
-                        character_grid, door_states, boss_grid = None, {}, None
-                        
-                        # 绘制怪物检测结果并添加连线
-                        for monster in monsters:
-                            try:
-                                x1, y1, x2, y2 = monster['bbox']
-                                monster_center_x = monster['x']
-                                monster_center_y = monster['y']
-                                color = (0, 0, 255) if monster['type'] == 'boss' else (0, 255, 0)  # Boss红色，小怪绿色
+                            x1, y1, x2, y2 = monster['bbox']
+                            monster_center_x = monster['x']
+                            monster_center_y = monster['y']
+                            color = (0, 0, 255) if monster['type'] == 'boss' else (0, 255, 0)  # Boss红色，小怪绿色
+                            
+                            # 绘制怪物检测框
+                            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+                            cv2.putText(frame, monster['type'], (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                            
+                            # 如果检测到chenghao且启用连线显示，绘制连线
+                            if self.show_connections and chenghao_box is not None and character_x is not None and character_y is not None:
+                                # 计算连线颜色（根据怪物类型）
+                                line_color = (0, 0, 255) if monster['type'] == 'boss' else (0, 255, 0)
+                                line_thickness = 3 if monster['type'] == 'boss' else 2  # Boss连线更粗
                                 
-                                # 绘制怪物检测框
-                                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                                cv2.putText(frame, monster['type'], (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                                # 绘制从chenghao到怪物的连线
+                                cv2.line(frame, (character_x, character_y), (monster_center_x, monster_center_y), line_color, line_thickness)
                                 
-                                # 如果检测到chenghao且启用连线显示，绘制连线
-                                if self.show_connections and chenghao_box is not None and character_x is not None and character_y is not None:
-                                    # 计算连线颜色（根据怪物类型）
-                                    line_color = (0, 0, 255) if monster['type'] == 'boss' else (0, 255, 0)
-                                    line_thickness = 3 if monster['type'] == 'boss' else 2  # Boss连线更粗
+                                # 只在距离较远时显示距离信息（减少文字渲染）
+                                distance = ((character_x - monster_center_x)**2 + (character_y - monster_center_y)**2)**0.5
+                                if distance > 80:  # 只在距离较远时显示
+                                    mid_x = (character_x + monster_center_x) // 2
+                                    mid_y = (character_y + monster_center_y) // 2
                                     
-                                    # 绘制从chenghao到怪物的连线
-                                    cv2.line(frame, (character_x, character_y), (monster_center_x, monster_center_y), line_color, line_thickness)
-                                    
-                                    # 只在距离较远时显示距离信息（减少文字渲染）
-                                    distance = ((character_x - monster_center_x)**2 + (character_y - monster_center_y)**2)**0.5
-                                    if distance > 80:  # 只在距离较远时显示
-                                        mid_x = (character_x + monster_center_x) // 2
-                                        mid_y = (character_y + monster_center_y) // 2
-                                        
-                                        # 绘制距离标签（小字体，半透明背景）
-                                        distance_text = f"{int(distance)}"
-                                        text_size = cv2.getTextSize(distance_text, cv2.FONT_HERSHEY_SIMPLEX, 0.35, 1)[0]
-                                        cv2.rectangle(frame, (mid_x - text_size[0]//2 - 1, mid_y - text_size[1] - 1), 
-                                                    (mid_x + text_size[0]//2 + 1, mid_y + 1), (0, 0, 0), -1)
-                                        cv2.putText(frame, distance_text, (mid_x - text_size[0]//2, mid_y), 
-                                                  cv2.FONT_HERSHEY_SIMPLEX, 0.35, line_color, 1)
-                                    
-                            except Exception:
-                                continue  # 跳过有问题的怪物
-                        
-                        # 绘制角色位置
-                        if character_x is not None and character_y is not None:
-                            try:
-                                cv2.circle(frame, (character_x, character_y), 10, (255, 0, 0), 2)
-                                cv2.putText(frame, "Player", (character_x-20, character_y-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                            except Exception:
-                                pass
-                        
-                        # 绘制chenghao检测框
-                        if chenghao_box is not None:
-                            try:
-                                x1, y1, x2, y2 = chenghao_box
-                                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 3)  # 黄色框，加粗
-                                cv2.putText(frame, "chenghao", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+                                    # 绘制距离标签（小字体，半透明背景）
+                                    distance_text = f"{int(distance)}"
+                                    text_size = cv2.getTextSize(distance_text, cv2.FONT_HERSHEY_SIMPLEX, 0.35, 1)[0]
+                                    cv2.rectangle(frame, (mid_x - text_size[0]//2 - 1, mid_y - text_size[1] - 1), 
+                                                (mid_x + text_size[0]//2 + 1, mid_y + 1), (0, 0, 0), -1)
+                                    cv2.putText(frame, distance_text, (mid_x - text_size[0]//2, mid_y), 
+                                              cv2.FONT_HERSHEY_SIMPLEX, 0.35, line_color, 1)
                                 
-                                # 在chenghao中心绘制一个十字准星
-                                center_x = (x1 + x2) // 2
-                                center_y = (y1 + y2) // 2
-                                cv2.line(frame, (center_x-5, center_y), (center_x+5, center_y), (255, 255, 0), 2)
-                                cv2.line(frame, (center_x, center_y-5), (center_x, center_y+5), (255, 255, 0), 2)
-                            except Exception:
-                                pass
-                        
-                        # 绘制door检测结果并添加连线
-                        for door in doors:
-                            try:
-                                door_box = door['bbox']
-                                x1, y1, x2, y2 = door_box
-                                door_center_x = door['x']
-                                door_center_y = door['y']
-                                
-                                # 绘制door检测框（紫色）
-                                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 255), 2)
-                                cv2.putText(frame, "door", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 2)
-                                
-                                # 如果棆测到chenghao且启用连线显示，绘制连线
-                                if self.show_connections and chenghao_box is not None and character_x is not None and character_y is not None:
-                                    # 绘制从chenghao到door的连线（紫色虚线）
-                                    self.draw_dotted_line(frame, (character_x, character_y), (door_center_x, door_center_y), (255, 0, 255), 2)
-                                    
-                                    # 只在距离较远时显示距离信息
-                                    distance = ((character_x - door_center_x)**2 + (character_y - door_center_y)**2)**0.5
-                                    if distance > 60:  # door的距离阈值较小一些
-                                        mid_x = (character_x + door_center_x) // 2
-                                        mid_y = (character_y + door_center_y) // 2
-                                        
-                                        # 绘制距离标签（紫色背景）
-                                        distance_text = f"{int(distance)}"
-                                        text_size = cv2.getTextSize(distance_text, cv2.FONT_HERSHEY_SIMPLEX, 0.35, 1)[0]
-                                        cv2.rectangle(frame, (mid_x - text_size[0]//2 - 1, mid_y - text_size[1] - 1), 
-                                                    (mid_x + text_size[0]//2 + 1, mid_y + 1), (128, 0, 128), -1)
-                                        cv2.putText(frame, distance_text, (mid_x - text_size[0]//2, mid_y), 
-                                                  cv2.FONT_HERSHEY_SIMPLEX, 0.35, (255, 255, 255), 1)
-                                    
-                            except Exception:
-                                continue  # 跳过有问题的door
-                        
-                        # 绘制小地图边界和连线区域标识
-                        MAP_X1, MAP_Y1, MAP_X2, MAP_Y2 = 929, 53, 1059, 108
-                        cv2.rectangle(frame, (MAP_X1, MAP_Y1), (MAP_X2, MAP_Y2), (128, 128, 128), 1)
-                        cv2.putText(frame, "MiniMap", (MAP_X1, MAP_Y1-5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
-                        
-                        # 绘制连线区域标识和控制信息（右上角）
-                        if self.show_connections:
-                            cv2.putText(frame, "Connection Lines: ON", (850, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-                            cv2.putText(frame, "Green: Monster", (850, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
-                            cv2.putText(frame, "Red: Boss", (850, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 255), 1)
-                            cv2.putText(frame, "Purple: Door (dotted)", (850, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 0, 255), 1)
-                        else:
-                            cv2.putText(frame, "Connection Lines: OFF", (850, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
-                            cv2.putText(frame, "Press 'C' to toggle", (850, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
-                        
-                        # 优化状态信息显示
+                        except Exception:
+                            continue  # 跳过有问题的怪物
+                    
+                    # 绘制角色位置
+                    if character_x is not None and character_y is not None:
                         try:
-                            # 计算连线数量和状态
-                            connection_count = 0
-                            if self.show_connections and chenghao_box is not None and character_x is not None and character_y is not None:
-                                connection_count = len(monsters) + len(doors)
-                            
-                            # 计算总检测数量
-                            total_targets = len(monsters) + len(doors)
-                            
-                            # 定义状态符号
-                            check_mark = '✓'
-                            cross_mark = '✗'
+                            cv2.circle(frame, (character_x, character_y), 10, (255, 0, 0), 2)
+                            cv2.putText(frame, "Player", (character_x-20, character_y-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+                        except Exception:
+                            pass
+                    
+                    # 绘制chenghao检测框
+                    if chenghao_box is not None:
+                        try:
+                            x1, y1, x2, y2 = chenghao_box
+                            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 3)  # 黄色框，加粗
+                            cv2.putText(frame, "chenghao", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
                             
-                            status_lines = [
-                                f"Targets: {total_targets} (M:{len(monsters)} D:{len(doors)}) | Character: {'Found' if character_x else 'Missing'}",
-                                f"Connections: {connection_count}/{total_targets} | Lines: {'ON' if self.show_connections else 'OFF'} | FPS: ~7",
-                                f"Chenghao: {check_mark if chenghao_box else cross_mark} | Detection: Running | Mode: Enhanced"
-                            ]
+                            # 在chenghao中心绘制一个十字准星
+                            center_x = (x1 + x2) // 2
+                            center_y = (y1 + y2) // 2
+                            cv2.line(frame, (center_x-5, center_y), (center_x+5, center_y), (255, 255, 0), 2)
+                            cv2.line(frame, (center_x, center_y-5), (center_x, center_y+5), (255, 255, 0), 2)
+                        except Exception:
+                            pass
+                    
+                    # 绘制door检测结果并添加连线
+                    for door in doors:
+                        try:
+                            door_box = door['bbox']
+                            x1, y1, x2, y2 = door_box
+                            door_center_x = door['x']
+                            door_center_y = door['y']
                             
-                            # 绘制状态信息背景
-                            status_bg_height = len(status_lines) * 25 + 10
-                            cv2.rectangle(frame, (5, 5), (600, status_bg_height), (0, 0, 0), -1)
-                            cv2.rectangle(frame, (5, 5), (600, status_bg_height), (255, 255, 255), 1)
+                            # 绘制door检测框（紫色）
+                            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 255), 2)
+                            cv2.putText(frame, "door", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 2)
                             
-                            for i, status_text in enumerate(status_lines):
-                                y_pos = 25 + i * 20
-                                cv2.putText(frame, status_text, (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                            # 如果棆测到chenghao且启用连线显示，绘制连线
+                            if self.show_connections and chenghao_box is not None and character_x is not None and character_y is not None:
+                                # 绘制从chenghao到door的连线（紫色虚线）
+                                self.draw_dotted_line(frame, (character_x, character_y), (door_center_x, door_center_y), (255, 0, 255), 2)
+                                
+                                # 只在距离较远时显示距离信息
+                                distance = ((character_x - door_center_x)**2 + (character_y - door_center_y)**2)**0.5
+                                if distance > 60:  # door的距离阈值较小一些
+                                    mid_x = (character_x + door_center_x) // 2
+                                    mid_y = (character_y + door_center_y) // 2
+                                    
+                                    # 绘制距离标签（紫色背景）
+                                    distance_text = f"{int(distance)}"
+                                    text_size = cv2.getTextSize(distance_text, cv2.FONT_HERSHEY_SIMPLEX, 0.35, 1)[0]
+                                    cv2.rectangle(frame, (mid_x - text_size[0]//2 - 1, mid_y - text_size[1] - 1), 
+                                                (mid_x + text_size[0]//2 + 1, mid_y + 1), (128, 0, 128), -1)
+                                    cv2.putText(frame, distance_text, (mid_x - text_size[0]//2, mid_y), 
+                                              cv2.FONT_HERSHEY_SIMPLEX, 0.35, (255, 255, 255), 1)
+                                
                         except Exception:
-                            pass
-                        
-                        # 发送帧到UI
-                        self.frame_ready.emit(frame)
-                        
-                        # 重置错误计数
-                        error_count = 0
-                        
-                        # 控制帧率，降低到更稳定的频率
-                        self.msleep(150)  # 约7 FPS，进一步减少资源消耗
+                            continue  # 跳过有问题的door
+                    
+                    # 绘制小地图边界和连线区域标识
+                    MAP_X1, MAP_Y1, MAP_X2, MAP_Y2 = 929, 53, 1059, 108
+                    cv2.rectangle(frame, (MAP_X1, MAP_Y1), (MAP_X2, MAP_Y2), (128, 128, 128), 1)
+                    cv2.putText(frame, "MiniMap", (MAP_X1, MAP_Y1-5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
+                    
+                    # 绘制连线区域标识和控制信息（右上角）
+                    if self.show_connections:
+                        cv2.putText(frame, "Connection Lines: ON", (850, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+                        cv2.putText(frame, "Green: Monster", (850, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
+                        cv2.putText(frame, "Red: Boss", (850, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 255), 1)
+                        cv2.putText(frame, "Purple: Door (dotted)", (850, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 0, 255), 1)
+                    else:
+                        cv2.putText(frame, "Connection Lines: OFF", (850, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+                        cv2.putText(frame, "Press 'C' to toggle", (850, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
+                    
+                    # 优化状态信息显示
+                    try:
+                        # 计算连线数量和状态
+                        connection_count = 0
+                        if self.show_connections and chenghao_box is not None and character_x is not None and character_y is not None:
+                            connection_count = len(monsters) + len(doors)
                         
-                    except Exception as e:
-                        error_count += 1
-                        print(f"检测线程中发生错误 ({error_count}/{max_errors}): {e}")
+                        # 计算总检测数量
+                        total_targets = len(monsters) + len(doors)
                         
-                        if error_count >= max_errors:
-                            print("检测线程错误过多，停止运行")
-                            break
+                        # 定义状态符号
+                        check_mark = '✓'
+                        cross_mark = '✗'
                         
-                        # 逐渐增加等待时间
-                        wait_time = min(error_count * 200, 2000)  # 增加等待时间
-                        self.msleep(wait_time)
+                        status_lines = [
+                            f"Targets: {total_targets} (M:{len(monsters)} D:{len(doors)}) | Character: {'Found' if character_x else 'Missing'}",
+                            f"Connections: {connection_count}/{total_targets} | Lines: {'ON' if self.show_connections else 'OFF'} | FPS: ~7",
+                            f"Chenghao: {check_mark if chenghao_box else cross_mark} | Detection: Running | Mode: Enhanced"
+                        ]
                         
-                        # 尝试释放资源
-                        try:
-                            from memory_manager import optimize_memory
-                            optimize_memory()
-                        except ImportError:
-                            import gc
-                            gc.collect()
+                        # 绘制状态信息背景
+                        status_bg_height = len(status_lines) * 25 + 10
+                        cv2.rectangle(frame, (5, 5), (600, status_bg_height), (0, 0, 0), -1)
+                        cv2.rectangle(frame, (5, 5), (600, status_bg_height), (255, 255, 255), 1)
                         
+                        for i, status_text in enumerate(status_lines):
+                            y_pos = 25 + i * 20
+                            cv2.putText(frame, status_text, (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                    except Exception:
+                        pass
+                    
+                    # 发送帧到UI
+                    self.frame_ready.emit(frame)
+                    
+                    # 重置错误计数
+                    error_count = 0
+                    
+                    # 控制帧率，降低到更稳定的频率
+                    self.msleep(150)  # 约7 FPS，进一步减少资源消耗
+                    
+                except Exception as e:
+                    error_count += 1
+                    print(f"检测线程中发生错误 ({error_count}/{max_errors}): {e}")
+                    
+                    if error_count >= max_errors:
+                        print("检测线程错误过多，停止运行")
+                        break
+                    
+                    # 逐渐增加等待时间
+                    wait_time = min(error_count * 200, 2000)  # 增加等待时间
+                    self.msleep(wait_time)
+                    
+                    # 尝试释放资源
+                    try:
+                        from memory_manager import optimize_memory
+                        optimize_memory()
+                    except ImportError:
+                        import gc
+                        gc.collect()
+                    
         except Exception as e:
             print(f"检测线程启动失败: {e}")
         finally:
+            # 释放模型引用
+            model_registry.release(model)
             # 清理资源
             try:
                 from memory_manager import optimize_memory
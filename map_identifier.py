@@ -0,0 +1,122 @@
+"""
+map_identifier.py - 地图识别
+ditu1~ditu12 都是右上角小地图的截图，尺寸相近。原来每帧在整张画面上依次匹配 12 个模板，
+这里改为一次调用完成识别：
+- 先定位小地图区域（默认右上角，找到地图后按实际位置收紧），每帧只截取并灰度化这一小块
+- 在该区域内对全部模板做相关匹配，取得分最高的地图及其置信度
+- 区域内连续多次识别失败时做一次全画面兜底搜索（界面布局变化时重新定位）
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+
+# 默认的小地图搜索区域 (x1, y1, x2, y2)，覆盖右上角小地图及其展开后的尺寸
+DEFAULT_MAP_REGION = (880, 0, 1067, 160)
+
+
+class MapIdentifier:
+    """地图识别器 - 一次调用返回最匹配的地图及置信度"""
+
+    def __init__(self, templates, region=DEFAULT_MAP_REGION, threshold=0.8, margin=12, max_misses=10):
+        """初始化地图识别器
+
+        Args:
+            templates: {地图名称: 灰度模板}
+            region: 初始搜索区域 (x1, y1, x2, y2)
+            threshold: 识别成功所需的最低 TM_CCOEFF_NORMED 得分
+            margin: 根据识别位置收紧区域时保留的边距
+            max_misses: 区域内连续多少次未识别后做一次全画面搜索
+        """
+        self.templates = {name: template for name, template in templates.items() if template is not None}
+        self.region = tuple(region) if region else None
+        self._max_size = (max((t.shape[1] for t in self.templates.values()), default=0),
+                          max((t.shape[0] for t in self.templates.values()), default=0))
+        self.threshold = threshold
+        self.margin = margin
+        self.max_misses = max(1, max_misses)
+        self._located = None  # 历次识别位置的包络
+        self._misses = 0
+        self._lock = threading.Lock()
+        self.identify_count = 0
+        self.full_searches = 0
+
+    def _search_region(self, frame_shape):
+        """当前搜索区域，需要全画面搜索时返回整张画面"""
+        height, width = frame_shape[:2]
+        with self._lock:
+            if self._misses >= self.max_misses or (self._located is None and self.region is None):
+                self._misses = 0
+                self.full_searches += 1
+                return (0, 0, width, height), True
+            if self._located is not None:
+                # 收紧后的区域仍要放得下最大的模板（各地图的小地图大小不同）
+                x1, y1, x2, y2 = self._located
+                pad_x = self.margin + max(0, self._max_size[0] - (x2 - x1))
+                pad_y = self.margin + max(0, self._max_size[1] - (y2 - y1))
+                region = (x1 - pad_x, y1 - pad_y, x2 + pad_x, y2 + pad_y)
+            else:
+                region = self.region
+        x1, y1, x2, y2 = region
+        return (max(0, x1), max(0, y1), min(width, x2), min(height, y2)), False
+
+    def identify(self, frame):
+        """识别当前地图
+
+        Args:
+            frame: BGR 或灰度画面
+
+        Returns:
+            tuple: (地图名称, 置信度)，未识别到时地图名称为None
+        """
+        if frame is None or frame.size == 0 or not self.templates:
+            return None, 0.0
+        self.identify_count += 1
+
+        (x1, y1, x2, y2), full_search = self._search_region(frame.shape)
+        crop = frame[y1:y2, x1:x2]
+        gray_crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+
+        names = []
+        scores = []
+        locations = []
+        for name, template in self.templates.items():
+            if gray_crop.shape[0] < template.shape[0] or gray_crop.shape[1] < template.shape[1]:
+                continue
+            result = cv2.matchTemplate(gray_crop, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            names.append(name)
+            scores.append(max_val)
+            locations.append(max_loc)
+        if not scores:
+            return None, 0.0
+
+        best = int(np.argmax(scores))
+        confidence = float(scores[best])
+        with self._lock:
+            if confidence < self.threshold:
+                if not full_search:
+                    self._misses += 1
+                return None, confidence
+            self._misses = 0
+            name = names[best]
+            template_h, template_w = self.templates[name].shape[:2]
+            box = (x1 + locations[best][0], y1 + locations[best][1],
+                   x1 + locations[best][0] + template_w, y1 + locations[best][1] + template_h)
+            if self._located is None or full_search:
+                self._located = box
+            else:
+                lx1, ly1, lx2, ly2 = self._located
+                self._located = (min(lx1, box[0]), min(ly1, box[1]), max(lx2, box[2]), max(ly2, box[3]))
+        return name, confidence
+
+    def get_stats(self):
+        """获取识别统计"""
+        return {
+            'templates': len(self.templates),
+            'identify_count': self.identify_count,
+            'full_searches': self.full_searches,
+            'located_region': self._located,
+        }
@@ -0,0 +1,451 @@
+"""
+minimap.py - 小地图分析
+右上角小地图按 3x7 网格划分，每格代表一个房间。原来逐格裁剪后分别对角色（蓝色）、Boss（红色）
+做 findContours、对门（绿色）做像素计数，每帧 63 次 OpenCV 调用；这里对整个小地图区域一次完成：
+- 三种颜色的掩码各生成一次，格子之间的边框预先清零，连通块不会跨格
+- 角色和Boss各做一次 connectedComponentsWithStats，尺寸筛选和所在格子的计算用数组运算完成
+- 门像素按格子 reshape 后求和
+返回值与 YaoqiAutomator.detect_minimap_advanced 原有的 (角色格子, 门状态, Boss格子) 一致。
+小地图只在换房间、开门时变化，MinimapTracker 对每格做哈希，只重新分析哈希变化的格子，
+并把状态变化转换成事件（RoomEntered / DoorOpened / BossRoomRevealed）供跑图逻辑使用。
+命令行用法（回归检查，与逐格实现对比）:
+    python minimap.py [录制帧目录]
+"""
+
+import zlib
+
+import cv2
+import numpy as np
+
+
+# 小地图区域 (x1, y1, x2, y2)，基于 1067x600 的游戏画面
+MINIMAP_REGION = (929, 53, 1059, 108)
+MINIMAP_ROWS = 3
+MINIMAP_COLS = 7
+# 每格四周不参与检测的边框宽度
+CELL_BORDER = 2
+
+# 角色：HSV 蓝色，外接矩形恰好 6x10
+CHARACTER_HSV_RANGE = (np.array([90, 150, 50]), np.array([130, 255, 255]))
+CHARACTER_SIZE = (6, 10)
+# Boss：BGR 红色，外接矩形宽高都在 8~12
+BOSS_BGR = np.array([2, 80, 232])
+BOSS_TOLERANCE = 30
+BOSS_SIZE_RANGE = (8, 12)
+# 门：BGR 绿色，格内像素值之和超过阈值视为开启（inRange 掩码每个像素为 255）
+DOOR_BGR = np.array([17, 135, 94])
+DOOR_TOLERANCE = 20
+DOOR_OPEN_THRESHOLD = 100
+
+
+def grid_name(row, col):
+    """格子名称（从1开始，如 '2-3'）"""
+    return f"{row + 1}-{col + 1}"
+
+
+def _color_range(bgr, tolerance):
+    return np.clip(bgr - tolerance, 0, 255), np.clip(bgr + tolerance, 0, 255)
+
+
+class MinimapAnalyzer:
+    """小地图分析器 - 整个区域一次构建掩码，向量化地得到角色、Boss所在格子和各格门状态"""
+
+    def __init__(self, region=MINIMAP_REGION, rows=MINIMAP_ROWS, cols=MINIMAP_COLS, border=CELL_BORDER):
+        """初始化小地图分析器
+
+        Args:
+            region: 小地图区域 (x1, y1, x2, y2)
+            rows, cols: 网格行列数
+            border: 每格四周不参与检测的边框宽度
+        """
+        self.region = tuple(region)
+        self.rows = rows
+        self.cols = cols
+        x1, y1, x2, y2 = self.region
+        self.cell_height = (y2 - y1) // rows
+        self.cell_width = (x2 - x1) // cols
+        self.border = border
+        self.grid_names = [grid_name(row, col) for row in range(rows) for col in range(cols)]
+        # 网格覆盖范围内的格子内部掩码（边框和网格外的余量为0）
+        height = self.cell_height * rows
+        width = self.cell_width * cols
+        inner = np.zeros((self.cell_height, self.cell_width), dtype=np.uint8)
+        inner[border:self.cell_height - border, border:self.cell_width - border] = 255
+        self._interior = np.tile(inner, (rows, cols))
+        self._grid_shape = (height, width)
+        self._boss_range = _color_range(BOSS_BGR, BOSS_TOLERANCE)
+        self._door_range = _color_range(DOOR_BGR, DOOR_TOLERANCE)
+
+    def crop(self, frame):
+        """截取小地图区域"""
+        x1, y1, x2, y2 = self.region
+        return frame[y1:y2, x1:x2]
+
+    def _masked(self, mask):
+        """只保留网格内各格内部的像素"""
+        height, width = self._grid_shape
+        return cv2.bitwise_and(mask[:height, :width], self._interior)
+
+    def _blob_cells(self, mask, min_size, max_size):
+        """连通块中外接矩形尺寸在 [min_size, max_size] 内的所在格子序号（按行优先排序）"""
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if count <= 1:
+            return np.zeros(0, dtype=np.intp)
+        stats = stats[1:]  # 去掉背景
+        widths = stats[:, cv2.CC_STAT_WIDTH]
+        heights = stats[:, cv2.CC_STAT_HEIGHT]
+        keep = ((widths >= min_size[0]) & (widths <= max_size[0])
+                & (heights >= min_size[1]) & (heights <= max_size[1]))
+        rows = stats[keep, cv2.CC_STAT_TOP] // self.cell_height
+        cols = stats[keep, cv2.CC_STAT_LEFT] // self.cell_width
+        return np.unique(rows * self.cols + cols)
+
+    def analyze_cells(self, roi):
+        """分析小地图区域，返回按格子组织的数组
+
+        Args:
+            roi: 小地图区域的 BGR 图像
+
+        Returns:
+            tuple: (有角色的格子序号数组, 有Boss的格子序号数组, 各格门像素值之和 (rows, cols))
+        """
+        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        blue_mask = self._masked(cv2.inRange(hsv, *CHARACTER_HSV_RANGE))
+        boss_mask = self._masked(cv2.inRange(roi, *self._boss_range))
+        door_mask = self._masked(cv2.inRange(roi, *self._door_range))
+
+        character_cells = self._blob_cells(blue_mask, CHARACTER_SIZE, CHARACTER_SIZE)
+        boss_cells = self._blob_cells(boss_mask, (BOSS_SIZE_RANGE[0],) * 2, (BOSS_SIZE_RANGE[1],) * 2)
+        door_sums = door_mask.reshape(self.rows, self.cell_height, self.cols, self.cell_width).sum(
+            axis=(1, 3), dtype=np.int64)
+        return character_cells, boss_cells, door_sums
+
+    def cell_slices(self, index):
+        """格子内部（去掉边框）在小地图区域中的切片 (行切片, 列切片)"""
+        row, col = divmod(index, self.cols)
+        y = row * self.cell_height
+        x = col * self.cell_width
+        return (slice(y + self.border, y + self.cell_height - self.border),
+                slice(x + self.border, x + self.cell_width - self.border))
+
+    def analyze_cell(self, roi, index):
+        """只分析一个格子
+
+        Returns:
+            tuple: (是否有角色, 是否有Boss, 门像素值之和)
+        """
+        ys, xs = self.cell_slices(index)
+        patch = roi[ys, xs]
+        blue_mask = cv2.inRange(cv2.cvtColor(patch, cv2.COLOR_BGR2HSV), *CHARACTER_HSV_RANGE)
+        boss_mask = cv2.inRange(patch, *self._boss_range)
+        door_sum = int(cv2.inRange(patch, *self._door_range).sum(dtype=np.int64))
+        has_character = len(self._blob_cells(blue_mask, CHARACTER_SIZE, CHARACTER_SIZE)) > 0
+        has_boss = len(self._blob_cells(boss_mask, (BOSS_SIZE_RANGE[0],) * 2, (BOSS_SIZE_RANGE[1],) * 2)) > 0
+        return has_character, has_boss, door_sum
+
+    def analyze(self, frame):
+        """分析一帧画面中的小地图
+
+        Returns:
+            tuple: (角色格子, {格子: 'open'/'closed'}, Boss格子)，未检测到的格子为None；
+                多个格子命中时取行优先顺序的最后一个
+        """
+        character_cells, boss_cells, door_sums = self.analyze_cells(self.crop(frame))
+        character_grid = self.grid_names[character_cells[-1]] if len(character_cells) else None
+        boss_grid = self.grid_names[boss_cells[-1]] if len(boss_cells) else None
+        door_open = door_sums.ravel() > DOOR_OPEN_THRESHOLD
+        door_states = {name: 'open' if is_open else 'closed' for name, is_open in zip(self.grid_names, door_open)}
+        return character_grid, door_states, boss_grid
+
+
+class MinimapEvent:
+    """小地图事件"""
+
+    __slots__ = ('grid',)
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.grid == other.grid
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.grid))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.grid})"
+
+
+class RoomEntered(MinimapEvent):
+    """角色进入了新的房间"""
+
+    __slots__ = ()
+
+
+class DoorOpened(MinimapEvent):
+    """房间的门开启"""
+
+    __slots__ = ()
+
+
+class BossRoomRevealed(MinimapEvent):
+    """Boss房间出现在小地图上"""
+
+    __slots__ = ()
+
+
+class MinimapTracker:
+    """小地图状态跟踪器 - 只重新分析哈希变化的格子，状态变化以事件返回"""
+
+    def __init__(self, analyzer=None, full_pass_ratio=0.5):
+        """初始化小地图跟踪器
+
+        Args:
+            analyzer: 小地图分析器，默认 MinimapAnalyzer()
+            full_pass_ratio: 变化格子占比超过该值时对整个区域做一次向量化分析（如换图、首帧）
+        """
+        self.analyzer = analyzer or MinimapAnalyzer()
+        self.cell_count = self.analyzer.rows * self.analyzer.cols
+        self.full_pass_ratio = full_pass_ratio
+        self.events = []  # 最近一次更新产生的事件
+        self.update_count = 0
+        self.reanalysed_cells = 0
+        self.full_passes = 0
+        self.reset()
+
+    def reset(self):
+        """清空状态（换图时调用），下一次更新重新分析全部格子"""
+        self._hashes = [None] * self.cell_count
+        self._character = np.zeros(self.cell_count, dtype=bool)
+        self._boss = np.zeros(self.cell_count, dtype=bool)
+        self._door_sums = np.zeros(self.cell_count, dtype=np.int64)
+        self.character_grid = None
+        self.boss_grid = None
+        self.events = []
+
+    def _cell_hashes(self, roi):
+        hashes = []
+        for index in range(self.cell_count):
+            ys, xs = self.analyzer.cell_slices(index)
+            hashes.append(zlib.crc32(np.ascontiguousarray(roi[ys, xs])))
+        return hashes
+
+    @property
+    def door_states(self):
+        """{格子: 'open'/'closed'}"""
+        door_open = self._door_sums > DOOR_OPEN_THRESHOLD
+        return {name: 'open' if is_open else 'closed' for name, is_open in zip(self.analyzer.grid_names, door_open)}
+
+    @property
+    def open_doors(self):
+        """门已开启的格子（行优先顺序）"""
+        return [self.analyzer.grid_names[i] for i in np.flatnonzero(self._door_sums > DOOR_OPEN_THRESHOLD)]
+
+    def state(self):
+        """当前状态 (角色格子, 门状态, Boss格子)，与 MinimapAnalyzer.analyze 一致"""
+        return self.character_grid, self.door_states, self.boss_grid
+
+    def update(self, frame):
+        """用一帧画面更新小地图状态
+
+        Returns:
+            list: 本次产生的事件（同时保存在 self.events）
+        """
+        return self.update_region(self.analyzer.crop(frame))
+
+    def update_region(self, roi):
+        """用已截取的小地图区域（与 analyzer.region 对应）更新小地图状态
+
+        Returns:
+            list: 本次产生的事件（同时保存在 self.events）
+        """
+        self.update_count += 1
+        hashes = self._cell_hashes(roi)
+        changed = [i for i, (old, new) in enumerate(zip(self._hashes, hashes)) if old != new]
+        self._hashes = hashes
+        if not changed:
+            self.events = []
+            return self.events
+
+        was_open = self._door_sums > DOOR_OPEN_THRESHOLD
+        if len(changed) > self.cell_count * self.full_pass_ratio:
+            self.full_passes += 1
+            character_cells, boss_cells, door_sums = self.analyzer.analyze_cells(roi)
+            self._character[:] = False
+            self._character[character_cells] = True
+            self._boss[:] = False
+            self._boss[boss_cells] = True
+            self._door_sums = door_sums.ravel().copy()
+        else:
+            self.reanalysed_cells += len(changed)
+            for index in changed:
+                self._character[index], self._boss[index], self._door_sums[index] = \
+                    self.analyzer.analyze_cell(roi, index)
+
+        events = []
+        names = self.analyzer.grid_names
+        character_cells = np.flatnonzero(self._character)
+        character_grid = names[character_cells[-1]] if len(character_cells) else None
+        if character_grid is not None and character_grid != self.character_grid:
+            events.append(RoomEntered(character_grid))
+        self.character_grid = character_grid
+        for index in np.flatnonzero((self._door_sums > DOOR_OPEN_THRESHOLD) & ~was_open):
+            events.append(DoorOpened(names[index]))
+        boss_cells = np.flatnonzero(self._boss)
+        boss_grid = names[boss_cells[-1]] if len(boss_cells) else None
+        if boss_grid is not None and boss_grid != self.boss_grid:
+            events.append(BossRoomRevealed(boss_grid))
+        self.boss_grid = boss_grid
+        self.events = events
+        return events
+
+    def get_stats(self):
+        """获取更新统计"""
+        return {
+            'update_count': self.update_count,
+            'full_passes': self.full_passes,
+            'reanalysed_cells': self.reanalysed_cells,
+            'cells_per_update': self.reanalysed_cells / self.update_count if self.update_count else 0.0,
+        }
+
+
+def analyze_by_cells(frame, region=MINIMAP_REGION):
+    """逐格实现（原 detect_minimap_advanced 的检测部分），仅用于回归对比"""
+    x1, y1, x2, y2 = region
+    roi = frame[y1:y2, x1:x2]
+    grid_height = (y2 - y1) // MINIMAP_ROWS
+    grid_width = (x2 - x1) // MINIMAP_COLS
+    door_states = {}
+    character_grid = None
+    boss_grid = None
+    lower_bgr, upper_bgr = _color_range(DOOR_BGR, DOOR_TOLERANCE)
+    lower_boss_bgr, upper_boss_bgr = _color_range(BOSS_BGR, BOSS_TOLERANCE)
+    blue_mask = cv2.inRange(cv2.cvtColor(roi, cv2.COLOR_BGR2HSV), *CHARACTER_HSV_RANGE)
+
+    for row in range(MINIMAP_ROWS):
+        for col in range(MINIMAP_COLS):
+            x = col * grid_width
+            y = row * grid_height
+            name = grid_name(row, col)
+            ys = slice(y + CELL_BORDER, y + grid_height - CELL_BORDER)
+            xs = slice(x + CELL_BORDER, x + grid_width - CELL_BORDER)
+
+            contours, _ = cv2.findContours(blue_mask[ys, xs], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            for contour in contours:
+                _, _, bw, bh = cv2.boundingRect(contour)
+                if (bw, bh) == CHARACTER_SIZE:
+                    character_grid = name
+                    break
+
+            grid_patch = roi[ys, xs]
+            boss_mask = cv2.inRange(grid_patch, lower_boss_bgr, upper_boss_bgr)
+            contours, _ = cv2.findContours(boss_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            for contour in contours:
+                _, _, bw, bh = cv2.boundingRect(contour)
+                if BOSS_SIZE_RANGE[0] <= bw <= BOSS_SIZE_RANGE[1] and BOSS_SIZE_RANGE[0] <= bh <= BOSS_SIZE_RANGE[1]:
+                    boss_grid = name
+                    break
+
+            door_mask = cv2.inRange(grid_patch, lower_bgr, upper_bgr)
+            door_states[name] = 'open' if np.sum(door_mask) > DOOR_OPEN_THRESHOLD else 'closed'
+
+    return character_grid, door_states, boss_grid
+
+
+def _synthetic_minimap(rng):
+    """随机生成一张带角色、Boss、门和杂色的小地图画面"""
+    frame = np.zeros((600, 1067, 3), dtype=np.uint8)
+    x1, y1, x2, y2 = MINIMAP_REGION
+    roi = frame[y1:y2, x1:x2]
+    roi[:] = rng.integers(20, 60, roi.shape, dtype=np.uint8)
+    cell_h = (y2 - y1) // MINIMAP_ROWS
+    cell_w = (x2 - x1) // MINIMAP_COLS
+
+    def place(color, width, height):
+        row, col = rng.integers(MINIMAP_ROWS), rng.integers(MINIMAP_COLS)
+        # 偶尔放在格子边缘，检查边框裁剪与逐格实现一致
+        x = col * cell_w + rng.integers(0, max(1, cell_w - width + 2))
+        y = row * cell_h + rng.integers(0, max(1, cell_h - height + 2))
+        roi[y:y + height, x:x + width] = color
+
+    blue = cv2.cvtColor(np.uint8([[[110, 220, 200]]]), cv2.COLOR_HSV2BGR)[0, 0]
+    for _ in range(rng.integers(0, 3)):
+        place(blue, *((6, 10) if rng.random() < 0.7 else tuple(rng.integers(3, 12, 2))))
+    for _ in range(rng.integers(0, 3)):
+        place(BOSS_BGR, *rng.integers(6, 14, 2))
+    for _ in range(rng.integers(0, 6)):
+        place(DOOR_BGR, *rng.integers(1, 5, 2))
+    return frame
+
+
+def test_minimap_analyzer(frames_dir=None, samples=500):
+    """回归检查：向量化实现与逐格实现在随机小地图（及录制帧）上的结果必须完全一致"""
+    import os
+    import time
+
+    analyzer = MinimapAnalyzer()
+    frames = []
+    if frames_dir:
+        for file_name in sorted(os.listdir(frames_dir)):
+            if file_name.lower().endswith(('.png', '.jpg', '.bmp')):
+                frame = cv2.imread(os.path.join(frames_dir, file_name))
+                if frame is not None:
+                    frames.append(frame)
+    rng = np.random.default_rng(0)
+    frames.extend(_synthetic_minimap(rng) for _ in range(samples))
+
+    old_time = new_time = 0.0
+    for i, frame in enumerate(frames):
+        start_time = time.perf_counter()
+        expected = analyze_by_cells(frame)
+        old_time += time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        actual = analyzer.analyze(frame)
+        new_time += time.perf_counter() - start_time
+        assert actual == expected, f"第 {i} 帧结果不一致: {actual} != {expected}"
+
+    print(f"✅ 小地图分析回归通过: {len(frames)} 帧，逐格 {old_time / len(frames) * 1000:.3f}ms/帧，"
+          f"向量化 {new_time / len(frames) * 1000:.3f}ms/帧")
+
+
+def test_minimap_tracker(samples=300):
+    """回归检查：跟踪器的增量状态与每帧整区分析一致，事件与状态变化对应"""
+    analyzer = MinimapAnalyzer()
+    tracker = MinimapTracker(analyzer)
+    rng = np.random.default_rng(1)
+    frame = _synthetic_minimap(rng)
+    previous = (None, {name: 'closed' for name in analyzer.grid_names}, None)
+    x1, y1, x2, y2 = MINIMAP_REGION
+    for i in range(samples):
+        if rng.random() < 0.2:
+            frame = _synthetic_minimap(rng)
+        else:
+            # 只改动一两个格子（模拟换房间、开门）
+            frame = frame.copy()
+            other = _synthetic_minimap(rng)
+            for index in rng.integers(0, analyzer.rows * analyzer.cols, rng.integers(1, 3)):
+                row, col = divmod(int(index), analyzer.cols)
+                ys = slice(y1 + row * analyzer.cell_height, y1 + (row + 1) * analyzer.cell_height)
+                xs = slice(x1 + col * analyzer.cell_width, x1 + (col + 1) * analyzer.cell_width)
+                frame[ys, xs] = other[ys, xs]
+        events = tracker.update(frame)
+        expected = analyzer.analyze(frame)
+        assert tracker.state() == expected, f"第 {i} 帧状态不一致: {tracker.state()} != {expected}"
+
+        expected_events = []
+        if expected[0] is not None and expected[0] != previous[0]:
+            expected_events.append(RoomEntered(expected[0]))
+        expected_events.extend(DoorOpened(name) for name, state in expected[1].items()
+                               if state == 'open' and previous[1][name] == 'closed')
+        if expected[2] is not None and expected[2] != previous[2]:
+            expected_events.append(BossRoomRevealed(expected[2]))
+        assert events == expected_events, f"第 {i} 帧事件不一致: {events} != {expected_events}"
+        previous = expected
+    print(f"✅ 小地图跟踪回归通过: {samples} 帧，{tracker.get_stats()}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    test_minimap_analyzer(sys.argv[1] if len(sys.argv) > 1 else None)
+    test_minimap_tracker()
@@ -0,0 +1,141 @@
+"""
+minimap_planner.py - 小地图路径规划
+把小地图的 3x7 格子看作房间图：角色所在格、Boss所在格以及门已开启的格子可以通行，
+上下左右相邻的可通行格子之间连边，用 BFS 求出到 Boss 房间的最短路径，
+再把下一跳的方向换算成画面上对应门的移动目标。
+路径会缓存，开门或Boss房出现（门状态/Boss位置变化）时失效，角色沿路径前进时直接截取剩余部分。
+路线表（route_table）没有覆盖的地图或状态由规划器兜底。
+"""
+
+from collections import deque
+
+from minimap import MINIMAP_COLS, MINIMAP_ROWS, grid_name
+from route_table import GRID_BITS
+
+
+# 各方向的门在画面上的移动目标 (x, y)，取自路线表中最常用的位置
+DOOR_TARGETS = {
+    'up': (500, 264),
+    'down': (600, 516),
+    'left': (68, 400),
+    'right': (1048, 439),
+}
+
+_DIRECTIONS = (('up', -1, 0), ('down', 1, 0), ('left', 0, -1), ('right', 0, 1))
+
+
+class MinimapPlanner:
+    """小地图路径规划器 - 房间图上 BFS 到 Boss 房间，缓存路径直到门状态变化"""
+
+    def __init__(self, rows=MINIMAP_ROWS, cols=MINIMAP_COLS, door_targets=None):
+        """初始化路径规划器
+
+        Args:
+            rows, cols: 网格行列数
+            door_targets: 各方向门的移动目标，默认 DOOR_TARGETS
+        """
+        self.rows = rows
+        self.cols = cols
+        self.door_targets = dict(door_targets or DOOR_TARGETS)
+        self.grid_names = [grid_name(row, col) for row in range(rows) for col in range(cols)]
+        # 每格的相邻格子 [(方向, 格子序号), ...]
+        self._neighbors = []
+        for row in range(rows):
+            for col in range(cols):
+                self._neighbors.append([(direction, (row + dr) * cols + col + dc)
+                                        for direction, dr, dc in _DIRECTIONS
+                                        if 0 <= row + dr < rows and 0 <= col + dc < cols])
+        self._cache_key = None  # (开门位掩码, Boss格子)
+        self._path = None  # 缓存的路径（格子序号列表，含起点）
+        self.plan_count = 0
+        self.cache_hits = 0
+
+    def invalidate(self):
+        """丢弃缓存的路径（收到开门、Boss房出现等事件时调用）"""
+        self._cache_key = None
+        self._path = None
+
+    def _bfs(self, start, goal, passable):
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if current == goal:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = previous[current]
+                return path[::-1]
+            for _, neighbor in self._neighbors[current]:
+                if neighbor not in previous and passable >> neighbor & 1:
+                    previous[neighbor] = current
+                    queue.append(neighbor)
+        return None
+
+    def plan(self, character_grid, open_mask, boss_grid):
+        """规划从角色所在格到 Boss 格的最短路径
+
+        Args:
+            character_grid: 角色所在格子
+            open_mask: 开启门的位掩码（route_table.door_mask 的结果）
+            boss_grid: Boss 所在格子
+
+        Returns:
+            list: 路径上的格子名称（含起点和终点），无法到达或信息不全时返回None
+        """
+        start = GRID_BITS.get(character_grid)
+        goal = GRID_BITS.get(boss_grid)
+        if start is None or goal is None:
+            return None
+
+        key = (open_mask, goal)
+        if key == self._cache_key and self._path is not None and start in self._path:
+            # 角色仍在缓存路径上，直接截取剩余部分
+            self.cache_hits += 1
+            path = self._path[self._path.index(start):]
+        else:
+            self.plan_count += 1
+            path = self._bfs(start, goal, open_mask | 1 << start | 1 << goal)
+            self._cache_key = key
+            self._path = path
+        return [self.grid_names[index] for index in path] if path else None
+
+    def next_target(self, character_grid, open_mask, boss_grid):
+        """下一跳的移动目标
+
+        Returns:
+            tuple: (下一格子, 方向, (x, y))，已在 Boss 房间或无路径时返回None
+        """
+        path = self.plan(character_grid, open_mask, boss_grid)
+        if not path or len(path) < 2:
+            return None
+        current = GRID_BITS[path[0]]
+        following = GRID_BITS[path[1]]
+        for direction, neighbor in self._neighbors[current]:
+            if neighbor == following:
+                return path[1], direction, self.door_targets[direction]
+        return None
+
+    def get_stats(self):
+        """获取规划统计"""
+        return {
+            'plan_count': self.plan_count,
+            'cache_hits': self.cache_hits,
+        }
+
+
+if __name__ == "__main__":
+    from route_table import door_mask
+
+    # 简单自测：1-1 出发，经 1-2、2-2、2-3 到 Boss 所在的 2-4
+    planner = MinimapPlanner()
+    doors = {name: 'closed' for name in GRID_BITS}
+    for name in ('1-2', '2-2', '2-3', '3-1'):
+        doors[name] = 'open'
+    mask = door_mask(doors)
+    assert planner.plan('1-1', mask, '2-4') == ['1-1', '1-2', '2-2', '2-3', '2-4']
+    assert planner.next_target('1-1', mask, '2-4') == ('1-2', 'right', DOOR_TARGETS['right'])
+    assert planner.next_target('1-2', mask, '2-4') == ('2-2', 'down', DOOR_TARGETS['down'])
+    assert planner.cache_hits == 2, "沿路径前进不应重新规划"
+    assert planner.plan('3-1', mask, '2-4') is None, "不连通时应返回None"
+    print(f"✅ 小地图路径规划自测通过: {planner.get_stats()}")
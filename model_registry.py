@@ -0,0 +1,117 @@
+"""
+model_registry.py - 检测模型注册表
+进程内每个模型只加载一次，加载后立即用空白帧预热，
+各模块通过 acquire/release 共享同一个检测器并做引用计数。
+加载参数（max_det 等）也是共享键的一部分：参数不同的获取得到各自的实例，不会因加载顺序拿到别人的配置
+"""
+
+import inspect
+import threading
+import time
+
+import numpy as np
+
+from detectors import DETECTOR_BACKENDS, create_detector
+
+
+# 预热帧尺寸与游戏截图一致 (高, 宽)
+WARMUP_FRAME_SHAPE = (600, 1067, 3)
+
+
+class ModelRegistry:
+    """检测模型注册表 - 线程安全，按 (后端, 模型路径, 加载参数) 共享"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # (后端, 模型路径, 加载参数) -> {'detector': 检测器, 'refcount': 引用数, 'kwargs': 首次加载的参数}
+
+    @staticmethod
+    def _load_options(detector_cls, kwargs):
+        """补全后端构造函数的默认值后的加载参数（省略参数与显式传入默认值视为同一配置）"""
+        options = dict(kwargs)
+        if detector_cls is not None:
+            try:
+                bound = inspect.signature(detector_cls.__init__).bind_partial(None, **kwargs)
+                bound.apply_defaults()
+                options = {name: value for name, value in list(bound.arguments.items())[1:]
+                           if name != 'model_path'}
+            except TypeError:
+                pass  # 参数不合法时由 create_detector 报错
+        return tuple(sorted((name, repr(value)) for name, value in options.items()))
+
+    def acquire(self, backend="PyTorch", model_path=None, warmup=True, **kwargs):
+        """
+        获取共享检测器，首次获取时加载并预热
+
+        Args:
+            backend: 后端名称
+            model_path: 模型路径，默认使用后端的默认模型
+            warmup: 加载后是否运行一次预热推理
+            **kwargs: 传给后端的参数，参数（补全默认值后）相同的获取共享同一个实例
+
+        Returns:
+            DetectorBackend: 检测器，加载失败返回None
+        """
+        detector_cls = DETECTOR_BACKENDS.get(backend)
+        if model_path is None and detector_cls is not None:
+            model_path = detector_cls.default_model_path
+        key = (backend, model_path, self._load_options(detector_cls, kwargs))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if any(loaded[:2] == key[:2] for loaded in self._entries):
+                    print(f"⚠️ 检测模型 {backend} {model_path} 已按其他参数加载，按参数 {kwargs} 另行加载")
+                print(f"⚡ 首次加载检测模型: {backend} {model_path}")
+                detector = create_detector(backend, model_path=model_path, **kwargs)
+                if detector is None:
+                    return None
+                if warmup:
+                    self._warm_up(detector)
+                entry = {'detector': detector, 'refcount': 0, 'kwargs': dict(kwargs)}
+                self._entries[key] = entry
+            entry['refcount'] += 1
+            print(f"📋 共享检测模型 {backend}，引用数: {entry['refcount']}")
+            return entry['detector']
+
+    def release(self, detector):
+        """释放一次引用，引用数归零时卸载模型"""
+        if detector is None:
+            return
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry['detector'] is detector:
+                    entry['refcount'] -= 1
+                    if entry['refcount'] <= 0:
+                        del self._entries[key]
+                        print(f"🗑️ 检测模型已卸载: {key[0]}")
+                    return
+
+    @staticmethod
+    def _warm_up(detector):
+        """用空白帧运行一次推理，消除首帧的初始化延迟"""
+        try:
+            start_time = time.time()
+            detector.detect(np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8))
+            print(f"🔥 检测模型预热完成，耗时 {(time.time() - start_time) * 1000:.0f}ms")
+        except Exception as e:
+            print(f"检测模型预热失败: {e}")
+
+    def get_status(self):
+        """获取已加载模型及引用数"""
+        with self._lock:
+            return {f"{backend}:{path}" + (f" {entry['kwargs']}" if entry['kwargs'] else ""): entry['refcount']
+                    for (backend, path, _), entry in self._entries.items()}
+
+
+# 全局模型注册表实例
+model_registry = ModelRegistry()
+
+
+def acquire_detector(backend="PyTorch", model_path=None, **kwargs):
+    """获取共享检测器的便捷函数"""
+    return model_registry.acquire(backend, model_path, **kwargs)
+
+
+def release_detector(detector):
+    """释放共享检测器的便捷函数"""
+    model_registry.release(detector)
@@ -0,0 +1,406 @@
+"""
+model_tools.py - 检测模型工具
+命令行用法:
+    python model_tools.py export-onnx --weights models/best.pt --output models/best.onnx
+    python model_tools.py benchmark --frames recordings/frames --labels recordings/labels \
+        --backend OpenVINO --sizes 640x640 640x384 512x288
+    python model_tools.py quantize --frames recordings/frames --labels recordings/labels --backend OpenVINO
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+def export_onnx(weights='models/best.pt', output='models/best.onnx', imgsz=640, opset=12,
+                dynamic=False, simplify=True):
+    """
+    从训练权重导出 ONNX 模型，供 ONNX Runtime 后端使用
+
+    Args:
+        weights: ultralytics 训练权重路径
+        output: 导出的 .onnx 路径
+        imgsz: 输入尺寸，整数或 (高, 宽)
+        opset: ONNX opset 版本
+        dynamic: 是否导出动态输入尺寸
+        simplify: 是否用 onnxslim/onnxsim 简化计算图
+
+    Returns:
+        str: 导出文件路径，失败返回None
+    """
+    try:
+        from ultralytics import YOLO
+        model = YOLO(weights)
+        exported = model.export(format='onnx', imgsz=imgsz, opset=opset, dynamic=dynamic,
+                                simplify=simplify, device='cpu')
+        exported = str(exported)
+        if output and os.path.abspath(exported) != os.path.abspath(output):
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+            shutil.move(exported, output)
+            exported = output
+        print(f"✅ ONNX模型导出完成: {exported}")
+        return exported
+    except Exception as e:
+        print(f"❌ ONNX模型导出失败: {e}")
+        return None
+
+
+# 基准测试评估的类别
+BENCHMARK_CLASSES = ('chenghao', 'monster', 'boss', 'door')
+
+
+def _load_yolo_labels(label_path, image_shape, class_names):
+    """读取 YOLO 格式标注（类别id cx cy w h，归一化坐标），返回 {类别名: xyxy数组}"""
+    height, width = image_shape[:2]
+    boxes = {}
+    if not os.path.exists(label_path):
+        return boxes
+    with open(label_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            cls_id = int(parts[0])
+            if cls_id >= len(class_names):
+                continue
+            cx, cy, w, h = (float(v) for v in parts[1:5])
+            box = [(cx - w / 2) * width, (cy - h / 2) * height, (cx + w / 2) * width, (cy + h / 2) * height]
+            boxes.setdefault(class_names[cls_id], []).append(box)
+    return {name: np.array(items, dtype=np.float32) for name, items in boxes.items()}
+
+
+def _average_precision(predictions, num_gt, iou_threshold=0.5):
+    """按 VOC 全点插值计算单个类别的 AP
+
+    Args:
+        predictions: [(置信度, 预测框, 该帧真值框数组, 该帧真值已匹配标记), ...]
+        num_gt: 真值框总数
+    """
+    from tracker import iou_matrix
+
+    if num_gt == 0:
+        return None
+    if not predictions:
+        return 0.0
+    predictions = sorted(predictions, key=lambda item: item[0], reverse=True)
+    tp = np.zeros(len(predictions))
+    for i, (_, box, gt_boxes, gt_used) in enumerate(predictions):
+        if len(gt_boxes) == 0:
+            continue
+        ious = iou_matrix([box], gt_boxes)[0]
+        best = int(ious.argmax())
+        if ious[best] >= iou_threshold and not gt_used[best]:
+            gt_used[best] = True
+            tp[i] = 1
+    tp_cum = np.cumsum(tp)
+    recall = tp_cum / num_gt
+    precision = tp_cum / np.arange(1, len(predictions) + 1)
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    changed = np.where(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[changed + 1] - recall[changed]) * precision[changed + 1]))
+
+
+def _load_frames(frames_dir):
+    """载入录制帧目录，返回 [(文件名, RGB图像), ...]"""
+    import cv2
+
+    frame_paths = sorted(p for ext in ('*.png', '*.jpg', '*.bmp') for p in glob.glob(os.path.join(frames_dir, ext)))
+    frames = []
+    for path in frame_paths:
+        image = cv2.imread(path)
+        if image is not None:
+            frames.append((os.path.splitext(os.path.basename(path))[0], cv2.cvtColor(image, cv2.COLOR_BGR2RGB)))
+    if frames:
+        print(f"📂 载入 {len(frames)} 帧: {frames_dir}")
+    else:
+        print(f"❌ 没有找到录制帧: {frames_dir}")
+    return frames
+
+
+def _evaluate(detector, frames, labels_dir=None, runs=1):
+    """在录制帧上测量检测器的推理耗时，有标注时同时计算各类别 AP@0.5"""
+    from detectors import DEFAULT_CLASS_NAMES
+
+    detector.detect(frames[0][1])  # 预热
+    latencies = []
+    predictions = {name: [] for name in BENCHMARK_CLASSES}
+    num_gt = {name: 0 for name in BENCHMARK_CLASSES}
+    for frame_name, frame in frames:
+        for _ in range(max(1, runs)):
+            start_time = time.perf_counter()
+            arrays = detector.detect(frame)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+        if labels_dir is None:
+            continue
+        gt = _load_yolo_labels(os.path.join(labels_dir, frame_name + '.txt'), frame.shape, DEFAULT_CLASS_NAMES)
+        for name in BENCHMARK_CLASSES:
+            gt_boxes = gt.get(name, np.zeros((0, 4), dtype=np.float32))
+            num_gt[name] += len(gt_boxes)
+            gt_used = np.zeros(len(gt_boxes), dtype=bool)
+            keep = arrays.mask(name)
+            for box, conf in zip(arrays.xyxy[keep], arrays.conf[keep]):
+                predictions[name].append((float(conf), box, gt_boxes, gt_used))
+
+    latencies = np.array(latencies)
+    result = {
+        'mean_ms': float(latencies.mean()),
+        'p95_ms': float(np.percentile(latencies, 95)),
+    }
+    if labels_dir is not None:
+        aps = {name: _average_precision(predictions[name], num_gt[name]) for name in BENCHMARK_CLASSES}
+        valid = [ap for ap in aps.values() if ap is not None]
+        result['ap50'] = aps
+        result['map50'] = float(np.mean(valid)) if valid else None
+    return result
+
+
+def benchmark(frames_dir, labels_dir=None, backend='OpenVINO', sizes=((640, 640),), runs=1, model_path=None):
+    """
+    在录制的游戏帧上比较不同输入尺寸的推理耗时和精度
+
+    Args:
+        frames_dir: 录制帧目录（BGR 截图，png/jpg）
+        labels_dir: 同名 YOLO txt 标注目录，类别id按 detectors.DEFAULT_CLASS_NAMES；None 只测耗时
+        backend: 检测后端名称
+        sizes: 候选输入尺寸 [(宽, 高), ...]
+        runs: 每帧重复推理次数
+        model_path: 模型路径，默认使用后端的默认模型
+
+    Returns:
+        list: 每个尺寸的结果字典
+    """
+    from detectors import create_detector
+
+    frames = _load_frames(frames_dir)
+    if not frames:
+        return []
+
+    results = []
+    for input_size in sizes:
+        detector = create_detector(backend, model_path=model_path, input_size=input_size)
+        if detector is None:
+            continue
+        actual_size = detector.input_size or input_size
+        result = _evaluate(detector, frames, labels_dir, runs)
+        result['label'] = f"{actual_size[0]}x{actual_size[1]}"
+        results.append(result)
+        del detector
+
+    _print_benchmark(f"{backend} 输入尺寸基准测试", results)
+    return results
+
+
+def _calibration_blob(frame_rgb, input_size):
+    """与检测器相同的预处理：letterbox + NCHW float32 归一化"""
+    from detectors import letterbox
+
+    padded, _, _ = letterbox(frame_rgb, input_size)
+    return np.ascontiguousarray(padded.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def _int8_output_path(model_path):
+    """量化模型与原模型放在同一目录，如 models/best.xml -> models/best_int8.xml"""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}_int8{ext}"
+
+
+def _quantize_openvino(model_path, output_path, calibration_frames, subset_size):
+    """用 NNCF 对 OpenVINO IR 做训练后 INT8 量化"""
+    import nncf
+    import openvino as ov
+
+    core = ov.Core()
+    model = core.read_model(model_path)
+    _, _, input_h, input_w = model.input(0).get_shape()
+    dataset = nncf.Dataset([frame for _, frame in calibration_frames],
+                           lambda frame: _calibration_blob(frame, (input_w, input_h)))
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=min(subset_size, len(calibration_frames)))
+    ov.save_model(quantized, output_path)
+
+
+def _quantize_onnx(model_path, output_path, calibration_frames, subset_size):
+    """用 ONNX Runtime 静态量化（QDQ 格式，逐通道权重）"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    model_input = ort.InferenceSession(model_path, providers=['CPUExecutionProvider']).get_inputs()[0]
+    _, _, input_h, input_w = model_input.shape
+    if not isinstance(input_h, int) or not isinstance(input_w, int):
+        input_h, input_w = 640, 640
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._frames = iter(calibration_frames[:subset_size])
+
+        def get_next(self):
+            item = next(self._frames, None)
+            if item is None:
+                return None
+            return {model_input.name: _calibration_blob(item[1], (input_w, input_h))}
+
+    preprocessed_path = output_path + '.prep.onnx'
+    try:
+        quant_pre_process(model_path, preprocessed_path)
+        source_path = preprocessed_path
+    except Exception as e:
+        print(f"⚠️ ONNX量化预处理失败，直接量化原模型: {e}")
+        source_path = model_path
+    try:
+        quantize_static(source_path, output_path, FrameReader(), quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    finally:
+        if os.path.exists(preprocessed_path):
+            os.remove(preprocessed_path)
+
+
+def quantize(frames_dir, labels_dir=None, backend='OpenVINO', model_path=None, output_path=None,
+             holdout_ratio=0.2, subset_size=300, runs=1):
+    """
+    用录制的游戏帧做校准，把检测模型量化为 INT8，并在留出集上对比 FP32 的耗时和精度
+
+    Args:
+        frames_dir: 录制帧目录，前一部分用于校准，最后 holdout_ratio 比例的帧用于评估
+        labels_dir: 评估用的 YOLO txt 标注目录；None 只对比耗时
+        backend: 'OpenVINO'（NNCF 量化 IR）或 'ONNX Runtime'（静态量化）
+        model_path: FP32 模型路径，默认使用后端的默认模型
+        output_path: 量化模型路径，默认在原模型旁加 _int8 后缀
+        holdout_ratio: 留出评估集的比例
+        subset_size: 最多使用多少帧校准
+        runs: 评估时每帧重复推理次数
+
+    Returns:
+        str: 量化模型路径，失败返回None
+    """
+    from detectors import DETECTOR_BACKENDS, create_detector
+
+    quantizers = {'OpenVINO': _quantize_openvino, 'ONNX Runtime': _quantize_onnx}
+    if backend not in quantizers:
+        print(f"❌ 不支持量化的后端: {backend}，可选: {list(quantizers)}")
+        return None
+    model_path = model_path or DETECTOR_BACKENDS[backend].default_model_path
+    output_path = output_path or _int8_output_path(model_path)
+
+    frames = _load_frames(frames_dir)
+    if len(frames) < 2:
+        print("❌ 录制帧太少，无法划分校准集和评估集")
+        return None
+    # 按文件名顺序切分，留出集取录制末尾的连续片段，避免与校准帧过于相似
+    holdout_count = min(len(frames) - 1, max(1, int(len(frames) * holdout_ratio)))
+    calibration_frames, holdout_frames = frames[:-holdout_count], frames[-holdout_count:]
+    print(f"🎯 校准帧 {len(calibration_frames)}，评估帧 {len(holdout_frames)}")
+
+    try:
+        start_time = time.time()
+        quantizers[backend](model_path, output_path, calibration_frames, subset_size)
+        print(f"✅ INT8量化完成: {output_path}，耗时 {time.time() - start_time:.0f}s")
+    except Exception as e:
+        print(f"❌ INT8量化失败: {e}")
+        return None
+
+    results = []
+    for label, path in (('FP32', model_path), ('INT8', output_path)):
+        detector = create_detector(backend, model_path=path)
+        if detector is None:
+            continue
+        result = _evaluate(detector, holdout_frames, labels_dir, runs)
+        result['label'] = label
+        results.append(result)
+        del detector
+    _print_benchmark(f"{backend} INT8 vs FP32（留出集 {len(holdout_frames)} 帧）", results)
+    if len(results) == 2:
+        fp32, int8 = results
+        print(f"⚡ 加速比: {fp32['mean_ms'] / max(int8['mean_ms'], 1e-6):.2f}x")
+        if fp32.get('map50') is not None and int8.get('map50') is not None:
+            print(f"🎯 mAP50 变化: {int8['map50'] - fp32['map50']:+.3f}")
+    return output_path
+
+
+def _print_benchmark(title, results):
+    """打印基准测试结果表"""
+    print(f"\n📊 {title}")
+    header = f"{'配置':<10}{'平均ms':>10}{'P95ms':>10}"
+    has_ap = any('ap50' in r for r in results)
+    if has_ap:
+        header += ''.join(f"{name:>10}" for name in BENCHMARK_CLASSES) + f"{'mAP50':>10}"
+    print(header)
+    for r in results:
+        line = f"{r['label']:<10}{r['mean_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+        if has_ap:
+            for name in BENCHMARK_CLASSES:
+                ap = r['ap50'][name]
+                line += f"{'-' if ap is None else f'{ap:.3f}':>10}"
+            map50 = r['map50']
+            line += f"{'-' if map50 is None else f'{map50:.3f}':>10}"
+        print(line)
+
+
+def _parse_size(value):
+    """命令行尺寸参数 宽x高，如 640x384"""
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height or width)
+
+
+def _parse_imgsz(values):
+    """命令行尺寸参数：一个值为正方形，两个值为 高 宽"""
+    return values[0] if len(values) == 1 else tuple(values[:2])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检测模型工具")
+    subparsers = parser.add_subparsers(dest='command')
+
+    export_parser = subparsers.add_parser('export-onnx', help="从训练权重导出ONNX模型")
+    export_parser.add_argument('--weights', default='models/best.pt', help="训练权重路径")
+    export_parser.add_argument('--output', default='models/best.onnx', help="导出的.onnx路径")
+    export_parser.add_argument('--imgsz', type=int, nargs='+', default=[640], help="输入尺寸: 640 或 高 宽")
+    export_parser.add_argument('--opset', type=int, default=12, help="ONNX opset 版本")
+    export_parser.add_argument('--dynamic', action='store_true', help="导出动态输入尺寸")
+    export_parser.add_argument('--no-simplify', action='store_true', help="不简化计算图")
+
+    bench_parser = subparsers.add_parser('benchmark', help="比较不同输入尺寸的推理耗时和精度")
+    bench_parser.add_argument('--frames', required=True, help="录制帧目录")
+    bench_parser.add_argument('--labels', default=None, help="YOLO格式标注目录（不提供则只测耗时）")
+    bench_parser.add_argument('--backend', default='OpenVINO', help="检测后端: PyTorch/OpenVINO/ONNX Runtime")
+    bench_parser.add_argument('--model', default=None, help="模型路径，默认使用后端的默认模型")
+    bench_parser.add_argument('--sizes', type=_parse_size, nargs='+', default=[(640, 640), (640, 384)],
+                              help="候选输入尺寸 宽x高，如 640x640 640x384 512x288")
+    bench_parser.add_argument('--runs', type=int, default=3, help="每帧重复推理次数")
+
+    quant_parser = subparsers.add_parser('quantize', help="用录制帧校准并量化为INT8")
+    quant_parser.add_argument('--frames', required=True, help="录制帧目录（末尾部分作为留出评估集）")
+    quant_parser.add_argument('--labels', default=None, help="YOLO格式标注目录（不提供则只对比耗时）")
+    quant_parser.add_argument('--backend', default='OpenVINO', help="OpenVINO 或 ONNX Runtime")
+    quant_parser.add_argument('--model', default=None, help="FP32模型路径，默认使用后端的默认模型")
+    quant_parser.add_argument('--output', default=None, help="量化模型路径，默认 <模型名>_int8")
+    quant_parser.add_argument('--holdout', type=float, default=0.2, help="留出评估集比例")
+    quant_parser.add_argument('--subset-size', type=int, default=300, help="最多使用的校准帧数")
+    quant_parser.add_argument('--runs', type=int, default=3, help="评估时每帧重复推理次数")
+
+    args = parser.parse_args(argv)
+    if args.command == 'export-onnx':
+        result = export_onnx(args.weights, args.output, _parse_imgsz(args.imgsz), args.opset,
+                             args.dynamic, not args.no_simplify)
+        return 0 if result else 1
+    if args.command == 'benchmark':
+        results = benchmark(args.frames, args.labels, args.backend, args.sizes, args.runs, args.model)
+        return 0 if results else 1
+    if args.command == 'quantize':
+        result = quantize(args.frames, args.labels, args.backend, args.model, args.output,
+                          args.holdout, args.subset_size, args.runs)
+        return 0 if result else 1
+
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+"""
+pipeline.py - 截图 → 推理 → 决策 流水线
+三个阶段各自运行在独立线程上：
+- 截图：screen_capture 的后台抓帧线程，写入环形缓冲区（满了丢最旧）
+- 推理：本模块的推理线程，始终取最新一帧做检测，结果写入单槽信箱（新结果覆盖旧结果）
+- 决策：自动化线程读取信箱中最新的检测结果后执行键鼠操作
+执行移动等耗时操作时，截图和推理不会停下，决策拿到的结果最多落后一次推理
+流水线未启动时 get_result 退化为在调用线程上同步截图+检测
+当前状态不可能出现检测目标时（如城镇导航）可暂停检测器，期间只做跟踪预测
+"""
+
+import threading
+import time
+
+from detectors import DetectionArrays
+from frame_analysis import FrameAnalysis
+from screen_capture import capture_service
+
+
+class PerceptionResult:
+    """一次感知结果：截图帧 + 检测结果"""
+
+    __slots__ = ('captured', 'analysis')
+
+    def __init__(self, captured, analysis):
+        self.captured = captured
+        self.analysis = analysis
+
+    @property
+    def frame(self):
+        """BGR图像（只读）"""
+        return self.captured.image
+
+    @property
+    def frame_id(self):
+        return self.captured.frame_id
+
+    @property
+    def timestamp(self):
+        return self.captured.timestamp
+
+
+class PerceptionPipeline:
+    """感知流水线 - 后台推理线程 + 单槽结果信箱"""
+
+    def __init__(self, frame_analyzer, capture=None, max_inference_fps=15.0, tracker=None):
+        """初始化感知流水线
+
+        Args:
+            frame_analyzer: 帧分析器（frame_analysis.FrameAnalyzer）
+            capture: 截图服务，默认使用全局 capture_service
+            max_inference_fps: 推理线程的最高帧率，避免空转占满CPU
+            tracker: 多目标跟踪器（tracker.ObjectTracker），设置后检测器每N帧运行一次
+        """
+        self.frame_analyzer = frame_analyzer
+        self.capture = capture or capture_service
+        self.tracker = tracker
+        self.detection_enabled = True
+        self.detection_count = 0
+        self.paused_count = 0  # 检测器暂停期间处理的帧数
+        self.min_interval = 1.0 / max_inference_fps if max_inference_fps > 0 else 0.0
+        self._condition = threading.Condition()
+        self._latest = None
+        self._consumed = True
+        self._running = False
+        self._thread = None
+        self.inference_count = 0
+        self.dropped_count = 0  # 未被决策线程取走就被覆盖的结果数
+
+    def start(self):
+        """启动推理线程（重复调用无副作用）"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._latest = None
+            self._consumed = True
+            self._thread = threading.Thread(target=self._inference_loop, name="PerceptionPipeline", daemon=True)
+            self._thread.start()
+        print("🔁 感知流水线已启动")
+
+    def stop(self):
+        """停止推理线程"""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify_all()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=3)
+        self._thread = None
+        print(f"🔁 感知流水线已停止，推理 {self.inference_count} 次，丢弃 {self.dropped_count} 个过期结果")
+
+    def is_running(self):
+        return self._running
+
+    def set_detection_enabled(self, enabled):
+        """暂停/恢复检测器（暂停期间只用跟踪预测，不运行推理）
+
+        恢复时丢弃信箱中暂停期间的结果，之后取到的都是恢复后的结果
+        """
+        enabled = bool(enabled)
+        with self._condition:
+            if enabled == self.detection_enabled:
+                return
+            self.detection_enabled = enabled
+            if enabled:
+                self._latest = None
+                self._consumed = True
+        print(f"🔁 感知流水线检测器已{'恢复' if enabled else '暂停'}")
+
+    def _inference_loop(self):
+        """推理循环 - 每次都取最新一帧，跳过推理期间积压的旧帧"""
+        last_frame_id = None
+        while self._running:
+            loop_start = time.time()
+            try:
+                captured = self.capture.get_latest(timeout=1.0)
+                if captured is None:
+                    continue
+                if captured.frame_id == last_frame_id:
+                    # 等待新帧，然后直接跳到最新一帧
+                    if self.capture.get_after(captured.timestamp, timeout=1.0) is None:
+                        continue
+                    captured = self.capture.get_latest(timeout=1.0)
+                    if captured is None or captured.frame_id == last_frame_id:
+                        continue
+
+                detect = self.detection_enabled
+                analysis = self._perceive(captured, detect)
+                last_frame_id = captured.frame_id
+                self.inference_count += 1
+
+                with self._condition:
+                    # 暂停期间开始处理、恢复后才完成的结果已过期，不放入信箱
+                    if detect or not self.detection_enabled:
+                        if not self._consumed:
+                            self.dropped_count += 1
+                        self._latest = PerceptionResult(captured, analysis)
+                        self._consumed = False
+                        self._condition.notify_all()
+            except Exception as e:
+                print(f"感知流水线推理失败: {e}")
+                time.sleep(0.5)
+
+            remaining = self.min_interval - (time.time() - loop_start)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def get_result(self, after=None, timeout=1.0):
+        """获取最新的感知结果
+
+        Args:
+            after: 只接受抓取时间晚于该时间的结果（如上一次操作结束的时间）
+            timeout: 最长等待秒数
+
+        Returns:
+            PerceptionResult: 最新结果，超时返回None
+        """
+        if not self._running:
+            return self._get_result_sync(after, timeout)
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                latest = self._latest
+                if latest is not None and (after is None or latest.timestamp > after):
+                    self._consumed = True
+                    return latest
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._condition.wait(remaining)
+
+    def _get_result_sync(self, after, timeout):
+        """流水线未启动时，在调用线程上直接截图并检测"""
+        if after is None:
+            captured = self.capture.get_latest(timeout)
+        else:
+            captured = self.capture.get_after(after, timeout)
+        if captured is None:
+            return None
+        return PerceptionResult(captured, self._perceive(captured, self.detection_enabled))
+
+    def _perceive(self, captured, detect=True):
+        """分析一帧：需要时运行检测器并更新跟踪，否则用跟踪预测代替检测（detect 为False时不运行检测器）"""
+        if detect and (self.tracker is None or self.tracker.needs_detection()):
+            analysis = self.frame_analyzer.analyze_captured(captured)
+            self.detection_count += 1
+            if self.tracker is not None:
+                self.tracker.update(analysis.detections, captured.timestamp)
+            return analysis
+
+        if not detect:
+            self.paused_count += 1
+        detections = self.tracker.predict(captured.timestamp) if self.tracker is not None else []
+        analysis = FrameAnalysis(captured.frame_id, captured.timestamp, DetectionArrays.from_detections(detections),
+                                 predicted=True, detections=detections)
+        self.frame_analyzer.remember(captured, analysis)
+        return analysis
+
+    def get_status(self):
+        """获取流水线状态"""
+        latest = self._latest
+        return {
+            'is_running': self._running,
+            'inference_count': self.inference_count,
+            'detection_count': self.detection_count,
+            'detection_enabled': self.detection_enabled,
+            'paused_count': self.paused_count,
+            'dropped_count': self.dropped_count,
+            'latest_frame_id': latest.frame_id if latest else None,
+            'latest_result_age': time.time() - latest.timestamp if latest else None,
+        }
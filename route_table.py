@@ -0,0 +1,130 @@
+"""
+route_table.py - 副本跑图路线表
+每张地图的路线以数据形式保存在 routes/yaoqi_routes.json：
+    {"ditu1": [{"grid": "1-2", "doors": ["1-2", "1-3"], "target": [1048, 439]}, ...], ...}
+含义：角色在 grid 格子、且 doors 中任一扇门开启时，移动到 target 像素位置（可选 label 为日志中的目标描述）。
+加载时编译为 {地图: {格子: (路线, ...)}}，门条件预先转换成 3x7 网格的位掩码，
+跑图时一次字典查找加一次按位与即可得到目标，新增地图只需要添加数据。
+"""
+
+import json
+import os
+
+from minimap import MINIMAP_COLS, MINIMAP_ROWS, grid_name
+from template_store import resource_path
+
+
+# 默认路线表文件
+DEFAULT_ROUTES_PATH = os.path.join('routes', 'yaoqi_routes.json')
+
+# 格子名称 -> 位序号（行优先，与小地图分析器的格子顺序一致）
+GRID_BITS = {grid_name(row, col): row * MINIMAP_COLS + col
+             for row in range(MINIMAP_ROWS) for col in range(MINIMAP_COLS)}
+_GRID_BY_BIT = {bit: name for name, bit in GRID_BITS.items()}
+
+
+def door_mask(door_states):
+    """门状态 {格子: 'open'/'closed'} 转换为开启门的位掩码"""
+    mask = 0
+    for name, state in door_states.items():
+        if state == 'open':
+            bit = GRID_BITS.get(name)
+            if bit is not None:
+                mask |= 1 << bit
+    return mask
+
+
+def mask_grids(mask):
+    """位掩码中的格子名称（行优先顺序）"""
+    return [_GRID_BY_BIT[bit] for bit in range(len(_GRID_BY_BIT)) if mask >> bit & 1]
+
+
+class Route:
+    """编译后的一条路线"""
+
+    __slots__ = ('grid', 'door_mask', 'target', 'label')
+
+    def __init__(self, grid, door_mask, target, label):
+        self.grid = grid
+        self.door_mask = door_mask  # 任一位对应的门开启即触发
+        self.target = target
+        self.label = label
+
+    def __repr__(self):
+        return f"Route({self.grid}, doors={mask_grids(self.door_mask)}, target={self.target})"
+
+
+def compile_routes(table):
+    """把路线表编译为 {地图: {格子: (Route, ...)}}
+
+    同一格子有多条路线时按表中顺序，第一条门条件满足的生效
+
+    Raises:
+        ValueError: 格子名称未知或目标格式错误
+    """
+    compiled = {}
+    for map_name, rules in table.items():
+        by_grid = {}
+        for i, rule in enumerate(rules):
+            grid = rule.get('grid')
+            doors = rule.get('doors', [])
+            target = rule.get('target')
+            unknown = [name for name in [grid, *doors] if name not in GRID_BITS]
+            if unknown:
+                raise ValueError(f"路线表 {map_name} 第 {i + 1} 条: 未知的格子 {unknown}")
+            if not isinstance(target, (list, tuple)) or len(target) != 2:
+                raise ValueError(f"路线表 {map_name} 第 {i + 1} 条: 目标应为 [x, y]，实际为 {target}")
+            mask = 0
+            for name in doors:
+                mask |= 1 << GRID_BITS[name]
+            x, y = int(target[0]), int(target[1])
+            route = Route(grid, mask, (x, y), rule.get('label') or f"({x}, {y})")
+            by_grid[grid] = by_grid.get(grid, ()) + (route,)
+        compiled[map_name] = by_grid
+    return compiled
+
+
+class RouteTable:
+    """跑图路线表 - 按 (地图, 角色格子, 开门位掩码) 查找移动目标"""
+
+    def __init__(self, table):
+        """初始化路线表
+
+        Args:
+            table: 路线表数据 {地图: [{grid, doors, target, label?}, ...]}
+        """
+        self._routes = compile_routes(table)
+
+    @classmethod
+    def load(cls, path=DEFAULT_ROUTES_PATH):
+        """从 JSON 文件加载路线表（相对路径按资源目录解析）"""
+        if not os.path.isabs(path):
+            path = resource_path(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        route_table = cls(table)
+        print(f"🗺️ 已加载跑图路线表: {len(route_table.maps)} 张地图 ({path})")
+        return route_table
+
+    @property
+    def maps(self):
+        return list(self._routes)
+
+    def __contains__(self, map_name):
+        return map_name in self._routes
+
+    def lookup(self, map_name, character_grid, open_mask):
+        """查找当前应执行的路线
+
+        Args:
+            map_name: 地图名称
+            character_grid: 角色所在格子
+            open_mask: 开启门的位掩码（door_mask 的结果）
+
+        Returns:
+            Route: 命中的路线，没有时返回None
+        """
+        for route in self._routes.get(map_name, {}).get(character_grid, ()):
+            if route.door_mask & open_mask:
+                return route
+        return None
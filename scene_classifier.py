@@ -0,0 +1,274 @@
+"""
+scene_classifier.py - 基于感知哈希的场景分类
+对几个位置固定的界面锚点区域（小地图、技能栏、画面中部）计算 dHash，
+在哈希表中查找最近的样本得到场景标签（城镇/副本/翻牌/菜单），一次分类远小于1毫秒。
+只有分类结果不确定时才需要做模板匹配；模板匹配确认的结果会作为新样本加入哈希表并保存到磁盘，
+运行越久需要模板匹配的帧越少。
+各自动化流程（yaoqi / shenyuan）的场景标签含义不同，各用一张哈希表（scene_table_path(命名空间)）；
+保存时与磁盘上的表合并，多个进程/流程先后保存不会互相覆盖样本。
+命令行用法（按 <目录>/<场景标签>/*.png 整理的录制帧为某个流程预先建表）:
+    python scene_classifier.py yaoqi recordings/scenes
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+# 场景标签
+SCENE_TOWN = 'town'
+SCENE_DUNGEON = 'dungeon'
+SCENE_FANPAI = 'fanpai'
+SCENE_MENU = 'menu'
+
+# 锚点区域 (x1, y1, x2, y2)，基于 1067x600 的游戏画面
+SCENE_ANCHORS = {
+    'minimap': (929, 53, 1059, 108),
+    'skill_bar': (434, 534, 619, 593),
+    'center': (333, 150, 733, 450),
+}
+
+# 哈希表目录，与程序配置放在同一目录
+DEFAULT_TABLE_DIR = Path.home() / ".game_script_config"
+
+
+def scene_table_path(namespace):
+    """某个自动化流程的哈希表文件（如 'yaoqi' -> scene_hashes_yaoqi.json）"""
+    return DEFAULT_TABLE_DIR / f"scene_hashes_{namespace}.json"
+
+# 0~255 每个字节中 1 的个数，用于按字节查表计算汉明距离
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def dhash(gray_region, hash_size=8):
+    """差值哈希：缩小到 (hash_size+1) x hash_size 后比较相邻像素，返回 64 位整数"""
+    small = cv2.resize(gray_region, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int(np.packbits(bits.ravel()).view('>u8')[0])
+
+
+class SceneClassifier:
+    """场景分类器 - 锚点区域 dHash + 最近邻查表"""
+
+    def __init__(self, anchors=None, table_path=None, max_distance=10, max_samples_per_label=64):
+        """初始化场景分类器
+
+        Args:
+            anchors: 锚点区域 {名称: (x1, y1, x2, y2)}，默认 SCENE_ANCHORS
+            table_path: 哈希表文件，None 时不持久化（按流程传 scene_table_path(命名空间)）
+            max_distance: 每个锚点允许的最大汉明距离（64 位中不同的位数），任一锚点超出即视为不确定
+            max_samples_per_label: 每个场景最多保留的样本数（超出时替换最旧的样本）
+        """
+        self.anchors = dict(anchors or SCENE_ANCHORS)
+        self.anchor_names = list(self.anchors)
+        self.table_path = Path(table_path) if table_path else None
+        self.max_distance = max_distance
+        self.max_samples_per_label = max_samples_per_label
+        self._lock = threading.Lock()
+        self._hashes = np.zeros((0, len(self.anchor_names)), dtype=np.uint64)
+        self._labels = []
+        self._dirty = False
+        self.classify_count = 0
+        self.ambiguous_count = 0
+        self.load_table()
+
+    def compute_hashes(self, frame):
+        """计算各锚点区域的哈希（BGR 或灰度画面）"""
+        hashes = np.zeros(len(self.anchor_names), dtype=np.uint64)
+        for i, name in enumerate(self.anchor_names):
+            x1, y1, x2, y2 = self.anchors[name]
+            region = frame[y1:y2, x1:x2]
+            if region.size == 0:
+                continue
+            if region.ndim == 3:
+                region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+            hashes[i] = dhash(region)
+        return hashes
+
+    def _distances(self, hashes):
+        """与表中所有样本逐锚点的汉明距离，形状 (样本数, 锚点数)"""
+        xor = np.bitwise_xor(self._hashes, hashes[None, :])
+        return _POPCOUNT[xor.view(np.uint8)].reshape(len(self._labels), len(self.anchor_names), 8).sum(axis=2)
+
+    def classify(self, frame, hashes=None):
+        """分类当前场景
+
+        Args:
+            frame: 游戏画面
+            hashes: 已计算好的锚点哈希（可选）
+
+        Returns:
+            tuple: (场景标签, 最近样本的最大锚点距离)，不确定时标签为None
+        """
+        if hashes is None:
+            hashes = self.compute_hashes(frame)
+        self.classify_count += 1
+        with self._lock:
+            if not self._labels:
+                self.ambiguous_count += 1
+                return None, None
+            # 以最差锚点的距离衡量样本相似度，任一锚点差异过大都不算同一场景
+            worst = self._distances(hashes).max(axis=1)
+            labels = self._labels
+        best = int(worst.argmin())
+        distance = int(worst[best])
+        label = labels[best]
+        if distance > self.max_distance:
+            self.ambiguous_count += 1
+            return None, distance
+        # 阈值内出现不同场景的样本时同样视为不确定
+        close = np.flatnonzero(worst <= self.max_distance)
+        if any(labels[i] != label for i in close.tolist()):
+            self.ambiguous_count += 1
+            return None, distance
+        return label, distance
+
+    def learn(self, frame, label, hashes=None):
+        """加入一个已确认场景的样本（已有几乎相同的样本时跳过）"""
+        if hashes is None:
+            hashes = self.compute_hashes(frame)
+        with self._lock:
+            if self._labels:
+                distances = self._distances(hashes).max(axis=1)
+                same = [i for i in np.flatnonzero(distances <= self.max_distance // 4).tolist()
+                        if self._labels[i] == label]
+                if same:
+                    return False
+            label_indices = [i for i, existing in enumerate(self._labels) if existing == label]
+            if len(label_indices) >= self.max_samples_per_label:
+                oldest = label_indices[0]
+                self._hashes = np.delete(self._hashes, oldest, axis=0)
+                del self._labels[oldest]
+            self._hashes = np.vstack([self._hashes, hashes[None, :]])
+            self._labels.append(label)
+            self._dirty = True
+        return True
+
+    def _read_samples(self):
+        """读取磁盘上的样本 [(标签, 哈希元组), ...]（文件不存在或锚点配置不一致时返回None）"""
+        if self.table_path is None or not self.table_path.exists():
+            return None
+        with open(self.table_path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        if table.get('anchors') != {name: list(box) for name, box in self.anchors.items()}:
+            print("⚠️ 场景哈希表的锚点配置已变化，忽略旧表")
+            return None
+        return [(sample['label'], tuple(int(h, 16) for h in sample['hashes'])) for sample in table.get('samples', [])]
+
+    def load_table(self):
+        """从磁盘读取哈希表（锚点配置不一致的样本丢弃）"""
+        try:
+            samples = self._read_samples()
+            if samples is None:
+                return
+            with self._lock:
+                self._hashes = np.array([hashes for _, hashes in samples],
+                                        dtype=np.uint64).reshape(-1, len(self.anchor_names))
+                self._labels = [label for label, _ in samples]
+            print(f"📂 已加载场景哈希表: {len(samples)} 个样本")
+        except Exception as e:
+            print(f"读取场景哈希表失败: {e}")
+
+    def save_table(self):
+        """保存哈希表（有新样本时才写入）
+
+        写入前与磁盘上的表合并：其他进程在本次运行期间保存的样本保留在前（较旧），
+        本进程的样本在后，每个场景超出 max_samples_per_label 时丢弃最旧的样本
+        """
+        if self.table_path is None or not self._dirty:
+            return False
+        try:
+            disk_samples = self._read_samples() or []
+        except Exception as e:
+            print(f"读取场景哈希表失败，不合并磁盘样本: {e}")
+            disk_samples = []
+        with self._lock:
+            own_samples = [(label, tuple(int(h) for h in row)) for label, row in zip(self._labels, self._hashes)]
+            own_set = set(own_samples)
+            merged = [sample for sample in dict.fromkeys(disk_samples) if sample not in own_set] + own_samples
+            # 每个场景只保留最新的 max_samples_per_label 个样本
+            kept = []
+            counts = {}
+            for label, hashes in reversed(merged):
+                if counts.get(label, 0) < self.max_samples_per_label:
+                    counts[label] = counts.get(label, 0) + 1
+                    kept.append((label, hashes))
+            kept.reverse()
+            self._hashes = np.array([hashes for _, hashes in kept],
+                                    dtype=np.uint64).reshape(-1, len(self.anchor_names))
+            self._labels = [label for label, _ in kept]
+            table = {
+                'anchors': {name: list(box) for name, box in self.anchors.items()},
+                'samples': [{'label': label, 'hashes': [f"{h:016x}" for h in hashes]} for label, hashes in kept],
+            }
+            self._dirty = False
+        try:
+            self.table_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.table_path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(table, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self.table_path)
+            return True
+        except Exception as e:
+            print(f"保存场景哈希表失败: {e}")
+            return False
+
+    def build_from_directory(self, scenes_dir):
+        """从 <目录>/<场景标签>/*.png 的录制帧建表
+
+        Returns:
+            int: 加入的样本数
+        """
+        added = 0
+        for label in sorted(os.listdir(scenes_dir)):
+            label_dir = os.path.join(scenes_dir, label)
+            if not os.path.isdir(label_dir):
+                continue
+            for file_name in sorted(os.listdir(label_dir)):
+                if not file_name.lower().endswith(('.png', '.jpg', '.bmp')):
+                    continue
+                frame = cv2.imread(os.path.join(label_dir, file_name))
+                if frame is not None and self.learn(frame, label):
+                    added += 1
+        print(f"✅ 场景哈希表建表完成，新增 {added} 个样本")
+        return added
+
+    def get_stats(self):
+        """获取分类统计"""
+        with self._lock:
+            labels = list(self._labels)
+        return {
+            'samples': {label: labels.count(label) for label in set(labels)},
+            'classify_count': self.classify_count,
+            'ambiguous_count': self.ambiguous_count,
+            'ambiguous_ratio': self.ambiguous_count / self.classify_count if self.classify_count else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) > 2:
+        classifier = SceneClassifier(table_path=scene_table_path(sys.argv[1]))
+        classifier.build_from_directory(sys.argv[2])
+        classifier.save_table()
+    else:
+        # 简单自测：两个场景各一个样本，检查分类结果和耗时
+        rng = np.random.default_rng(0)
+        town = cv2.GaussianBlur(rng.integers(0, 256, (600, 1067, 3), dtype=np.uint8), (15, 15), 0)
+        dungeon = cv2.GaussianBlur(rng.integers(0, 256, (600, 1067, 3), dtype=np.uint8), (15, 15), 0)
+        classifier = SceneClassifier()
+        classifier.learn(town, SCENE_TOWN)
+        classifier.learn(dungeon, SCENE_DUNGEON)
+        noisy_town = np.clip(town.astype(np.int16) + rng.integers(-3, 4, town.shape), 0, 255).astype(np.uint8)
+        start_time = time.perf_counter()
+        for _ in range(100):
+            result = classifier.classify(noisy_town)
+        elapsed = (time.perf_counter() - start_time) * 10
+        print(f"分类结果: {result}，平均耗时 {elapsed:.3f}ms")
+        print(f"未知场景: {classifier.classify(np.zeros_like(town))}")
@@ -0,0 +1,191 @@
+"""
+screen_capture.py - 共享屏幕截图服务
+进程内唯一的长生命周期截图器：后台线程持续抓取游戏区域写入环形缓冲区，
+各模块通过 get_latest_frame / get_frame_after 取帧，不再各自打开 mss 上下文
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import mss
+import numpy as np
+
+
+GAME_REGION = {'left': 0, 'top': 0, 'width': 1067, 'height': 600}
+
+
+class CapturedFrame:
+    """带编号和时间戳的截图帧（BGR，只读）"""
+
+    __slots__ = ('frame_id', 'timestamp', 'image')
+
+    def __init__(self, frame_id, timestamp, image):
+        self.frame_id = frame_id
+        self.timestamp = timestamp  # 开始抓取的时间，保证晚于该时间的画面都已包含
+        self.image = image
+
+
+class ScreenCaptureService:
+    """屏幕截图服务 - 后台抓帧线程 + 环形缓冲区"""
+
+    def __init__(self, region=None, buffer_size=8, target_fps=30.0):
+        """初始化截图服务
+
+        Args:
+            region: 截图区域，默认游戏窗口 1067x600
+            buffer_size: 环形缓冲区保留的帧数
+            target_fps: 后台抓帧的目标帧率
+        """
+        self.region = dict(region or GAME_REGION)
+        self.frame_interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self._frames = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._next_frame_id = 0
+        self._running = False
+        self._thread = None
+        self.grab_count = 0
+        self.error_count = 0
+
+    def start(self):
+        """启动后台抓帧线程（重复调用无副作用）"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._capture_loop, name="ScreenCapture", daemon=True)
+            self._thread.start()
+        print(f"📷 截图服务已启动，区域: {self.region}")
+
+    def stop(self):
+        """停止后台抓帧线程"""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify_all()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+        print("📷 截图服务已停止")
+
+    def is_running(self):
+        return self._running
+
+    def _capture_loop(self):
+        """抓帧循环 - mss 实例只在本线程内创建和使用"""
+        try:
+            with mss.mss() as sct:
+                while self._running:
+                    grab_start = time.time()
+                    try:
+                        screenshot = sct.grab(self.region)
+                        image = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2BGR)
+                        image.flags.writeable = False
+                    except Exception as e:
+                        self.error_count += 1
+                        print(f"截图服务抓帧失败: {e}")
+                        time.sleep(0.1)
+                        continue
+
+                    with self._condition:
+                        self._next_frame_id += 1
+                        self._frames.append(CapturedFrame(self._next_frame_id, grab_start, image))
+                        self.grab_count += 1
+                        self._condition.notify_all()
+
+                    remaining = self.frame_interval - (time.time() - grab_start)
+                    if remaining > 0:
+                        time.sleep(remaining)
+        except Exception as e:
+            print(f"❌ 截图服务线程异常退出: {e}")
+        finally:
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+
+    def get_latest(self, timeout=1.0):
+        """获取最新一帧（CapturedFrame），缓冲区为空时最多等待 timeout 秒"""
+        self.start()
+        deadline = time.time() + timeout
+        with self._condition:
+            while not self._frames:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._condition.wait(remaining)
+            return self._frames[-1]
+
+    def get_after(self, t, timeout=1.0):
+        """获取抓取时间晚于 t 的最早一帧（CapturedFrame），超时返回 None"""
+        self.start()
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                for captured in self._frames:
+                    if captured.timestamp > t:
+                        return captured
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._condition.wait(remaining)
+
+    def get_latest_frame(self, timeout=1.0, copy=True):
+        """获取最新一帧的 BGR 图像，默认返回可写副本"""
+        captured = self.get_latest(timeout)
+        if captured is None:
+            return None
+        return captured.image.copy() if copy else captured.image
+
+    def get_frame_after(self, t, timeout=1.0, copy=True):
+        """获取抓取时间晚于 t 的 BGR 图像，默认返回可写副本"""
+        captured = self.get_after(t, timeout)
+        if captured is None:
+            return None
+        return captured.image.copy() if copy else captured.image
+
+    def get_status(self):
+        """获取截图服务状态"""
+        with self._condition:
+            latest = self._frames[-1] if self._frames else None
+        return {
+            'is_running': self._running,
+            'grab_count': self.grab_count,
+            'error_count': self.error_count,
+            'latest_frame_id': latest.frame_id if latest else None,
+            'latest_frame_age': time.time() - latest.timestamp if latest else None,
+        }
+
+
+# 全局截图服务实例
+capture_service = ScreenCaptureService()
+
+
+def get_latest_frame(timeout=1.0, copy=True):
+    """获取最新一帧BGR图像的便捷函数"""
+    return capture_service.get_latest_frame(timeout, copy)
+
+
+def get_frame_after(t, timeout=1.0, copy=True):
+    """获取晚于时间 t 的BGR图像的便捷函数"""
+    return capture_service.get_frame_after(t, timeout, copy)
+
+
+def stop_capture_service():
+    """停止截图服务的便捷函数"""
+    capture_service.stop()
+
+
+if __name__ == "__main__":
+    # 测试截图服务
+    print("测试截图服务...")
+    frame = get_latest_frame()
+    print(f"最新帧: {None if frame is None else frame.shape}")
+    t = time.time()
+    frame = get_frame_after(t)
+    print(f"晚于 {t:.3f} 的帧: {None if frame is None else frame.shape}")
+    time.sleep(1)
+    print(f"状态: {capture_service.get_status()}")
+    stop_capture_service()
+    print("测试完成")
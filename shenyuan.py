@@ -24,9 +24,29 @@ import win32gui
 import win32con
 import win32api
 import easyocr
-from ultralytics import YOLO
+from model_registry import model_registry
 from input_controllers import create_input_controller
 from advanced_movement import AdvancedMovementController
+from screen_capture import capture_service
+from frame_analysis import FrameAnalyzer
+from template_matcher import DEFAULT_HISTORY_PATH, PyramidMatcher, TemplateRegistry, match_executor, match_peaks
+from template_store import template_store
+from scene_classifier import SCENE_DUNGEON, SCENE_TOWN, SceneClassifier, scene_table_path
+from detection_plan import DetectionPlanner, DetectorSpec
+from frame_gate import FrameChangeGate
+from skill_bar import is_region_ready, skill_bar_analyzer, skill_key_regions
+
+
+# 深渊流程各状态需要运行的检测：
+# - town: 城镇导航，只需判断是否进入副本和导航模板，不运行YOLO
+# - dungeon: 副本战斗，YOLO和战斗模板每帧运行；是否仍在副本中每帧用场景哈希确认（几乎无开销），
+#   哈希表无法确定时的模板匹配兜底每3帧一次
+SHENYUAN_DETECTION_STATES = {
+    'town': [DetectorSpec('zhongmochongbaizhe'), DetectorSpec('zhongmochongbaizhe_template'),
+             DetectorSpec('navigation')],
+    'dungeon': [DetectorSpec('zhongmochongbaizhe'), DetectorSpec('zhongmochongbaizhe_template', every=3),
+                DetectorSpec('yolo'), DetectorSpec('qianjin'), DetectorSpec('shifoujixu')],
+}
  
 
 def resource_path(relative_path):
@@ -75,52 +95,35 @@ class Utils:
             # 如果没有release_key方法，就不做任何操作
             pass
 
-    def detect_template(self, gray_frame, template, threshold=0.7):
-        """模板匹配检测"""
-        if template is None:
-            return []
-        
-        result = cv2.matchTemplate(gray_frame, template, cv2.TM_CCOEFF_NORMED)
-        locations = np.where(result >= threshold)
-        
-        matches = []
-        for pt in zip(*locations[::-1]):
-            x1, y1 = pt
-            x2, y2 = x1 + template.shape[1], y1 + template.shape[0]
-            matches.append((x1, y1, x2, y2))
-        
-        return matches
+    def detect_template(self, gray_frame, template, threshold=0.7, top_k=5):
+        """模板匹配检测，返回互不重叠的前 top_k 个匹配框（按得分从高到低）"""
+        return [peak[:4] for peak in match_peaks(gray_frame, template, threshold, top_k)]
 
 
 class SceneNavigator:
     """场景导航器"""
-    def __init__(self, input_controller=None):
+    def __init__(self, input_controller=None, change_gate=None):
         self.game_title = "地下城与勇士：创新世纪"
         self.utils = Utils(input_controller)
-        self.templates = {
-            'sailiya': cv2.imread(resource_path('image/sailiya.png'), 0),
-            'shenyuan': cv2.imread(resource_path('image/shenyuan.png'), 0),
-            'diedangquandao_menkou': cv2.imread(resource_path('image/diedangqundao_menkou.png'), 0),
-            'shenyuan_xuanze': cv2.imread(resource_path('image/shenyuan_xuanze.png'), 0),
-            'zhongmochongbaizhe': cv2.imread(resource_path('image/zhongmochongbaizhe.png'), 0),
-            'youxicaidan': cv2.imread(resource_path('image/youxicaidan.png'), 0),
-            'shijieditu': cv2.imread(resource_path('image/shijieditu.png'), 0),
-            'yincangshangdian': cv2.imread(resource_path('image/yincangshangdian.png'), 0),
-            'xuanzejuese': cv2.imread(resource_path('image/xuanzejuese.png'), 0),
-            'xuanzejuese_jiemian': cv2.imread(resource_path('image/xuanzejuese_jiemian.png'), 0),
-            'yaoqizhuizongxuanze': cv2.imread(resource_path('image/yaoqizhuizongxuanze.png'), 0),
-            'yaoqizhuizongpindao': cv2.imread(resource_path('image/yaoqizhuizongpindao.png'), 0)
-        }
-        
-        for key, template in self.templates.items():
-            if template is None:
-                print(f"模板加载失败: {key}")
-            else:
-                print(f"模板加载成功: {key}, 尺寸: {template.shape}")
+        # 画面变化门控：画面未变化时（加载、菜单等待）复用上次的模板匹配结果
+        self.change_gate = change_gate
+        # 模板来自进程内共享的模板仓库（只读，每个PNG只解码一次）
+        self.templates = template_store.get_many([
+            'sailiya', 'shenyuan', 'diedangquandao_menkou', 'shenyuan_xuanze', 'zhongmochongbaizhe',
+            'youxicaidan', 'shijieditu', 'yincangshangdian', 'xuanzejuese', 'xuanzejuese_jiemian',
+            'yaoqizhuizongxuanze', 'yaoqizhuizongpindao',
+        ])
         
         if any(t is None for t in self.templates.values()):
             raise ValueError("无法加载模板图像，请检查路径！")
         
+        # 模板注册表：搜索区域从历次匹配位置学习并保存到磁盘
+        self.template_registry = TemplateRegistry(margin=16, max_misses=5, history_path=DEFAULT_HISTORY_PATH)
+        for key, template in self.templates.items():
+            self.template_registry.register(key, template)
+        # 塞丽亚随镜头移动，位置不固定，用金字塔匹配
+        self.pyramid_matcher = PyramidMatcher()
+        
         self.last_right_press_time = 0
         self.right_key_duration = 5
         self.right_key_active = False
@@ -136,9 +139,29 @@ class SceneNavigator:
         current_time = time.time()
         town_detected = False
 
+        # 本帧需要的模板先在线程池中并行匹配完，后面的逻辑按原顺序使用结果
+        names = ['shenyuan', 'diedangquandao_menkou', 'shenyuan_xuanze']
+        if not self.clicked_youxicaidan:
+            names.append('youxicaidan')
+        elif not self.clicked_shijieditu:
+            names.append('shijieditu')
+
+        def match_template(name):
+            if name == 'sailiya':
+                # 塞丽亚位置不固定，用金字塔匹配
+                return self.pyramid_matcher.match(gray_frame, self.templates['sailiya'], 0.7)
+            return self.template_registry.match(gray_frame, name)
+
+        names.append('sailiya')
+        match_all = lambda: dict(zip(names, match_executor.map(match_template, names)))
+        if self.change_gate is not None:
+            locations = self.change_gate.reuse(('navigation',) + tuple(names), gray_frame, match_all)
+        else:
+            locations = match_all()
+
         # 菜单导航逻辑 - 独立于塞利亚房间检测，添加可视化标注
         if not self.clicked_youxicaidan:
-            youxicaidan_locations = self.utils.detect_template(gray_frame, self.templates['youxicaidan'])
+            youxicaidan_locations = locations['youxicaidan']
             print(f"检测到游戏菜单: {len(youxicaidan_locations)} 个位置")
             
             for yx1, yy1, yx2, yy2 in youxicaidan_locations:
@@ -155,7 +178,7 @@ class SceneNavigator:
                 break
                 
         elif self.clicked_youxicaidan and not self.clicked_shijieditu:
-            shijieditu_locations = self.utils.detect_template(gray_frame, self.templates['shijieditu'])
+            shijieditu_locations = locations['shijieditu']
             print(f"检测到世界地图: {len(shijieditu_locations)} 个位置")
             
             for sx1, sy1, sx2, sy2 in shijieditu_locations:
@@ -172,7 +195,7 @@ class SceneNavigator:
                 break
 
         # 检测塞利亚房间 - 仅用于可视化标注
-        sailiya_locations = self.utils.detect_template(gray_frame, self.templates['sailiya'])
+        sailiya_locations = locations['sailiya']
         print(f"检测到塞利亚房间: {len(sailiya_locations)} 个位置")
         
         for x1, y1, x2, y2 in sailiya_locations:
@@ -182,7 +205,7 @@ class SceneNavigator:
             town_detected = True
 
         # 检测深渊入口
-        shenyuan_locations = self.utils.detect_template(gray_frame, self.templates['shenyuan'])
+        shenyuan_locations = locations['shenyuan']
         print(f"检测到深渊: {len(shenyuan_locations)} 个位置")
         
         for x1, y1, x2, y2 in shenyuan_locations:
@@ -201,7 +224,7 @@ class SceneNavigator:
                 town_detected = True
 
         # 检测跌宕群岛门口
-        diedang_locations = self.utils.detect_template(gray_frame, self.templates['diedangquandao_menkou'])
+        diedang_locations = locations['diedangquandao_menkou']
         print(f"检测到跌宕群岛门口: {len(diedang_locations)} 个位置")
         
         for x1, y1, x2, y2 in diedang_locations:
@@ -223,7 +246,7 @@ class SceneNavigator:
             town_detected = True
 
         # 检测深渊选择
-        shenyuan_xuanze_locations = self.utils.detect_template(gray_frame, self.templates['shenyuan_xuanze'])
+        shenyuan_xuanze_locations = locations['shenyuan_xuanze']
         print(f"检测到深渊选择: {len(shenyuan_xuanze_locations)} 个位置")
         
         for x1, y1, x2, y2 in shenyuan_xuanze_locations:
@@ -241,11 +264,13 @@ class SceneNavigator:
 
 class MonsterFighterA:
     """怪物战斗类 - 使用advanced_movement移动系统"""
-    def __init__(self, input_controller, yolo_model=None):
+    def __init__(self, input_controller, yolo_model=None, frame_analyzer=None):
         self.game_title = "地下城与勇士：创新世纪"
         self.utils = Utils(input_controller)
         self.input_controller = input_controller
         self.yolo_model = yolo_model
+        # 帧分析器：同一帧只推理一次
+        self.frame_analyzer = frame_analyzer or FrameAnalyzer(yolo_model)
 
         # 初始化高级移动控制器
         self.movement_controller = AdvancedMovementController(input_controller)
@@ -254,10 +279,10 @@ class MonsterFighterA:
         self.monsters = {
             'monster': {'action': self.attack_monster_advanced, 'type': 'monster'},
             'boss': {'action': self.attack_boss_advanced, 'type': 'boss'},
-            'qianjin': {'template': cv2.imread(resource_path('image/qianjin.png'), 0), 'action': self.run_to_qianjin, 'type': 'qianjin'},
+            'qianjin': {'template': template_store.get('qianjin'), 'action': self.run_to_qianjin, 'type': 'qianjin'},
             'chenghao': {'action': None, 'type': 'player'},
-            'shifoujixu': {'template': cv2.imread(resource_path('image/shifoujixu.png'), 0), 'action': self.pickup_boss_drops, 'type': 'pickup'},
-            'zhongmochongbaizhe': {'template': cv2.imread(resource_path('image/zhongmochongbaizhe.png'), 0), 'type': 'map'}
+            'shifoujixu': {'template': template_store.get('shifoujixu'), 'action': self.pickup_boss_drops, 'type': 'pickup'},
+            'zhongmochongbaizhe': {'template': template_store.get('zhongmochongbaizhe'), 'type': 'map'}
         }
 
         # 检查模板加载
@@ -287,8 +312,12 @@ class MonsterFighterA:
             print(f"EasyOCR 初始化失败: {e}")
             self.ocr_reader = None
 
+        # 前进箭头、拾取提示、重试按钮可能出现在画面任意位置，用金字塔匹配
+        self.pyramid_matcher = PyramidMatcher()
+        self.anywhere_templates = {'qianjin', 'shifoujixu'}
+
         # 重试按钮模板
-        self.retry_button_template = cv2.imread(resource_path('image/retry_button.png'), 0)
+        self.retry_button_template = template_store.get('retry_button')
         if self.retry_button_template is None:
             print("加载失败: retry_button")
         else:
@@ -413,60 +442,12 @@ class MonsterFighterA:
 
     def _get_skill_key_regions(self):
         """获取技能键位区域"""
-        SKILL_AREA_X1, SKILL_AREA_Y1 = 434, 534
-        SKILL_AREA_X2, SKILL_AREA_Y2 = 619, 593
-        
-        skill_width = (SKILL_AREA_X2 - SKILL_AREA_X1) // 6
-        skill_height = (SKILL_AREA_Y2 - SKILL_AREA_Y1) // 2
-        convergence_y = 9
-        convergence_x = 4
-
-        skill_regions = {}
-        row1_keys = ['q', 'w', 'e', 'r', 't', 'y']
-        for i, key in enumerate(row1_keys):
-            x1 = SKILL_AREA_X1 + i * skill_width + convergence_x
-            y1 = SKILL_AREA_Y1 + convergence_y
-            x2 = SKILL_AREA_X1 + (i + 1) * skill_width - convergence_x
-            y2 = SKILL_AREA_Y1 + skill_height - convergence_y
-            skill_regions[key] = (x1, y1, x2, y2)
-
-        row2_keys = ['a', 's', 'd', 'f', 'g', 'h']
-        for i, key in enumerate(row2_keys):
-            x1 = SKILL_AREA_X1 + i * skill_width + convergence_x
-            y1 = SKILL_AREA_Y1 + skill_height + convergence_y
-            x2 = SKILL_AREA_X1 + (i + 1) * skill_width - convergence_x
-            y2 = SKILL_AREA_Y2 - convergence_y
-            skill_regions[key] = (x1, y1, x2, y2)
-
-        return skill_regions
+        return skill_key_regions()
     
     def _is_skill_available(self, frame, region, target_color=(106, 230, 248), tolerance=20):
         """检查技能是否可用"""
         try:
-            x1, y1, x2, y2 = region
-            
-            if x1 < 0 or y1 < 0 or x2 <= x1 or y2 <= y1:
-                return False
-                
-            if y2 > frame.shape[0] or x2 > frame.shape[1]:
-                return False
-                
-            skill_patch = frame[y1:y2, x1:x2]
-            
-            if skill_patch.size == 0:
-                return False
-                
-            lower_color = np.array([max(0, c - tolerance) for c in target_color])
-            upper_color = np.array([min(255, c + tolerance) for c in target_color])
-
-            for py in range(skill_patch.shape[0]):
-                for px in range(skill_patch.shape[1]):
-                    bgr_value = skill_patch[py, px]
-                    if (lower_color[0] <= bgr_value[0] <= upper_color[0] and
-                        lower_color[1] <= bgr_value[1] <= upper_color[1] and
-                        lower_color[2] <= bgr_value[2] <= upper_color[2]):
-                        return True
-            return False
+            return is_region_ready(frame, region, target_color, tolerance)
         except Exception as e:
             print(f"技能检测错误: {e}")
             return False
@@ -475,11 +456,8 @@ class MonsterFighterA:
         """获取可用技能列表"""
         available_skills = []
         try:
-            for skill_key in self.skill_keys:
-                if skill_key in self.skill_regions:
-                    region = self.skill_regions[skill_key]
-                    if self._is_skill_available(frame, region):
-                        available_skills.append(skill_key)
+            # 技能栏一次 inRange + 积分图得到 12 个技能的就绪掩码
+            available_skills = skill_bar_analyzer.available(frame, self.skill_keys)
             print(f"可用技能: {available_skills}")
         except Exception as e:
             print(f"获取可用技能错误: {e}")
@@ -488,23 +466,11 @@ class MonsterFighterA:
     def _get_chenghao_position(self, frame):
         """获取chenghao的真实位置"""
         try:
-            # 使用YOLO检测chenghao
+            # 使用YOLO检测chenghao（同一帧复用已有检测结果）
             if self.yolo_model is not None:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.yolo_model.predict(frame_rgb)
-                for result in results:
-                    for box in result.boxes:
-                        cls_id = int(box.cls)
-                        if cls_id in result.names:
-                            cls_name = result.names[cls_id]
-
-                            
-                            if cls_name == 'chenghao':
-                                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                                # 计算chenghao中心位置
-                                center_x = x1 + (x2 - x1) // 2
-                                center_y = y1 + (y2 - y1) // 2 + 80
-                                return center_x, center_y
+                center_x, center_y = self.frame_analyzer.analyze_bgr(frame).character_position
+                if center_x is not None:
+                    return center_x, center_y
             
             # 如果没有检测到chenghao，使用屏幕中心作为备用
             print("⚠️ 未检测到chenghao，使用屏幕中心坐标")
@@ -599,7 +565,7 @@ class MonsterFighterA:
 
         # 检查重试按钮状态
         gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
-        retry_locations = self.utils.detect_template(gray_frame, self.retry_button_template)
+        retry_locations = self.pyramid_matcher.match(gray_frame, self.retry_button_template, 0.7)
         retry_button_gray = False
 
         for rx1, ry1, rx2, ry2 in retry_locations:
@@ -827,46 +793,50 @@ class MonsterFighterA:
         else:
             print(f"速度已检测过：{self.speed:.2f}%，跳过重复检测")
 
-    def fight_monsters(self, frame, gray_frame):
-        """完整的怪物战斗逻辑 - 严格优先级控制"""
+    def fight_monsters(self, frame, gray_frame, plan=None):
+        """完整的怪物战斗逻辑 - 严格优先级控制
+
+        Args:
+            plan: 本帧的检测计划（detection_plan.DetectionPlan），只运行计划中的检测；
+                提供时由调用方负责确认已在 zhongmochongbaizhe 地图中
+        """
         start_time = time.time()
         detected_monsters = []
         should_pickup = False
         in_zhongmochongbaizhe = False
 
-        # 使用YOLO检测怪物
-        if self.yolo_model is not None:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.yolo_model.predict(frame_rgb)
-            for result in results:
-                for box in result.boxes:
-                    cls_id = int(box.cls)
-                    if cls_id in result.names:
-                        cls_name = result.names[cls_id]
-                        # 处理Intel模型的类别名称映射
-                        if cls_name == 'cheng_hao':
-                            cls_name = 'chenghao'
-
-                        if cls_name in ['monster', 'boss', 'chenghao']:
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            # 对chenghao的y轴坐标进行偏移调整
-                            if cls_name == 'chenghao':
-                                y1 += 80
-                                y2 += 80
-                            detected_monsters.append((cls_name, x1, y1, x2, y2))
-
-        # 使用模板检测其他对象
-        for monster_name, monster_data in self.monsters.items():
-            if 'template' in monster_data and monster_data['template'] is not None:
-                locations = self.utils.detect_template(gray_frame, monster_data['template'], threshold=0.8)
-                print(f"检测 {monster_name}，找到 {len(locations)} 个匹配")
-                for x1, y1, x2, y2 in locations:
-                    detected_monsters.append((monster_name, x1, y1, x2, y2))
+        # 使用YOLO检测怪物（类别名称映射在帧分析器中统一处理）
+        if self.yolo_model is not None and (plan is None or 'yolo' in plan):
+            arrays = self.frame_analyzer.analyze_bgr(frame).arrays
+            keep = arrays.mask('monster', 'boss', 'chenghao')
+            boxes = arrays.xyxy[keep].copy()
+            cls_names = [arrays.names[c] for c in arrays.cls[keep].tolist()]
+            # 对chenghao的y轴坐标进行偏移调整
+            is_chenghao = np.array([name == 'chenghao' for name in cls_names], dtype=bool)
+            boxes[is_chenghao, 1] += 80
+            boxes[is_chenghao, 3] += 80
+            for cls_name, (x1, y1, x2, y2) in zip(cls_names, boxes.tolist()):
+                detected_monsters.append((cls_name, x1, y1, x2, y2))
+
+        # 使用模板检测其他对象（各模板在线程池中并行匹配）
+        template_names = [name for name, data in self.monsters.items() if data.get('template') is not None
+                          and (plan is None or (name in plan and name != 'zhongmochongbaizhe'))]
+
+        def match_template(monster_name):
+            template = self.monsters[monster_name]['template']
+            if monster_name in self.anywhere_templates:
+                return self.pyramid_matcher.match(gray_frame, template, 0.8)
+            return self.utils.detect_template(gray_frame, template, threshold=0.8)
+
+        for monster_name, locations in zip(template_names, match_executor.map(match_template, template_names)):
+            print(f"检测 {monster_name}，找到 {len(locations)} 个匹配")
+            for x1, y1, x2, y2 in locations:
+                detected_monsters.append((monster_name, x1, y1, x2, y2))
 
         print(f"检测到的所有对象: {detected_monsters}")
 
         # 检查是否在zhongmochongbaizhe地图中
-        in_zhongmochongbaizhe = any(
+        in_zhongmochongbaizhe = plan is not None or any(
             monster_name == 'zhongmochongbaizhe' for monster_name, _, _, _, _ in detected_monsters)
 
         if not in_zhongmochongbaizhe:
@@ -1012,20 +982,28 @@ class MonsterFighterA:
 class ShenyuanAutomator:
     """深渊地图自动化器"""
     
-    def __init__(self, input_controller=None):
+    def __init__(self, input_controller=None, detector_backend="PyTorch"):
         self.game_title = "地下城与勇士：创新世纪"
         self.input_controller = input_controller or create_input_controller("默认")
         
-        # 初始化YOLO模型（共享给战斗系统使用）
-        try:
-            self.yolo_model = YOLO('models/best.pt')
-            print("ShenyuanAutomator YOLO模型加载成功")
-        except Exception as e:
-            print(f"ShenyuanAutomator YOLO模型加载失败: {e}")
-            self.yolo_model = None
+        # 从模型注册表获取检测模型（进程内共享，已预热）
+        self.yolo_model = model_registry.acquire(detector_backend, max_det=30)
+        if self.yolo_model is not None:
+            print(f"ShenyuanAutomator 检测模型加载成功（{detector_backend} 后端）")
+        else:
+            print(f"ShenyuanAutomator 检测模型加载失败（{detector_backend} 后端）")
         
-        self.navigator = SceneNavigator(input_controller=self.input_controller)
-        self.fighter = MonsterFighterA(input_controller=self.input_controller, yolo_model=self.yolo_model)
+        # 画面变化门控：导航模板、地图判断和YOLO在画面未变化时复用上次结果
+        self.change_gate = FrameChangeGate()
+        self.navigator = SceneNavigator(input_controller=self.input_controller, change_gate=self.change_gate)
+        self.frame_analyzer = FrameAnalyzer(self.yolo_model, change_gate=self.change_gate)
+        self.fighter = MonsterFighterA(input_controller=self.input_controller, yolo_model=self.yolo_model,
+                                       frame_analyzer=self.frame_analyzer)
+        # 场景分类器：锚点哈希查表判断是否在副本中，不确定时才做模板匹配
+        # 每个流程单独一张表：深渊流程的 dungeon 指在 zhongmochongbaizhe 中
+        self.scene_classifier = SceneClassifier(table_path=scene_table_path('shenyuan'))
+        # 检测规划器：按城镇/副本状态决定每帧运行哪些检测
+        self.detection_planner = DetectionPlanner(SHENYUAN_DETECTION_STATES, 'town')
         self.stop_event = None
         self.log = print
         print("ShenyuanAutomator初始化完成（集成复杂攻击系统）")
@@ -1041,9 +1019,11 @@ class ShenyuanAutomator:
     def _check_zhongmochongbaizhe_map(self, gray_frame):
         """检查是否在zhongmochongbaizhe地图中"""
         try:
-            zhongmo_template = cv2.imread(resource_path('image/zhongmochongbaizhe.png'), 0)
+            zhongmo_template = template_store.get('zhongmochongbaizhe')
             if zhongmo_template is not None:
-                locations = self.navigator.utils.detect_template(gray_frame, zhongmo_template, threshold=0.8)
+                locations = self.change_gate.reuse(
+                    'zhongmochongbaizhe', gray_frame,
+                    lambda: self.navigator.utils.detect_template(gray_frame, zhongmo_template, threshold=0.8))
                 return len(locations) > 0
         except Exception as e:
             print(f"检查zhongmochongbaizhe地图失败: {e}")
@@ -1061,23 +1041,47 @@ class ShenyuanAutomator:
             self.log("无法找到游戏窗口")
             return
 
-        region = {'left': 0, 'top': 0, 'width': 1067, 'height': 600}
         character_switch_requested = False
         
         while not stop_event.is_set():
             try:
-                with mss.mss() as sct:
-                    screenshot = sct.grab(region)
-                    frame = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2BGR)
-                    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                # 从共享截图服务获取最新画面（副本，战斗逻辑会在上面绘制标注）
+                frame = capture_service.get_latest_frame()
+                if frame is None:
+                    self.log("截图服务未返回画面，稍后重试")
+                    time.sleep(1)
+                    continue
+                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 
-                # 首先检查是否在zhongmochongbaizhe地图中
-                zhongmo_detected = self._check_zhongmochongbaizhe_map(gray_frame)
+                # 按当前状态生成本帧的检测计划
+                plan = self.detection_planner.plan()
+                scene = scene_hashes = None
+                template_checked = False
+                if 'zhongmochongbaizhe' in plan:
+                    # 检查是否在zhongmochongbaizhe地图中（哈希查表能确定时跳过模板匹配）
+                    scene_hashes = self.scene_classifier.compute_hashes(gray_frame)
+                    scene, _ = self.scene_classifier.classify(gray_frame, scene_hashes)
+                if scene is not None:
+                    zhongmo_detected = scene == SCENE_DUNGEON
+                elif 'zhongmochongbaizhe_template' in plan:
+                    template_checked = True
+                    zhongmo_detected = self._check_zhongmochongbaizhe_map(gray_frame)
+                    if zhongmo_detected and scene_hashes is not None:
+                        self.scene_classifier.learn(gray_frame, SCENE_DUNGEON, scene_hashes)
+                else:
+                    # 哈希表无法确定且本帧不做模板兜底，沿用当前状态
+                    zhongmo_detected = plan.state == 'dungeon'
+                new_state = 'dungeon' if zhongmo_detected else 'town'
+                if new_state != plan.state:
+                    # 状态变化后按新状态重新规划（新状态的第一帧运行全部检测）
+                    self.detection_planner.transition(new_state)
+                    plan = self.detection_planner.plan()
                 
                 if zhongmo_detected:
                     # 在zhongmochongbaizhe地图中，直接进行战斗逻辑，跳过城镇检测
                     self.log("在zhongmochongbaizhe地图中，执行战斗逻辑")
-                    frame_with_detections, should_switch_character = self.fighter.fight_monsters(frame, gray_frame)
+                    frame_with_detections, should_switch_character = self.fighter.fight_monsters(frame, gray_frame,
+                                                                                                 plan)
                     
                     if should_switch_character:
                         self.log("检测到角色切换请求")
@@ -1095,6 +1099,9 @@ class ShenyuanAutomator:
                     in_town = self.navigator.move_to_shenyuan_map(frame, gray_frame)
                     if in_town:
                         self.log("在城镇中，继续导航...")
+                        if template_checked and scene_hashes is not None:
+                            # 本帧模板匹配确认不在副本中，作为城镇样本加入哈希表
+                            self.scene_classifier.learn(gray_frame, SCENE_TOWN, scene_hashes)
                 
                 time.sleep(1)
                 
@@ -1104,6 +1111,13 @@ class ShenyuanAutomator:
                 self.log(f"详细错误信息: {traceback.format_exc()}")
                 time.sleep(2)
         
+        # 保存模板搜索区域，释放YOLO模型引用
+        self.navigator.template_registry.save_history()
+        self.scene_classifier.save_table()
+        self.log(f"检测计划统计: {self.detection_planner.get_stats()}")
+        self.log(f"画面变化门控统计: {self.change_gate.get_stats()}")
+        model_registry.release(self.yolo_model)
+        self.yolo_model = None
         self.log("深渊地图自动化结束")
     
     def fight_monsters_with_yolo(self, frame):
@@ -61,13 +61,12 @@ class GlobalSingletons:
             return None
         if cls._yolo_model is None:
             print("⚡ 首次加载YOLO模型全局单例")
-            try:
-                from ultralytics import YOLO
-                cls._yolo_model = YOLO('models/best.pt')
+            from model_registry import model_registry
+            cls._yolo_model = model_registry.acquire("PyTorch")
+            if cls._yolo_model is not None:
                 print("✅ YOLO模型全局单例加载完成")
-            except Exception as e:
-                print(f"❌ YOLO模型加载失败: {e}")
-                cls._yolo_model = None
+            else:
+                print("❌ YOLO模型加载失败")
         return cls._yolo_model
     
     @classmethod
@@ -102,6 +101,9 @@ class GlobalSingletons:
         print("🔄 重置所有全局单例")
         cls._action_controller = None
         cls._yaoqi_attacker = None
+        if cls._yolo_model is not None:
+            from model_registry import model_registry
+            model_registry.release(cls._yolo_model)
         cls._yolo_model = None
         cls._initialized = False
 
@@ -0,0 +1,152 @@
+"""
+skill_bar.py - 技能栏就绪检测
+技能栏位于画面 (434, 534)-(619, 593)，两行各 6 个技能（q w e r t y / a s d f g h）。
+技能可用时图标内会出现技能就绪色（默认 BGR (106, 230, 248)，容差 20）。
+原来对 12 个图标逐像素做 Python 双重循环；这里截取技能栏一次、做一次 cv2.inRange，
+再用积分图一次取出 12 个区域的命中像素数，返回 12 位的就绪掩码。
+命令行用法（回归检查，与逐像素实现对比）:
+    python skill_bar.py
+"""
+
+import cv2
+import numpy as np
+
+
+# 技能栏区域 (x1, y1, x2, y2)，基于 1067x600 的游戏画面
+SKILL_BAR_REGION = (434, 534, 619, 593)
+# 技能栏上的键位顺序，也是就绪掩码的位顺序（q 为第 0 位）
+SKILL_KEYS = ['q', 'w', 'e', 'r', 't', 'y', 'a', 's', 'd', 'f', 'g', 'h']
+SKILL_READY_COLOR = (106, 230, 248)
+SKILL_READY_TOLERANCE = 20
+
+
+def skill_key_regions(region=SKILL_BAR_REGION, convergence_x=4, convergence_y=9):
+    """各技能图标的检测区域 {键: (x1, y1, x2, y2)}（图标四周向内收缩，避开边框）"""
+    bar_x1, bar_y1, bar_x2, bar_y2 = region
+    skill_width = (bar_x2 - bar_x1) // 6
+    skill_height = (bar_y2 - bar_y1) // 2
+
+    skill_regions = {}
+    for i, key in enumerate(SKILL_KEYS[:6]):
+        skill_regions[key] = (bar_x1 + i * skill_width + convergence_x, bar_y1 + convergence_y,
+                              bar_x1 + (i + 1) * skill_width - convergence_x, bar_y1 + skill_height - convergence_y)
+    for i, key in enumerate(SKILL_KEYS[6:]):
+        skill_regions[key] = (bar_x1 + i * skill_width + convergence_x, bar_y1 + skill_height + convergence_y,
+                              bar_x1 + (i + 1) * skill_width - convergence_x, bar_y2 - convergence_y)
+    return skill_regions
+
+
+def _color_bounds(target_color, tolerance):
+    lower = np.array([max(0, c - tolerance) for c in target_color], dtype=np.uint8)
+    upper = np.array([min(255, c + tolerance) for c in target_color], dtype=np.uint8)
+    return lower, upper
+
+
+def is_region_ready(frame, region, target_color=SKILL_READY_COLOR, tolerance=SKILL_READY_TOLERANCE):
+    """单个区域内是否有就绪色像素（区域越界或为空返回False）"""
+    x1, y1, x2, y2 = region
+    if x1 < 0 or y1 < 0 or x2 <= x1 or y2 <= y1 or y2 > frame.shape[0] or x2 > frame.shape[1]:
+        return False
+    patch = frame[y1:y2, x1:x2, :3]
+    return cv2.countNonZero(cv2.inRange(patch, *_color_bounds(target_color, tolerance))) > 0
+
+
+class SkillBarAnalyzer:
+    """技能栏分析器 - 一次 inRange + 积分图得到 12 个技能的就绪掩码"""
+
+    def __init__(self, region=SKILL_BAR_REGION, target_color=SKILL_READY_COLOR, tolerance=SKILL_READY_TOLERANCE):
+        """初始化技能栏分析器
+
+        Args:
+            region: 技能栏区域 (x1, y1, x2, y2)
+            target_color: 技能就绪色（与画面通道顺序一致）
+            tolerance: 每个通道的容差
+        """
+        self.region = tuple(region)
+        self.regions = skill_key_regions(region)
+        self.bits = {key: i for i, key in enumerate(SKILL_KEYS)}
+        self._lower, self._upper = _color_bounds(target_color, tolerance)
+        # 各图标区域在积分图中的四个角（相对技能栏左上角），按位顺序排列
+        bar_x1, bar_y1 = self.region[:2]
+        boxes = np.array([self.regions[key] for key in SKILL_KEYS]) - [bar_x1, bar_y1, bar_x1, bar_y1]
+        self._x1, self._y1, self._x2, self._y2 = boxes.T
+        self._weights = 1 << np.arange(len(SKILL_KEYS), dtype=np.int64)
+
+    def readiness_mask(self, frame):
+        """12 位就绪掩码，第 i 位对应 SKILL_KEYS[i]（技能栏超出画面时为0）"""
+        x1, y1, x2, y2 = self.region
+        if frame is None or y2 > frame.shape[0] or x2 > frame.shape[1]:
+            return 0
+        hits = cv2.inRange(frame[y1:y2, x1:x2, :3], self._lower, self._upper)
+        integral = cv2.integral(hits // 255)
+        counts = (integral[self._y2, self._x2] - integral[self._y1, self._x2]
+                  - integral[self._y2, self._x1] + integral[self._y1, self._x1])
+        return int(self._weights[counts > 0].sum())
+
+    def available(self, frame, keys=SKILL_KEYS):
+        """就绪的技能键（保持 keys 的顺序）"""
+        mask = self.readiness_mask(frame)
+        return [key for key in keys if key in self.bits and mask >> self.bits[key] & 1]
+
+    def is_ready(self, mask, key):
+        """就绪掩码中某个技能是否就绪"""
+        return bool(mask >> self.bits[key] & 1)
+
+
+# 全局技能栏分析器实例
+skill_bar_analyzer = SkillBarAnalyzer()
+
+
+def get_ready_skills(frame, keys=SKILL_KEYS):
+    """获取就绪技能的便捷函数"""
+    return skill_bar_analyzer.available(frame, keys)
+
+
+def _is_region_ready_by_pixels(frame, region, target_color=SKILL_READY_COLOR, tolerance=SKILL_READY_TOLERANCE):
+    """逐像素实现（原 _is_skill_available），仅用于回归对比"""
+    x1, y1, x2, y2 = region
+    if x1 < 0 or y1 < 0 or x2 <= x1 or y2 <= y1 or y2 > frame.shape[0] or x2 > frame.shape[1]:
+        return False
+    skill_patch = frame[y1:y2, x1:x2]
+    lower_color, upper_color = _color_bounds(target_color, tolerance)
+    for py in range(skill_patch.shape[0]):
+        for px in range(skill_patch.shape[1]):
+            bgr_value = skill_patch[py, px]
+            if (lower_color[0] <= bgr_value[0] <= upper_color[0] and
+                    lower_color[1] <= bgr_value[1] <= upper_color[1] and
+                    lower_color[2] <= bgr_value[2] <= upper_color[2]):
+                return True
+    return False
+
+
+def test_skill_bar_analyzer(samples=200):
+    """回归检查：就绪掩码与逐像素实现逐键一致"""
+    import time
+
+    analyzer = SkillBarAnalyzer()
+    rng = np.random.default_rng(0)
+    x1, y1, x2, y2 = SKILL_BAR_REGION
+    old_time = new_time = 0.0
+    for i in range(samples):
+        channels = 4 if i % 5 == 0 else 3  # 也覆盖 mss 的 BGRA 画面
+        frame = rng.integers(0, 100, (600, 1067, channels), dtype=np.uint8)
+        # 随机点亮若干像素（包括图标边框上、区域外的像素）
+        for _ in range(rng.integers(0, 12)):
+            px, py = rng.integers(x1 - 2, x2 + 2), rng.integers(y1 - 2, y2 + 2)
+            frame[py, px, :3] = np.array(SKILL_READY_COLOR) + rng.integers(-20, 21, 3)
+
+        start_time = time.perf_counter()
+        expected = [key for key in SKILL_KEYS if _is_region_ready_by_pixels(frame, analyzer.regions[key])]
+        old_time += time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        actual = analyzer.available(frame)
+        new_time += time.perf_counter() - start_time
+        assert actual == expected, f"第 {i} 帧结果不一致: {actual} != {expected}"
+        assert [key for key in SKILL_KEYS if is_region_ready(frame, analyzer.regions[key])] == expected
+
+    print(f"✅ 技能栏就绪检测回归通过: {samples} 帧，逐像素 {old_time / samples * 1000:.3f}ms/帧，"
+          f"向量化 {new_time / samples * 1000:.3f}ms/帧")
+
+
+if __name__ == "__main__":
+    test_skill_bar_analyzer()
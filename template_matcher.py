@@ -0,0 +1,753 @@
+"""
+template_matcher.py - 带搜索区域的模板注册表
+大部分界面元素（地图名横幅、按钮、菜单）位置固定，没必要每次都在整张 1067x600 画面上匹配：
+- 每个模板可声明搜索区域 roi，未声明时从第一次全画面匹配的位置自动学习
+- 匹配只在 搜索区域 + 边距 内进行，坐标换算回整张画面
+- 连续 max_misses 次在区域内未匹配到，做一次全画面兜底搜索（元素换了位置时重新学习）
+- 学习区域取最近 RECENT_HITS 次匹配中、至少出现 MIN_HIT_SUPPORT 次的位置的包络：
+  偶发的误匹配不会扩大区域，旧位置随新匹配滑出窗口后区域也会收缩
+- 学习到的区域和最近的匹配位置保存到磁盘，下次运行一开始就只搜索该区域
+多个模板的匹配可交给 match_executor 线程池并行执行（cv2.matchTemplate 运行时释放GIL）
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from template_store import template_store
+
+
+# 匹配位置历史文件，与程序配置放在同一目录
+DEFAULT_HISTORY_PATH = Path.home() / ".game_script_config" / "template_roi.json"
+
+# 局部极大值候选过多时（大片平坦的高分区域）只保留得分最高的这么多个再做抑制
+MAX_PEAK_CANDIDATES = 64
+
+# 学习搜索区域时参考的最近匹配次数
+RECENT_HITS = 16
+# 位置在最近匹配中至少出现多少次（左上角相差 HIT_TOLERANCE 像素以内视为同一位置）才并入学习区域
+MIN_HIT_SUPPORT = 2
+HIT_TOLERANCE = 4
+
+
+def suppress_peaks(xs, ys, scores, template_size, top_k=5):
+    """对峰值做非极大值抑制：两个峰值的匹配框中心距离在半个模板以内视为重叠，只保留得分高的
+
+    Args:
+        xs, ys, scores: 峰值坐标（匹配框左上角）和得分数组
+        template_size: 模板尺寸 (宽, 高)
+        top_k: 最多返回的峰值数
+
+    Returns:
+        tuple: (xs, ys, scores)，按得分从高到低
+    """
+    if len(scores) > MAX_PEAK_CANDIDATES:
+        keep = np.argpartition(-scores, MAX_PEAK_CANDIDATES)[:MAX_PEAK_CANDIDATES]
+        xs, ys, scores = xs[keep], ys[keep], scores[keep]
+    order = np.argsort(-scores, kind='stable')
+    xs, ys, scores = xs[order], ys[order], scores[order]
+    half_w, half_h = max(1, template_size[0] // 2), max(1, template_size[1] // 2)
+    overlap = ((np.abs(xs[:, None] - xs[None, :]) <= half_w) &
+               (np.abs(ys[:, None] - ys[None, :]) <= half_h))
+    # 只要有得分更高的重叠峰值就被抑制（与膨胀求局部极大值的语义一致，无需逐个循环）
+    suppressed = np.tril(overlap, -1).any(axis=1)
+    keep = np.flatnonzero(~suppressed)[:top_k]
+    return xs[keep], ys[keep], scores[keep]
+
+
+def find_peaks(result, threshold, template_size, top_k=5):
+    """从 matchTemplate 结果中取阈值以上、互不重叠的前 top_k 个峰值
+
+    反复用 minMaxLoc 取最大值并抹掉其半个模板范围内的邻域，替代 np.where 取出所有阈值以上像素
+    （好的匹配周围往往有上百个几乎重复的位置）。最多迭代 top_k 次，没有匹配时只需一次 minMaxLoc。
+
+    Returns:
+        tuple: (xs, ys, scores) 数组，按得分从高到低，长度不超过 top_k
+    """
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    if max_val < threshold or top_k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    half_w, half_h = max(1, template_size[0] // 2), max(1, template_size[1] // 2)
+    peaks = []
+    remaining = result.copy() if top_k > 1 else result
+    while True:
+        x, y = max_loc
+        peaks.append((x, y, max_val))
+        if len(peaks) >= top_k:
+            break
+        remaining[max(0, y - half_h):y + half_h + 1, max(0, x - half_w):x + half_w + 1] = -1
+        _, max_val, _, max_loc = cv2.minMaxLoc(remaining)
+        if max_val < threshold:
+            break
+    peaks = np.array(peaks, dtype=np.float64)
+    return peaks[:, 0].astype(np.int64), peaks[:, 1].astype(np.int64), peaks[:, 2].astype(np.float32)
+
+
+def match_peaks(gray_frame, template, threshold=0.7, top_k=5):
+    """整张画面模板匹配，返回前 top_k 个互不重叠的匹配
+
+    Returns:
+        list: [(x1, y1, x2, y2, 得分), ...]，按得分从高到低
+    """
+    if template is None or gray_frame.shape[0] < template.shape[0] or gray_frame.shape[1] < template.shape[1]:
+        return []
+    template_h, template_w = template.shape[:2]
+    result = cv2.matchTemplate(gray_frame, template, cv2.TM_CCOEFF_NORMED)
+    xs, ys, scores = find_peaks(result, threshold, (template_w, template_h), top_k)
+    return [(x, y, x + template_w, y + template_h, score)
+            for x, y, score in zip(xs.tolist(), ys.tolist(), scores.tolist())]
+
+
+class TemplateEntry:
+    """注册表中的单个模板"""
+
+    __slots__ = ('name', 'image', 'roi', 'learned_roi', 'recent', 'misses', 'hits')
+
+    def __init__(self, name, image, roi=None):
+        self.name = name
+        self.image = image
+        self.roi = tuple(roi) if roi else None  # 声明的搜索区域 (x1, y1, x2, y2)
+        self.learned_roi = None  # 最近匹配中得到确认的位置的包络
+        self.recent = deque(maxlen=RECENT_HITS)  # 最近的匹配框
+        self.misses = 0  # 区域内连续未匹配次数
+        self.hits = 0  # 累计匹配次数（含历史运行）
+
+    @property
+    def size(self):
+        """模板尺寸 (宽, 高)"""
+        return self.image.shape[1], self.image.shape[0]
+
+    def search_window(self, frame_shape, margin):
+        """搜索窗口 (x1, y1, x2, y2)，没有可用区域时返回None（全画面搜索）"""
+        roi = self.roi or self.learned_roi
+        if roi is None:
+            return None
+        height, width = frame_shape[:2]
+        x1, y1, x2, y2 = roi
+        x1, y1 = max(0, x1 - margin), max(0, y1 - margin)
+        x2, y2 = min(width, x2 + margin), min(height, y2 + margin)
+        # 窗口至少要能放下模板
+        template_w, template_h = self.size
+        if x2 - x1 < template_w or y2 - y1 < template_h:
+            return None
+        return x1, y1, x2, y2
+
+    def learn(self, box):
+        """记录匹配到的框并重新计算学习区域
+
+        学习区域为最近匹配中至少出现 MIN_HIT_SUPPORT 次的位置的包络；
+        还没有得到确认的位置时沿用原区域（第一次匹配直接以该框作为区域）
+
+        Returns:
+            bool: 学习区域是否变化
+        """
+        self.hits += 1
+        self.recent.append(tuple(int(v) for v in box))
+        supported = [hit for hit in self.recent
+                     if sum(abs(hit[0] - other[0]) <= HIT_TOLERANCE and abs(hit[1] - other[1]) <= HIT_TOLERANCE
+                            for other in self.recent) >= MIN_HIT_SUPPORT]
+        if supported:
+            envelope = (min(hit[0] for hit in supported), min(hit[1] for hit in supported),
+                        max(hit[2] for hit in supported), max(hit[3] for hit in supported))
+        else:
+            envelope = self.learned_roi or self.recent[-1]
+        changed = envelope != self.learned_roi
+        self.learned_roi = envelope
+        return changed
+
+
+class TemplateRegistry:
+    """模板注册表 - 按名称注册模板，在搜索区域内匹配"""
+
+    def __init__(self, margin=16, max_misses=5, history_path=None, save_interval=30.0):
+        """初始化模板注册表
+
+        Args:
+            margin: 搜索区域向外扩展的像素
+            max_misses: 区域内连续未匹配多少次后做一次全画面兜底搜索
+            history_path: 匹配位置历史文件，None 时不持久化（可传 DEFAULT_HISTORY_PATH）
+            save_interval: 学习区域变化后最短多少秒写一次磁盘
+        """
+        self.margin = margin
+        self.max_misses = max(1, max_misses)
+        self.history_path = Path(history_path) if history_path else None
+        self.save_interval = save_interval
+        self._entries = {}
+        self._history = self._read_history()
+        self._dirty = False
+        self._last_save_time = time.time()
+        self._lock = threading.Lock()
+        self.roi_searches = 0
+        self.full_searches = 0
+        self.searched_pixels = 0
+        self.full_frame_pixels = 0
+
+    def register(self, name, template, roi=None):
+        """注册模板
+
+        Args:
+            name: 模板名称
+            template: 灰度模板图像
+            roi: 声明的搜索区域 (x1, y1, x2, y2)，None 时自动学习
+        """
+        if template is None:
+            return
+        entry = TemplateEntry(name, template, roi)
+        # 恢复历史运行学到的区域；模板图片换过尺寸时历史作废
+        record = self._history.get(name)
+        if record and tuple(record.get('template_size', ())) == entry.size:
+            entry.learned_roi = tuple(record['envelope'])
+            entry.recent.extend(tuple(box) for box in record.get('recent', []))
+            entry.hits = record.get('hits', 0)
+        self._entries[name] = entry
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, name):
+        """获取模板图像，未注册返回None"""
+        entry = self._entries.get(name)
+        return entry.image if entry else None
+
+    def names(self):
+        return list(self._entries)
+
+    def match(self, gray_frame, name, threshold=0.7, top_k=5):
+        """在搜索区域内匹配模板
+
+        Args:
+            gray_frame: 灰度画面
+            name: 模板名称
+            threshold: TM_CCOEFF_NORMED 阈值
+            top_k: 最多返回的匹配数（互不重叠的峰值）
+
+        Returns:
+            list: 整张画面坐标下的匹配框 [(x1, y1, x2, y2), ...]，按得分从高到低
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return []
+        template_w, template_h = entry.size
+        if gray_frame.shape[0] < template_h or gray_frame.shape[1] < template_w:
+            return []
+
+        with self._lock:
+            window = entry.search_window(gray_frame.shape, self.margin)
+            full_search = window is None or entry.misses >= self.max_misses
+            if full_search:
+                window = (0, 0, gray_frame.shape[1], gray_frame.shape[0])
+                entry.misses = 0
+                self.full_searches += 1
+            else:
+                self.roi_searches += 1
+            x1, y1, x2, y2 = window
+            self.searched_pixels += (x2 - x1) * (y2 - y1)
+            self.full_frame_pixels += gray_frame.shape[0] * gray_frame.shape[1]
+
+        try:
+            result = cv2.matchTemplate(gray_frame[y1:y2, x1:x2], entry.image, cv2.TM_CCOEFF_NORMED)
+        except Exception as e:
+            print(f"模板匹配错误 {name}: {e}")
+            return []
+        xs, ys, _ = find_peaks(result, threshold, entry.size, top_k)
+        matches = [(x + x1, y + y1, x + x1 + template_w, y + y1 + template_h)
+                   for x, y in zip(xs.tolist(), ys.tolist())]
+
+        with self._lock:
+            if matches:
+                entry.misses = 0
+                if entry.roi is None and entry.learn(matches[0]):
+                    self._dirty = True
+            elif not full_search:
+                entry.misses += 1
+            should_save = self._dirty and time.time() - self._last_save_time >= self.save_interval
+        if should_save:
+            self.save_history()
+        return matches
+
+    def match_many(self, gray_frame, names=None, threshold=0.7, executor=None):
+        """匹配多个模板（在线程池中并行），每个模板只取得分最高的匹配
+
+        Args:
+            executor: 匹配线程池，默认使用全局 match_executor
+
+        Returns:
+            dict: {模板名称: (x1, y1, x2, y2)}
+        """
+        names = names if names is not None else list(self._entries)
+        executor = executor or match_executor
+        results = executor.map(lambda name: self.match(gray_frame, name, threshold, top_k=1), names)
+        return {name: matches[0] for name, matches in zip(names, results) if matches}
+
+    def _read_history(self):
+        """读取匹配位置历史"""
+        if self.history_path is None or not self.history_path.exists():
+            return {}
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+            print(f"📂 已加载模板搜索区域历史: {len(history)} 个模板")
+            return history
+        except Exception as e:
+            print(f"读取模板搜索区域历史失败: {e}")
+            return {}
+
+    def save_history(self):
+        """把学习到的搜索区域写入磁盘（与文件中其他注册表的记录合并）"""
+        if self.history_path is None:
+            return False
+        with self._lock:
+            records = {name: {'envelope': list(entry.learned_roi), 'recent': [list(box) for box in entry.recent],
+                              'hits': entry.hits, 'template_size': list(entry.size)}
+                       for name, entry in self._entries.items() if entry.learned_roi is not None}
+            forgotten = [name for name, entry in self._entries.items() if entry.learned_roi is None]
+            self._dirty = False
+            self._last_save_time = time.time()
+        try:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            history = {}
+            if self.history_path.exists():
+                with open(self.history_path, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            for name in forgotten:
+                history.pop(name, None)
+            history.update(records)
+            temp_path = self.history_path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(history, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.history_path)
+            self._history = history
+            return True
+        except Exception as e:
+            print(f"保存模板搜索区域历史失败: {e}")
+            return False
+
+    def forget(self, name=None):
+        """清除学习到的搜索区域（界面布局变化时使用），name 为 None 时清除全部"""
+        with self._lock:
+            for entry_name, entry in self._entries.items():
+                if name is None or entry_name == name:
+                    entry.learned_roi = None
+                    entry.recent.clear()
+                    entry.hits = 0
+                    self._history.pop(entry_name, None)
+            self._dirty = True
+
+    def get_stats(self):
+        """获取匹配统计：区域/全画面搜索次数及实际搜索的像素比例"""
+        with self._lock:
+            return {
+                'templates': len(self._entries),
+                'roi_searches': self.roi_searches,
+                'full_searches': self.full_searches,
+                'searched_pixel_ratio': (self.searched_pixels / self.full_frame_pixels
+                                         if self.full_frame_pixels else 0.0),
+                'search_windows': {name: entry.roi or entry.learned_roi for name, entry in self._entries.items()},
+            }
+
+
+class PyramidMatcher:
+    """两级金字塔模板匹配 - 适用于可能出现在画面任意位置的模板（前进箭头、拾取提示、重试按钮等）
+
+    先在缩小 2**levels 倍的画面上粗匹配，只在候选峰值附近用原分辨率精匹配，
+    结果与整张画面 TM_CCOEFF_NORMED 匹配一致（阈值以上的位置列表）。
+    细节多的小模板缩小后得分下降明显（与像素网格错开半个像素时尤甚），
+    粗匹配阈值按模板自身在最差相位下的缩小得分校准，校准后阈值过低的模板直接整图匹配。
+    """
+
+    def __init__(self, levels=1, coarse_slack=0.15, refine_radius=3, max_candidates=8, min_template_side=12,
+                 min_coarse_threshold=0.3):
+        """初始化金字塔匹配器
+
+        Args:
+            levels: 缩小级数，1 为 1/2，2 为 1/4
+            coarse_slack: 粗匹配阈值比精匹配阈值低多少（缩小后得分会下降）
+            refine_radius: 精匹配时在候选位置周围额外搜索的像素
+            max_candidates: 每个模板最多精匹配的候选峰值数
+            min_template_side: 缩小后模板短边低于该值时减少级数（太小的模板缩小后失去特征）
+            min_coarse_threshold: 校准后的粗匹配阈值低于该值时不做粗匹配（候选太多，不如整图匹配）
+        """
+        self.levels = max(0, levels)
+        self.coarse_slack = coarse_slack
+        self.refine_radius = refine_radius
+        self.max_candidates = max_candidates
+        self.min_template_side = min_template_side
+        self.min_coarse_threshold = min_coarse_threshold
+        self._templates = {}  # id(模板) -> (模板, {级数: 缩小模板})
+        self._coarse_ratios = {}  # (id(模板), 级数) -> (模板, 最差相位下的缩小自匹配得分)
+        self._last_frame = None
+        self._frame_levels = {}
+        self._frame_lock = threading.Lock()  # 线程池中并行匹配同一帧时共享缩小画面
+
+    def _level_for(self, template):
+        """模板可用的缩小级数"""
+        level = self.levels
+        while level > 0 and min(template.shape[:2]) >> level < self.min_template_side:
+            level -= 1
+        return level
+
+    def _scaled_template(self, template, level):
+        # 模板仓库中的模板直接用仓库缓存的金字塔（各匹配器共享）
+        data = template_store.lookup(template)
+        if data is not None:
+            return data.pyramid(level)
+        with self._frame_lock:
+            cached = self._templates.get(id(template))
+            if cached is None or cached[0] is not template:
+                cached = (template, {})
+                self._templates[id(template)] = cached
+            scaled = cached[1].get(level)
+            if scaled is None:
+                factor = 1 << level
+                scaled = cv2.resize(template, (template.shape[1] // factor, template.shape[0] // factor),
+                                    interpolation=cv2.INTER_AREA)
+                cached[1][level] = scaled
+            return scaled
+
+    def _coarse_ratio(self, template, level):
+        """模板在各种像素相位下缩小后与缩小模板的最低匹配得分（完全匹配时粗匹配得分的下限估计）"""
+        key = (id(template), level)
+        with self._frame_lock:
+            cached = self._coarse_ratios.get(key)
+            if cached is not None and cached[0] is template:
+                return cached[1]
+        small_template = self._scaled_template(template, level)
+        factor = 1 << level
+        template_h, template_w = template.shape[:2]
+        padded = cv2.copyMakeBorder(template, factor, factor, factor, factor, cv2.BORDER_REFLECT)
+        ratio = 1.0
+        for dy in range(factor):
+            for dx in range(factor):
+                # 模板左上角落在缩小网格内 (dx, dy) 相位时，覆盖它的那片画面缩小后的样子
+                patch = padded[factor - dy:factor - dy + template_h + factor, factor - dx:factor - dx + template_w + factor]
+                small_patch = cv2.resize(patch, (patch.shape[1] // factor, patch.shape[0] // factor),
+                                         interpolation=cv2.INTER_AREA)
+                score = float(cv2.matchTemplate(small_patch, small_template, cv2.TM_CCOEFF_NORMED).max())
+                ratio = min(ratio, score)
+        with self._frame_lock:
+            self._coarse_ratios[key] = (template, ratio)
+        return ratio
+
+    def _coarse_threshold(self, template, level, threshold):
+        """粗匹配阈值：固定的 coarse_slack 之外，再按模板缩小后的得分下降校准"""
+        return min(threshold, threshold * self._coarse_ratio(template, level)) - self.coarse_slack
+
+    def _scaled_frame(self, gray_frame, level):
+        """缩小画面，同一帧的多次匹配共享（按对象识别帧）"""
+        with self._frame_lock:
+            if self._last_frame is not gray_frame:
+                self._last_frame = gray_frame
+                self._frame_levels = {}
+            scaled = self._frame_levels.get(level)
+            if scaled is None:
+                factor = 1 << level
+                scaled = cv2.resize(gray_frame, (gray_frame.shape[1] // factor, gray_frame.shape[0] // factor),
+                                    interpolation=cv2.INTER_AREA)
+                self._frame_levels[level] = scaled
+            return scaled
+
+    def match(self, gray_frame, template, threshold=0.8, top_k=5):
+        """匹配模板
+
+        Returns:
+            list: 互不重叠的匹配框 [(x1, y1, x2, y2), ...]，按得分从高到低
+        """
+        return [box[:4] for box in self.match_peaks(gray_frame, template, threshold, top_k)]
+
+    def match_peaks(self, gray_frame, template, threshold=0.8, top_k=5):
+        """匹配模板并返回得分
+
+        Returns:
+            list: [(x1, y1, x2, y2, 得分), ...]，按得分从高到低
+        """
+        if template is None:
+            return []
+        frame_h, frame_w = gray_frame.shape[:2]
+        template_h, template_w = template.shape[:2]
+        if frame_h < template_h or frame_w < template_w:
+            return []
+
+        level = self._level_for(template)
+        coarse_threshold = self._coarse_threshold(template, level, threshold) if level else None
+        if level == 0 or coarse_threshold < self.min_coarse_threshold:
+            return match_peaks(gray_frame, template, threshold, top_k)
+
+        # 粗匹配：在缩小的画面上找候选峰值
+        small_template = self._scaled_template(template, level)
+        coarse = cv2.matchTemplate(self._scaled_frame(gray_frame, level), small_template, cv2.TM_CCOEFF_NORMED)
+        small_size = (small_template.shape[1], small_template.shape[0])
+        cxs, cys, _ = find_peaks(coarse, coarse_threshold, small_size, self.max_candidates)
+
+        # 精匹配：只在候选位置附近用原分辨率匹配，各窗口的峰值合并后再做一次抑制
+        factor = 1 << level
+        radius = factor + self.refine_radius
+        all_xs, all_ys, all_scores = [], [], []
+        for cx, cy in zip(cxs.tolist(), cys.tolist()):
+            x1, y1 = max(0, cx * factor - radius), max(0, cy * factor - radius)
+            x2 = min(frame_w, cx * factor + radius + template_w)
+            y2 = min(frame_h, cy * factor + radius + template_h)
+            if x2 - x1 < template_w or y2 - y1 < template_h:
+                continue
+            result = cv2.matchTemplate(gray_frame[y1:y2, x1:x2], template, cv2.TM_CCOEFF_NORMED)
+            xs, ys, scores = find_peaks(result, threshold, (template_w, template_h), top_k)
+            all_xs.append(xs + x1)
+            all_ys.append(ys + y1)
+            all_scores.append(scores)
+        if not all_scores:
+            return []
+        xs, ys, scores = suppress_peaks(np.concatenate(all_xs), np.concatenate(all_ys), np.concatenate(all_scores),
+                                        (template_w, template_h), top_k)
+        return [(x, y, x + template_w, y + template_h, score)
+                for x, y, score in zip(xs.tolist(), ys.tolist(), scores.tolist())]
+
+
+class MatchExecutor:
+    """模板匹配线程池 - 把一帧上的多个模板/区域分给共享线程池并行匹配
+
+    cv2.matchTemplate 运行时释放GIL，多个模板可以真正并行；
+    同时把 cv2 自身的线程数限制为 CPU核数 / 线程池大小，避免两层并行抢占核心。
+    """
+
+    def __init__(self, max_workers=None):
+        """初始化匹配线程池（线程池在第一次并行匹配时创建）
+
+        Args:
+            max_workers: 线程数，None 为 min(4, CPU核数)
+        """
+        self._pool = None
+        self._lock = threading.Lock()
+        self.max_workers = self._resolve_workers(max_workers)
+        self.cv2_threads = 0
+
+    @staticmethod
+    def _resolve_workers(max_workers):
+        return max(1, max_workers or min(4, os.cpu_count() or 4))
+
+    def configure(self, max_workers=None):
+        """修改线程池大小，下次并行匹配时按新大小重建"""
+        max_workers = self._resolve_workers(max_workers)
+        with self._lock:
+            if max_workers == self.max_workers:
+                return
+            old_pool, self._pool = self._pool, None
+            self.max_workers = max_workers
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def _get_pool(self):
+        """获取线程池，首次使用时创建并协调 cv2 线程数"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="TemplateMatch")
+                self.cv2_threads = max(1, (os.cpu_count() or 4) // self.max_workers)
+                cv2.setNumThreads(self.cv2_threads)
+                print(f"🧵 模板匹配线程池: {self.max_workers} 线程，cv2 每次调用 {self.cv2_threads} 线程")
+            return self._pool
+
+    def map(self, func, items):
+        """并行执行 func(item)，按输入顺序返回结果；单个任务异常时该项结果为空列表"""
+        items = list(items)
+        if len(items) <= 1 or threading.current_thread().name.startswith("TemplateMatch"):
+            # 只有一个任务或已经在线程池中（避免嵌套提交死锁）时直接执行
+            return [self._safe_call(func, item) for item in items]
+        pool = self._get_pool()
+        futures = [pool.submit(self._safe_call, func, item) for item in items]
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def _safe_call(func, item):
+        try:
+            return func(item)
+        except Exception as e:
+            print(f"并行模板匹配错误 {item}: {e}")
+            return []
+
+    def match_templates(self, gray_frame, templates, threshold=0.7, top_k=5, matcher=None):
+        """在一帧上并行匹配多个模板
+
+        Args:
+            templates: {名称: 灰度模板}
+            matcher: 匹配函数 matcher(gray_frame, template, threshold, top_k) -> 匹配框列表，
+                默认整张画面匹配（match_peaks）
+
+        Returns:
+            dict: {名称: [(x1, y1, x2, y2), ...]}
+        """
+        if matcher is None:
+            def matcher(frame, template, frame_threshold, frame_top_k):
+                return [peak[:4] for peak in match_peaks(frame, template, frame_threshold, frame_top_k)]
+        names = [name for name, template in templates.items() if template is not None]
+        results = self.map(lambda name: matcher(gray_frame, templates[name], threshold, top_k), names)
+        return dict(zip(names, results))
+
+    def shutdown(self):
+        """关闭线程池（之后的并行匹配会重新创建）"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+
+# 全局模板匹配线程池实例
+match_executor = MatchExecutor()
+
+
+def configure_match_executor(max_workers=None):
+    """设置全局模板匹配线程池大小的便捷函数"""
+    match_executor.configure(max_workers)
+
+
+def compare_with_full_match(frames, templates, threshold=0.8, tolerance=0.02, matcher=None):
+    """回归检查：金字塔匹配与整张画面 TM_CCOEFF_NORMED 的结果对比
+
+    Args:
+        frames: 灰度画面列表
+        templates: {名称: 灰度模板}
+        threshold: 匹配阈值
+        tolerance: 允许的最高得分差（整图最佳得分 - 金字塔找到的最佳得分）
+        matcher: PyramidMatcher，默认使用默认参数
+
+    Returns:
+        list: 超出容差的 (帧序号, 模板名称, 整图最佳得分, 金字塔最佳得分)
+    """
+    matcher = matcher or PyramidMatcher()
+    failures = []
+    for index, gray_frame in enumerate(frames):
+        for name, template in templates.items():
+            if gray_frame.shape[0] < template.shape[0] or gray_frame.shape[1] < template.shape[1]:
+                continue
+            full = cv2.matchTemplate(gray_frame, template, cv2.TM_CCOEFF_NORMED)
+            full_best = float(full.max())
+            boxes = matcher.match(gray_frame, template, threshold)
+            pyramid_best = max((float(full[y1, x1]) for x1, y1, _, _ in boxes), default=None)
+            if full_best < threshold:
+                # 整图无匹配时金字塔也不应有匹配
+                if pyramid_best is not None:
+                    failures.append((index, name, full_best, pyramid_best))
+            elif pyramid_best is None or full_best - pyramid_best > tolerance:
+                failures.append((index, name, full_best, pyramid_best))
+    return failures
+
+
+def test_pyramid_matcher(frames_dir=None, template_names=('qianjin', 'shifoujixu', 'retry_button', 'sailiya'),
+                         threshold=0.8, tolerance=0.02):
+    """金字塔匹配回归测试：有录制帧时用录制帧，否则把模板贴到随机背景上"""
+    import glob
+
+    templates = {name: template for name, template in template_store.get_many(template_names).items()
+                 if template is not None}
+    if not templates:
+        print("❌ 未找到模板图片，跳过测试")
+        return False
+
+    if frames_dir:
+        paths = sorted(glob.glob(os.path.join(frames_dir, '*.png')) + glob.glob(os.path.join(frames_dir, '*.jpg')))
+        frames = [frame for frame in (cv2.imread(path, 0) for path in paths) if frame is not None]
+    else:
+        rng = np.random.default_rng(0)
+        frames = []
+        for template in templates.values():
+            frame = cv2.GaussianBlur(rng.integers(0, 256, (600, 1067), dtype=np.uint8), (5, 5), 0)
+            y, x = int(rng.integers(0, 600 - template.shape[0])), int(rng.integers(0, 1067 - template.shape[1]))
+            frame[y:y + template.shape[0], x:x + template.shape[1]] = template
+            frames.append(frame)
+
+    matcher = PyramidMatcher()
+    start_time = time.perf_counter()
+    for frame in frames:
+        for template in templates.values():
+            cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+    full_ms = (time.perf_counter() - start_time) * 1000
+    start_time = time.perf_counter()
+    for frame in frames:
+        for template in templates.values():
+            matcher.match(frame, template, threshold)
+    pyramid_ms = (time.perf_counter() - start_time) * 1000
+
+    failures = compare_with_full_match(frames, templates, threshold, tolerance, matcher)
+    print(f"📊 {len(frames)} 帧 x {len(templates)} 个模板: 整图 {full_ms:.1f}ms，金字塔 {pyramid_ms:.1f}ms")
+    for index, name, full_best, pyramid_best in failures:
+        print(f"❌ 帧 {index} 模板 {name}: 整图最佳 {full_best:.3f}，金字塔 {pyramid_best}")
+    if not failures:
+        print(f"✅ 金字塔匹配与整图匹配一致（容差 {tolerance}）")
+    return not failures
+
+
+def _paste_with_score(frame, template, x, y, target_score, rng):
+    """把加噪声的模板贴到 (x, y)，使该位置的整图得分接近 target_score，返回实际得分"""
+    template_h, template_w = template.shape[:2]
+    values = template.astype(np.float32)
+    noise = rng.standard_normal(values.shape).astype(np.float32)
+
+    def paste(sigma):
+        patch = np.clip(values + sigma * noise, 0, 255).astype(np.uint8)
+        frame[y:y + template_h, x:x + template_w] = patch
+        return float(cv2.matchTemplate(patch, template, cv2.TM_CCOEFF_NORMED)[0, 0])
+
+    # 噪声越强得分越低，二分噪声强度
+    low, high = 0.0, 4.0 * float(values.std()) + 1.0
+    for _ in range(30):
+        middle = (low + high) / 2
+        if paste(middle) > target_score:
+            low = middle
+        else:
+            high = middle
+    return paste(low)
+
+
+def test_pyramid_edge_cases(template_names=('qianjin', 'shifoujixu', 'retry_button', 'sailiya'),
+                            threshold=0.8, tolerance=0.02):
+    """金字塔匹配边界情况：缩小后接近 min_template_side 的小模板、得分刚好在阈值上下的匹配
+
+    每种情况都与原分辨率整图 cv2.matchTemplate 的结果对比
+    """
+    matcher = PyramidMatcher()
+    rng = np.random.default_rng(1)
+    limit = matcher.min_template_side << matcher.levels  # 原尺寸短边低于该值时不做粗匹配
+    frames, templates = [], {}
+    # 小模板：短边在粗匹配下限附近（下限-1 退回整图匹配，下限和下限+1 走金字塔）
+    for height, width in [(limit - 1, limit + 8), (limit, limit), (limit, 3 * limit), (limit + 1, 2 * limit)]:
+        templates[f"{width}x{height}"] = cv2.GaussianBlur(rng.integers(0, 256, (height, width), dtype=np.uint8),
+                                                          (3, 3), 0)
+    # 真实模板也做一遍阈值附近的检查
+    templates.update({name: template for name, template in template_store.get_many(template_names).items()
+                      if template is not None})
+    # 得分：刚好低于阈值（不应匹配）、刚好高于阈值、明显高于阈值
+    scores = [threshold - 0.01, threshold + 0.005, threshold + 0.02, 0.95]
+    for name, texture in templates.items():
+        height, width = texture.shape[:2]
+        for target_score in scores:
+            frame = cv2.GaussianBlur(rng.integers(0, 256, (600, 1067), dtype=np.uint8), (5, 5), 0)
+            x, y = int(rng.integers(0, 1067 - width)), int(rng.integers(0, 600 - height))
+            _paste_with_score(frame, texture, x, y, target_score, rng)
+            frames.append((name, frame))
+
+    failures = []
+    for index, (name, frame) in enumerate(frames):
+        for _, _, full_best, pyramid_best in compare_with_full_match([frame], {name: templates[name]}, threshold,
+                                                                      tolerance, matcher):
+            failures.append((index, name, full_best, pyramid_best))
+    for index, name, full_best, pyramid_best in failures:
+        print(f"❌ 边界情况 {index} 模板 {name}: 整图最佳 {full_best:.3f}，金字塔 {pyramid_best}")
+    if not failures:
+        print(f"✅ 金字塔匹配边界情况与整图匹配一致: {len(templates)} 个模板 x {len(scores)} 个得分")
+    return not failures
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 用法: python template_matcher.py [录制帧目录]
+    ok = test_pyramid_matcher(sys.argv[1] if len(sys.argv) > 1 else None)
+    ok = test_pyramid_edge_cases() and ok
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,125 @@
+"""
+template_store.py - 进程内共享的模板仓库
+每个模板 PNG 只解码一次，各模块（YaoqiAutomator、SceneNavigator、MonsterFighterA 等）取到的是同一份只读数组。
+同时缓存匹配器需要的预处理结果：灰度图、金字塔缩小图。
+"""
+
+import os
+import sys
+import threading
+
+import cv2
+
+
+# 模板名称与文件名不一致的情况
+TEMPLATE_FILE_ALIASES = {
+    'diedangquandao_menkou': 'diedangqundao_menkou',
+}
+
+
+def resource_path(relative_path):
+    """获取资源文件的绝对路径"""
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, relative_path)
+    return os.path.join(os.path.abspath("."), relative_path)
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+class TemplateData:
+    """单个模板及其预处理结果（只读）"""
+
+    __slots__ = ('name', 'path', 'gray', '_levels', '_lock')
+
+    def __init__(self, name, path, gray):
+        self.name = name
+        self.path = path
+        self.gray = _read_only(gray)
+        self._levels = {0: self.gray}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        """模板尺寸 (宽, 高)"""
+        return self.gray.shape[1], self.gray.shape[0]
+
+    def pyramid(self, level):
+        """缩小 2**level 倍的模板（INTER_AREA），首次使用时生成"""
+        with self._lock:
+            scaled = self._levels.get(level)
+            if scaled is None:
+                factor = 1 << level
+                scaled = cv2.resize(self.gray, (self.gray.shape[1] // factor, self.gray.shape[0] // factor),
+                                    interpolation=cv2.INTER_AREA)
+                self._levels[level] = _read_only(scaled)
+            return scaled
+
+
+class TemplateStore:
+    """模板仓库 - 按名称加载 image/<名称>.png，线程安全，加载后不可修改"""
+
+    def __init__(self, image_dir='image'):
+        self.image_dir = image_dir
+        self._templates = {}  # 名称 -> TemplateData，加载失败为None
+        self._by_id = {}  # id(灰度数组) -> TemplateData
+        self._lock = threading.Lock()
+
+    def _path_for(self, name):
+        file_name = TEMPLATE_FILE_ALIASES.get(name, name)
+        return resource_path(os.path.join(self.image_dir, f'{file_name}.png'))
+
+    def get_data(self, name):
+        """获取模板及预处理结果，文件不存在或解码失败返回None"""
+        with self._lock:
+            if name in self._templates:
+                return self._templates[name]
+            path = self._path_for(name)
+            gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE) if os.path.exists(path) else None
+            if gray is None:
+                print(f"模板加载失败: {name} ({path})")
+                data = None
+            else:
+                data = TemplateData(name, path, gray)
+                self._by_id[id(data.gray)] = data
+                print(f"模板加载成功: {name}, 尺寸: {gray.shape[1]}x{gray.shape[0]}")
+            self._templates[name] = data
+            return data
+
+    def get(self, name):
+        """获取只读灰度模板，失败返回None"""
+        data = self.get_data(name)
+        return data.gray if data else None
+
+    def get_many(self, names):
+        """批量获取灰度模板 {名称: 模板}（失败的为None）"""
+        return {name: self.get(name) for name in names}
+
+    def lookup(self, template):
+        """根据灰度数组找回其 TemplateData（用于读取缓存的预处理结果），不是仓库中的模板返回None"""
+        data = self._by_id.get(id(template))
+        return data if data is not None and data.gray is template else None
+
+    def get_stats(self):
+        """获取已加载模板数"""
+        with self._lock:
+            return {
+                'loaded': sum(1 for data in self._templates.values() if data is not None),
+                'failed': [name for name, data in self._templates.items() if data is None],
+            }
+
+
+# 全局模板仓库实例
+template_store = TemplateStore()
+
+
+def get_template(name):
+    """获取共享灰度模板的便捷函数"""
+    return template_store.get(name)
+
+
+def get_templates(names):
+    """批量获取共享灰度模板的便捷函数"""
+    return template_store.get_many(names)
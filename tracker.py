@@ -0,0 +1,231 @@
+"""
+tracker.py - 轻量多目标跟踪
+IoU 关联 + 匀速卡尔曼滤波，为怪物、Boss 等目标分配稳定ID并估计速度。
+检测器只需每 N 帧运行一次，其余帧用跟踪预测的位置代替检测结果。
+"""
+
+import threading
+
+import numpy as np
+
+from detectors import Detection
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """计算两组框 (x1, y1, x2, y2) 的 IoU 矩阵"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    """单个跟踪目标 - 状态 [cx, cy, vx, vy]，速度单位为像素/秒"""
+
+    # 过程噪声和观测噪声（像素）
+    PROCESS_NOISE = 50.0
+    MEASUREMENT_NOISE = 4.0
+
+    def __init__(self, track_id, detection, timestamp):
+        x1, y1, x2, y2 = detection.bbox
+        self.track_id = track_id
+        self.cls_name = detection.cls_name
+        self.confidence = detection.confidence
+        self.width = float(x2 - x1)
+        self.height = float(y2 - y1)
+        self.state = np.array([(x1 + x2) / 2.0, (y1 + y2) / 2.0, 0.0, 0.0])
+        self.covariance = np.diag([10.0, 10.0, 1000.0, 1000.0])
+        self.last_timestamp = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+        self.misses = 0
+
+    @property
+    def x(self):
+        return int(self.state[0])
+
+    @property
+    def y(self):
+        return int(self.state[1])
+
+    @property
+    def velocity(self):
+        """速度估计 (vx, vy)，像素/秒"""
+        return float(self.state[2]), float(self.state[3])
+
+    @property
+    def bbox(self):
+        cx, cy = self.state[0], self.state[1]
+        return (int(cx - self.width / 2), int(cy - self.height / 2),
+                int(cx + self.width / 2), int(cy + self.height / 2))
+
+    def predict(self, timestamp):
+        """按匀速模型预测到 timestamp 时刻"""
+        dt = max(0.0, timestamp - self.last_timestamp)
+        if dt == 0.0:
+            return
+        transition = np.array([[1, 0, dt, 0], [0, 1, 0, dt], [0, 0, 1, 0], [0, 0, 0, 1]], dtype=np.float64)
+        q = self.PROCESS_NOISE ** 2
+        noise = np.diag([q * dt ** 2, q * dt ** 2, q * dt, q * dt])
+        self.state = transition @ self.state
+        self.covariance = transition @ self.covariance @ transition.T + noise
+        self.last_timestamp = timestamp
+
+    def correct(self, detection, timestamp):
+        """用新的检测结果修正状态"""
+        self.predict(timestamp)
+        x1, y1, x2, y2 = detection.bbox
+        measurement = np.array([(x1 + x2) / 2.0, (y1 + y2) / 2.0])
+        observation = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=np.float64)
+        innovation = measurement - observation @ self.state
+        s = observation @ self.covariance @ observation.T + np.eye(2) * self.MEASUREMENT_NOISE ** 2
+        gain = self.covariance @ observation.T @ np.linalg.inv(s)
+        self.state = self.state + gain @ innovation
+        self.covariance = (np.eye(4) - gain @ observation) @ self.covariance
+
+        # 尺寸做平滑，避免框大小抖动
+        self.width = 0.7 * self.width + 0.3 * (x2 - x1)
+        self.height = 0.7 * self.height + 0.3 * (y2 - y1)
+        self.confidence = detection.confidence
+        self.last_seen = timestamp
+        self.hits += 1
+        self.misses = 0
+
+    def to_detection(self):
+        """转换为 Detection（预测位置）"""
+        detection = Detection(self.cls_name, self.confidence, self.bbox)
+        detection.track_id = self.track_id
+        return detection
+
+    def __repr__(self):
+        return f"Track({self.track_id}, {self.cls_name}, ({self.x}, {self.y}), conf={self.confidence:.2f})"
+
+
+class ObjectTracker:
+    """多目标跟踪器 - 同类别 IoU 贪心关联，丢失超时后删除"""
+
+    def __init__(self, detect_interval=3, iou_threshold=0.2, max_center_distance=100, max_misses=2,
+                 max_lost_time=1.5, confidence_decay=0.85, min_confidence=0.3):
+        """初始化跟踪器
+
+        Args:
+            detect_interval: 每隔多少帧必须运行一次检测器
+            iou_threshold: 关联所需的最小 IoU
+            max_center_distance: IoU 不足时按中心距离关联的最大像素距离（快速移动的小目标）
+            max_misses: 连续多少次检测未匹配后删除轨迹
+            max_lost_time: 超过多少秒未匹配删除轨迹
+            confidence_decay: 每次仅预测（未检测）时置信度的衰减系数
+            min_confidence: 任一轨迹置信度低于该值时提前运行检测器
+        """
+        self.detect_interval = max(1, detect_interval)
+        self.iou_threshold = iou_threshold
+        self.max_center_distance = max_center_distance
+        self.max_misses = max_misses
+        self.max_lost_time = max_lost_time
+        self.confidence_decay = confidence_decay
+        self.min_confidence = min_confidence
+        self.tracks = {}
+        self._next_id = 1
+        self._frames_since_detection = self.detect_interval
+        self._lock = threading.Lock()
+
+    def needs_detection(self):
+        """本帧是否需要运行检测器"""
+        with self._lock:
+            if not self.tracks or self._frames_since_detection >= self.detect_interval:
+                return True
+            return any(track.confidence < self.min_confidence for track in self.tracks.values())
+
+    def update(self, detections, timestamp):
+        """用检测结果更新跟踪，并给每个 Detection 写入 track_id
+
+        Returns:
+            list: 当前所有轨迹
+        """
+        with self._lock:
+            self._frames_since_detection = 1
+            for track in self.tracks.values():
+                track.predict(timestamp)
+
+            unmatched_tracks = set(self.tracks)
+            for cls_name in {det.cls_name for det in detections}:
+                cls_dets = [det for det in detections if det.cls_name == cls_name]
+                cls_tracks = [track for track in self.tracks.values() if track.cls_name == cls_name]
+                matched_dets = set()
+                if cls_tracks:
+                    # 关联得分：IoU 为主，IoU 不足时用中心距离兜底（得分低于任何有效 IoU）
+                    scores = iou_matrix([t.bbox for t in cls_tracks], [d.bbox for d in cls_dets])
+                    track_centers = np.array([[t.x, t.y] for t in cls_tracks], dtype=np.float32)
+                    det_centers = np.array([[d.x, d.y] for d in cls_dets], dtype=np.float32)
+                    distances = np.linalg.norm(track_centers[:, None, :] - det_centers[None, :, :], axis=2)
+                    near = (scores < self.iou_threshold) & (distances < self.max_center_distance)
+                    scores[(scores < self.iou_threshold) & ~near] = -2
+                    scores[near] = -1 - distances[near] / self.max_center_distance  # 落在 (-2, -1]
+
+                    # 贪心关联：每次取剩余得分最高的一对
+                    while scores.size and scores.max() > -2:
+                        ti, di = np.unravel_index(int(scores.argmax()), scores.shape)
+                        track = cls_tracks[ti]
+                        track.correct(cls_dets[di], timestamp)
+                        cls_dets[di].track_id = track.track_id
+                        unmatched_tracks.discard(track.track_id)
+                        matched_dets.add(di)
+                        scores[ti, :] = -2
+                        scores[:, di] = -2
+
+                for di, det in enumerate(cls_dets):
+                    if di not in matched_dets:
+                        track = Track(self._next_id, det, timestamp)
+                        det.track_id = track.track_id
+                        self.tracks[track.track_id] = track
+                        self._next_id += 1
+
+            for track_id in unmatched_tracks:
+                track = self.tracks[track_id]
+                track.misses += 1
+                if track.misses >= self.max_misses or timestamp - track.last_seen > self.max_lost_time:
+                    del self.tracks[track_id]
+
+            return list(self.tracks.values())
+
+    def predict(self, timestamp):
+        """不运行检测器时推进所有轨迹
+
+        Returns:
+            list: 预测位置的 Detection 列表（置信度从高到低）
+        """
+        with self._lock:
+            self._frames_since_detection += 1
+            expired = []
+            for track in self.tracks.values():
+                track.predict(timestamp)
+                track.confidence *= self.confidence_decay
+                if timestamp - track.last_seen > self.max_lost_time:
+                    expired.append(track.track_id)
+            for track_id in expired:
+                del self.tracks[track_id]
+            detections = [track.to_detection() for track in self.tracks.values()]
+        detections.sort(key=lambda det: det.confidence, reverse=True)
+        return detections
+
+    def get_track(self, track_id):
+        """获取指定ID的轨迹，已丢失返回None"""
+        with self._lock:
+            return self.tracks.get(track_id)
+
+    def is_alive(self, track_id):
+        """目标是否仍在跟踪中（用于击杀确认）"""
+        return self.get_track(track_id) is not None
+
+    def reset(self):
+        """清空所有轨迹（切换地图时调用）"""
+        with self._lock:
+            self.tracks.clear()
+            self._frames_since_detection = self.detect_interval
@@ -12,13 +12,37 @@ import sys
 import math
 import threading
 import pygetwindow as gw
-from ultralytics import YOLO
+from model_registry import model_registry
 from input_controllers import create_input_controller
 from actions import YaoqiAttacker, AdvancedMovementController, SpeedCalculator
 import random
 import re
 import inspect
+import functools
 from memory_manager import memory_manager, optimize_memory
+from screen_capture import capture_service
+from frame_analysis import FrameAnalyzer
+from pipeline import PerceptionPipeline
+from tracker import ObjectTracker
+from template_matcher import DEFAULT_HISTORY_PATH, TemplateRegistry, match_executor, match_peaks
+from map_identifier import DEFAULT_MAP_REGION, MapIdentifier
+from template_store import template_store
+from scene_classifier import SCENE_DUNGEON, SCENE_FANPAI, SceneClassifier, scene_table_path
+from detection_plan import DetectionPlanner, DetectorSpec
+from frame_gate import FrameChangeGate
+from minimap import MINIMAP_REGION, BossRoomRevealed, DoorOpened, MinimapAnalyzer, MinimapTracker, RoomEntered
+from route_table import RouteTable, door_mask, mask_grids
+from minimap_planner import MinimapPlanner
+
+
+# 妖气追踪各状态需要运行的检测：
+# - searching: 未锁定地图，每帧检查翻牌并识别地图
+# - locked: 地图已锁定，不再识别地图，只读取小地图；翻牌每2帧检查一次
+# 'yolo' 控制感知流水线的检测器：未锁定地图时在城镇/导航中，不可能出现怪物，检测器暂停
+YAOQI_DETECTION_STATES = {
+    'searching': [DetectorSpec('fanpai'), DetectorSpec('map')],
+    'locked': [DetectorSpec('fanpai', every=2), DetectorSpec('minimap', roi=MINIMAP_REGION), DetectorSpec('yolo')],
+}
 
 
 def resource_path(relative_path):
@@ -42,36 +66,30 @@ class KeyMapper:
         return key_map.get(key.upper(), ord(key.upper()))
 
 
-def detect_objects_template(frame, templates, threshold=0.7):
-    """使用模板匹配检测对象"""
-    detected = {}
+def detect_objects_template(frame, templates, threshold=0.7, registry=None, gate=None):
+    """使用模板匹配检测对象
+
+    Args:
+        registry: 模板注册表（template_matcher.TemplateRegistry），提供时已注册的模板只在搜索区域内匹配
+        gate: 画面变化门控（frame_gate.FrameChangeGate），画面未变化时直接返回上次的结果
+    """
     if frame is None or frame.size == 0:
-        return detected
+        return {}
+    if gate is not None:
+        return gate.reuse(('templates',) + tuple(templates), frame,
+                          lambda: detect_objects_template(frame, templates, threshold, registry))
     
+    detected = {}
     gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if len(frame.shape) == 3 else frame
     
-    for name, template in templates.items():
-        if template is None:
-            continue
-            
-        try:
-            # 检查尺寸兼容性
-            if (gray_frame.shape[0] < template.shape[0] or 
-                gray_frame.shape[1] < template.shape[1]):
-                continue
-                
-            result = cv2.matchTemplate(gray_frame, template, cv2.TM_CCOEFF_NORMED)
-            locations = np.where(result >= threshold)
-            
-            for pt in zip(*locations[::-1]):
-                x1, y1 = pt
-                x2, y2 = x1 + template.shape[1], y1 + template.shape[0]
-                detected[name] = (x1, y1, x2, y2)
-                break  # 只取第一个匹配结果
-                
-        except Exception as e:
-            print(f"模板匹配错误 {name}: {e}")
-            continue
+    if registry is not None:
+        detected.update(registry.match_many(gray_frame, [name for name in templates if name in registry], threshold))
+        templates = {name: template for name, template in templates.items() if name not in registry}
+    
+    # 其余模板在线程池中并行整图匹配，只取得分最高的匹配（尺寸不合适的模板返回空结果）
+    for name, matches in match_executor.match_templates(gray_frame, templates, threshold, top_k=1).items():
+        if matches:
+            detected[name] = matches[0]
     
     return detected
 
@@ -98,7 +116,7 @@ def click_position(x, y, game_window):
 class YaoqiAutomator:
     """妖气追踪自动化类 - 整合版本"""
     
-    def __init__(self, input_controller=None):
+    def __init__(self, input_controller=None, detector_backend="PyTorch"):
         """初始化妖气追踪自动化模块"""
         self.input_controller = input_controller or create_input_controller("默认")
         self.stop_event = None
@@ -112,17 +130,21 @@ class YaoqiAutomator:
         self._model_lock = threading.Lock()
         self._combat_lock = threading.Lock()
         
-        # 初始化YOLO模型（共享给战斗系统使用）
-        try:
-            self.yolo_model = YOLO('models/best.pt')
-            # 优化YOLO模型设置
-            self.yolo_model.overrides['verbose'] = False  # 减少日志输出
-            self.yolo_model.overrides['max_det'] = 30  # 进一步限制最大检测数量
-            self.yolo_model.overrides['device'] = 'cpu'  # 强制使用CPU提高稳定性
-            print("YaoqiAutomator YOLO模型加载成功（CPU模式，已优化）")
-        except Exception as e:
-            print(f"YaoqiAutomator YOLO模型加载失败: {e}")
-            self.yolo_model = None
+        # 从模型注册表获取检测模型（进程内共享，已预热；CPU模式，限制最大检测数量）
+        self.yolo_model = model_registry.acquire(detector_backend, max_det=30)
+        if self.yolo_model is not None:
+            print(f"YaoqiAutomator 检测模型加载成功（{detector_backend} 后端）")
+        else:
+            print(f"YaoqiAutomator 检测模型加载失败（{detector_backend} 后端）")
+        
+        # 画面变化门控：加载、翻牌、导航等待期间画面不变时复用上次的检测结果
+        self.change_gate = FrameChangeGate()
+        # 帧分析器：同一帧只推理一次，地图逻辑和攻击器共享检测结果
+        self.frame_analyzer = FrameAnalyzer(self.yolo_model, change_gate=self.change_gate)
+        # 感知流水线：截图和推理在后台线程持续运行，移动期间也不停止；
+        # 跟踪器让检测器每3帧运行一次，其余帧使用跟踪预测
+        self.pipeline = PerceptionPipeline(self.frame_analyzer, tracker=ObjectTracker(detect_interval=3))
+        self.decision_interval = 0.5  # 决策循环间隔（秒）
         
         # 初始化复杂攻击系统（延迟初始化避免资源冲突）
         self.attacker = None
@@ -143,12 +165,28 @@ class YaoqiAutomator:
             print(f"EasyOCR 初始化失败: {e}")
             self.ocr_reader = None
         
-        # 加载模板
+        # 加载模板（同时注册到模板注册表，匹配只在各模板的搜索区域内进行，
+        # 搜索区域从历次匹配位置学习并保存到磁盘）
         self.templates = {}
+        self.template_registry = TemplateRegistry(margin=16, max_misses=5, history_path=DEFAULT_HISTORY_PATH)
         self.load_templates()
-        
-        # 小地图区域配置
-        self.MAP_X1, self.MAP_Y1, self.MAP_X2, self.MAP_Y2 = 929, 53, 1059, 108
+        # 地图识别器：一次调用在小地图区域内比较全部 ditu 模板
+        self.map_names = [f'ditu{i}' for i in range(1, 13)]
+        self.map_identifier = MapIdentifier({name: self.templates.get(name) for name in self.map_names},
+                                            threshold=0.8)
+        # 场景分类器：锚点哈希查表判断是否在翻牌界面，不确定时才做模板匹配
+        # 每个流程单独一张表：yaoqi 的 dungeon 指任一 ditu 地图，与深渊流程含义不同
+        self.scene_classifier = SceneClassifier(table_path=scene_table_path('yaoqi'))
+        # 检测规划器：按地图是否锁定决定每帧运行哪些检测
+        self.detection_planner = DetectionPlanner(YAOQI_DETECTION_STATES, 'searching')
+        # 导航用的界面模板（不含地图模板，地图由识别器负责）
+        self.ui_templates = {name: template for name, template in self.templates.items()
+                             if name not in self.map_names}
+        
+        # 小地图区域配置（与检测计划中 'minimap' 的区域一致）
+        self.MAP_X1, self.MAP_Y1, self.MAP_X2, self.MAP_Y2 = MINIMAP_REGION
+        # 小地图跟踪器：3x7 网格只重新分析变化的格子，换房间、开门、Boss房出现以事件返回
+        self.minimap_tracker = MinimapTracker(MinimapAnalyzer(region=MINIMAP_REGION))
         
         # 状态变量
         self.current_role = 0
@@ -161,10 +199,16 @@ class YaoqiAutomator:
         
         # 地图状态管理
         self.current_confirmed_map = None  # 当前确认的地图
+        self.map_freshly_confirmed = False  # 本帧是否由地图识别实际匹配确认（不含锁定沿用、门控复用）
         self.map_locked = False  # 地图是否锁定（专注模式）
         self.fanpai_detected = False  # 是否检测到翻牌
         
         # 地图逻辑配置
+        # 跑图路线表：{地图: {格子: 路线}}，门条件预编译为位掩码
+        self.route_table = RouteTable.load()
+        # 小地图路径规划：路线表未覆盖时按房间图走最短路径去Boss房间
+        self.minimap_planner = MinimapPlanner()
+        self.prefer_minimap_planner = False  # True 时有路径就优先按规划走，不再查路线表
         self.map_logic_config = self._init_map_logic()
         
         print("YaoqiAutomator初始化完成（集成复杂攻击系统）")
@@ -182,7 +226,8 @@ class YaoqiAutomator:
                 # 只初始化攻击器，避免重复初始化引起的内存问题
                 if self.attacker is None and self.yolo_model is not None:
                     # 传入共享的YOLO模型和input_controller，避免重复创建
-                    self.attacker = YaoqiAttacker(self.input_controller, yolo_model=self.yolo_model)
+                    self.attacker = YaoqiAttacker(self.input_controller, yolo_model=self.yolo_model,
+                                                  frame_analyzer=self.frame_analyzer, pipeline=self.pipeline)
                     print("✅ 攻击器初始化完成（共享YOLO模型）")
                 
                 # 简化系统，暂时不初始化复杂的移动控制器
@@ -206,60 +251,25 @@ class YaoqiAutomator:
                 return False
     
     def load_templates(self):
-        """加载所需的模板图片"""
-        template_files = {
-            'sailiya': 'image/sailiya.png',
-            'shenyuan': 'image/shenyuan.png',
-            'yaoqizhuizongxuanze': 'image/yaoqizhuizongxuanze.png',
-            'yaoqizhuizongpindao': 'image/yaoqizhuizongpindao.png',
-            'fanpai': 'image/fanpai.png',
-            'youjianxiang': 'image/youjianxiang.png',
-            'ditu1': 'image/ditu1.png',
-            'ditu2': 'image/ditu2.png', 
-            'ditu3': 'image/ditu3.png',
-            'ditu4': 'image/ditu4.png',
-            'ditu5': 'image/ditu5.png',
-            'ditu6': 'image/ditu6.png',
-            'ditu7': 'image/ditu7.png',
-            'ditu8': 'image/ditu8.png',
-            'ditu9': 'image/ditu9.png',
-            'ditu10': 'image/ditu10.png',
-            'ditu11': 'image/ditu11.png',
-            'ditu12': 'image/ditu12.png',
-        }
-        
-        for name, path in template_files.items():
-            template_path = resource_path(path)
-            if os.path.exists(template_path):
-                template = cv2.imread(template_path, 0)
-                if template is not None:
-                    self.templates[name] = template
-                    h, w = template.shape
-                    print(f"模板加载成功: {name}, 尺寸: {w}x{h}")
-                else:
-                    print(f"模板加载失败: {name}")
-            else:
-                print(f"模板文件不存在: {template_path}")
+        """从进程内共享的模板仓库获取所需的模板（每个PNG只解码一次）"""
+        template_names = [
+            'sailiya', 'shenyuan', 'yaoqizhuizongxuanze', 'yaoqizhuizongpindao', 'fanpai', 'youjianxiang',
+            'ditu1', 'ditu2', 'ditu3', 'ditu4', 'ditu5', 'ditu6',
+            'ditu7', 'ditu8', 'ditu9', 'ditu10', 'ditu11', 'ditu12',
+        ]
+        
+        for name, template in template_store.get_many(template_names).items():
+            if template is not None:
+                self.templates[name] = template
+                self.template_registry.register(name, template)
     
     def _init_map_logic(self):
-        """初始化地图逻辑配置 - 现在使用详细的跑图函数"""
-        return {
-            'ditu1': self.run_ditu1,
-            'ditu2': self.run_ditu2,
-            'ditu3': self.run_ditu3,
-            'ditu4': self.run_ditu4,
-            'ditu5': self.run_ditu5,
-            'ditu6': self.run_ditu6,
-            'ditu7': self.run_ditu7,
-            'ditu8': self.run_ditu8,
-            'ditu9': self.run_ditu9,
-            'ditu10': self.run_ditu10,
-            'ditu11': self.run_ditu11,
-            'ditu12': self.run_ditu12
-        }
+        """初始化地图逻辑配置 - 每张地图都由路线表驱动的通用跑图函数执行（没有路线表的地图按路径规划）"""
+        map_names = list(dict.fromkeys(self.map_names + self.route_table.maps))
+        return {map_name: functools.partial(self.run_route, map_name) for map_name in map_names}
     
-    def detect_template(self, frame, template, threshold=0.7):
-        """检测模板匹配"""
+    def detect_template(self, frame, template, threshold=0.7, top_k=5):
+        """检测模板匹配，返回互不重叠的前 top_k 个匹配框（按得分从高到低）"""
         if template is None:
             return []
         
@@ -270,45 +280,41 @@ class YaoqiAutomator:
             return []
         
         try:
-            result = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
-            locations = np.where(result >= threshold)
-            
-            matches = []
-            for pt in zip(*locations[::-1]):
-                matches.append((pt[0], pt[1], pt[0] + template.shape[1], pt[1] + template.shape[0]))
-            
-            return matches
+            return [peak[:4] for peak in match_peaks(frame, template, threshold, top_k)]
         except Exception as e:
             print(f"模板匹配错误: {e}")
             return []
     
     def detect_current_map(self, frame):
         """检测当前地图 - 在全屏幕中检测地图模板"""
+        self.map_freshly_confirmed = False
         # 如果地图已锁定且未检测到翻牌，直接返回当前确认的地图
         if self.map_locked and self.current_confirmed_map and not self.fanpai_detected:
             return self.current_confirmed_map
         
-        # 转换为灰度图像，在整个游戏窗口中检测
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # 一次调用在小地图区域内比较全部地图模板，取得分最高的地图（小地图区域未变化时复用上次结果）
+        identified = []
         
-        for map_name in ['ditu1', 'ditu2', 'ditu3', 'ditu4', 'ditu5', 'ditu6', 
-                        'ditu7', 'ditu8', 'ditu9', 'ditu10', 'ditu11', 'ditu12']:
-            if map_name in self.templates:
-                template = self.templates[map_name]
-                matches = self.detect_template(gray_frame, template, 0.8)
-                if matches:
-                    print(f"✅ 检测到地图: {map_name}")
-                    
-                    # 如果是新检测到的地图，锁定它
-                    if not self.map_locked or self.current_confirmed_map != map_name:
-                        self.current_confirmed_map = map_name
-                        self.map_locked = True
-                        self.fanpai_detected = False
-                        print(f"🔒 地图已锁定: {map_name}，进入专注模式")
-                    
-                    return map_name
+        def identify():
+            result = self.map_identifier.identify(frame)
+            identified.append(result[0] is not None)
+            return result
         
-        return None
+        map_name, confidence = self.change_gate.reuse('map', frame, identify, roi=DEFAULT_MAP_REGION)
+        self.map_freshly_confirmed = bool(identified) and identified[0]
+        if map_name is None:
+            return None
+        
+        print(f"✅ 检测到地图: {map_name} (置信度 {confidence:.2f})")
+        
+        # 如果是新检测到的地图，锁定它
+        if not self.map_locked or self.current_confirmed_map != map_name:
+            self.current_confirmed_map = map_name
+            self.map_locked = True
+            self.fanpai_detected = False
+            print(f"🔒 地图已锁定: {map_name}，进入专注模式")
+        
+        return map_name
     
     def detect_minimap_blinking(self, frame):
         """检测小地图闪烁 - 增强版"""
@@ -337,93 +343,29 @@ class YaoqiAutomator:
         
         return red_ratio > 0.1
     
-    def detect_minimap_advanced(self, frame):
-        """高级小地图检测 - 参考main3.py的detect_blinking函数"""
-        roi = frame[self.MAP_Y1:self.MAP_Y2, self.MAP_X1:self.MAP_X2]
+    def detect_minimap_advanced(self, roi):
+        """高级小地图检测 - 参考main3.py的detect_blinking函数
+
+        Args:
+            roi: 按检测计划截取的小地图区域（plan.crop('minimap', frame)）
+        """
         
         # 检查ROI有效性
         if roi.size == 0 or np.mean(roi) < 10:
             print("警告：小地图ROI无效或黑屏，跳过检测")
             return None, {}, None, []
         
-        # 初始化状态
-        grid_height = (self.MAP_Y2 - self.MAP_Y1) // 3
-        grid_width = (self.MAP_X2 - self.MAP_X1) // 7
-        door_states = {}
-        character_grid = None
-        boss_grid = None
-        
-        # 颜色检测设置
-        target_bgr = np.array([17, 135, 94])  # 门的颜色
-        bgr_tolerance = 20
-        lower_bgr = np.clip(target_bgr - bgr_tolerance, 0, 255)
-        upper_bgr = np.clip(target_bgr + bgr_tolerance, 0, 255)
-        
-        boss_bgr = np.array([2, 80, 232])  # Boss的颜色
-        boss_tolerance = 30
-        lower_boss_bgr = np.clip(boss_bgr - boss_tolerance, 0, 255)
-        upper_boss_bgr = np.clip(boss_bgr + boss_tolerance, 0, 255)
-        
-        # 角色检测（蓝色6x10像素）
-        hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-        lower_blue = np.array([90, 150, 50])
-        upper_blue = np.array([130, 255, 255])
-        blue_mask = cv2.inRange(hsv_roi, lower_blue, upper_blue)
-        
-        # 遍历3x7网格检测
-        for row in range(3):
-            for col in range(7):
-                x = col * grid_width
-                y = row * grid_height
-                grid_name = f"{row + 1}-{col + 1}"
-                
-                # 检测区域边界
-                detect_x_start = x + 2
-                detect_y_start = y + 2
-                detect_x_end = x + grid_width - 2
-                detect_y_end = y + grid_height - 2
-                
-                # 角色检测（蓝色6x10像素）
-                patch_blue_mask = blue_mask[detect_y_start:detect_y_end, detect_x_start:detect_x_end]
-                contours, _ = cv2.findContours(patch_blue_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                for contour in contours:
-                    bx, by, bw, bh = cv2.boundingRect(contour)
-                    if bw == 6 and bh == 10:
-                        character_grid = grid_name
-                        print(f"📍 小地图检测到角色位置: {character_grid}")
-                        break
-                
-                # 网格区域提取
-                grid_patch = roi[detect_y_start:detect_y_end, detect_x_start:detect_x_end]
-                
-                # Boss检测（红色8-12x8-12像素）
-                boss_mask = cv2.inRange(grid_patch, lower_boss_bgr, upper_boss_bgr)
-                contours, _ = cv2.findContours(boss_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                for contour in contours:
-                    bx, by, bw, bh = cv2.boundingRect(contour)
-                    if 8 <= bw <= 12 and 8 <= bh <= 12:
-                        boss_grid = grid_name
-                        print(f"👹 小地图检测到Boss位置: {boss_grid}")
-                        break
-                
-                # 门状态检测
-                door_mask = cv2.inRange(grid_patch, lower_bgr, upper_bgr)
-                door_pixels = np.sum(door_mask)
-                door_open = door_pixels > 100
-                door_states[grid_name] = 'open' if door_open else 'closed'
-                
-                # 详细的门状态检测日志（每10次检测打印一次，避免日志过多）
-                if hasattr(self, '_door_log_counter'):
-                    self._door_log_counter += 1
-                else:
-                    self._door_log_counter = 1
-                    
-                if self._door_log_counter % 100 == 0:  # 每100次检测打印一次门状态
-                    if door_open:
-                        print(f"🚪 检测到门开启: {grid_name}, 像素数: {door_pixels}")
-                elif door_open:
-                    # 如果检测到门开启，立即打印（不受计数器限制）
-                    print(f"🚪 门开启: {grid_name}, 像素数: {door_pixels}")
+        # 只重新分析哈希变化的格子，状态变化以事件形式保存在 self.minimap_tracker.events
+        for event in self.minimap_tracker.update_region(roi):
+            if isinstance(event, RoomEntered):
+                print(f"📍 小地图检测到角色进入房间: {event.grid}")
+            elif isinstance(event, DoorOpened):
+                print(f"🚪 门开启: {event.grid}")
+                self.minimap_planner.invalidate()
+            elif isinstance(event, BossRoomRevealed):
+                print(f"👹 小地图检测到Boss位置: {event.grid}")
+                self.minimap_planner.invalidate()
+        character_grid, door_states, boss_grid = self.minimap_tracker.state()
         
         # 门状态汇总（每50次检测打印一次）
         if hasattr(self, '_summary_counter'):
@@ -432,7 +374,7 @@ class YaoqiAutomator:
             self._summary_counter = 1
             
         if self._summary_counter % 50 == 0:
-            open_doors = [k for k, v in door_states.items() if v == 'open']
+            open_doors = self.minimap_tracker.open_doors
             if open_doors:
                 print(f"🗺️ 小地图状态汇总: 角色={character_grid}, Boss={boss_grid}, 开门={', '.join(open_doors)}")
         
@@ -446,8 +388,8 @@ class YaoqiAutomator:
                 return False
             
             gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            template = self.templates['fanpai']
-            matches = self.detect_template(gray_frame, template, 0.7)
+            matches = self.change_gate.reuse('fanpai', gray_frame,
+                                             lambda: self.template_registry.match(gray_frame, 'fanpai', 0.7))
             
             if matches:
                 print("🎴 检测到翻牌界面！重置地图状态")
@@ -462,9 +404,13 @@ class YaoqiAutomator:
         """重置地图状态（检测到翻牌时调用）"""
         self.current_confirmed_map = None
         self.map_locked = False
+        self.detection_planner.transition('searching')
         self.fanpai_detected = True
         self.speed_detected = False  # 重置速度检测状态
         self.first_ditu_detected = False
+        self.pipeline.tracker.reset()  # 换图后旧目标全部失效
+        self.minimap_tracker.reset()
+        self.minimap_planner.invalidate()
         print("🔓 地图状态已重置，退出专注模式")
     
     def execute_focused_map_logic(self, current_map, game_window, character_grid, door_states, boss_grid):
@@ -481,32 +427,21 @@ class YaoqiAutomator:
                     print("⚠️ 战斗系统初始化失败，使用简化逻辑")
                     # 即使战斗系统失败，也要继续执行地图逻辑
             
-            # 获取当前帧进行YOLO检测
-            with mss.mss() as sct:
-                region = {'left': 0, 'top': 0, 'width': 1067, 'height': 600}
-                screenshot = sct.grab(region)
-                frame_rgb = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2RGB)
+            # 从感知流水线获取最新的检测结果
+            perception = self.pipeline.get_result()
+            if perception is None:
+                print("⚠️ 截图服务未返回画面，跳过本次地图逻辑")
+                return
+            analysis = perception.analysis
             
             # 获取角色位置和状态信息
-            chenghao_box = None
+            chenghao_box = analysis.character_box
             monsters = []
             skill_availability = {}
             
-            # 使用YOLO检测角色位置
-            if self.yolo_model is not None:
-                results = self.yolo_model.predict(frame_rgb, verbose=False)
-                for result in results:
-                    for box in result.boxes:
-                        cls_id = int(box.cls)
-                        if cls_id in result.names:
-                            cls_name = result.names[cls_id]
-                            if cls_name == 'chenghao':
-                                chenghao_box = list(map(int, box.xyxy[0]))
-                                break
-            
             # 检测怪物 - 添加安全检查
             if self.attacker is not None:
-                monsters = self.attacker.detect_monsters(frame_rgb)
+                monsters = self.attacker.detect_monsters(None, analysis)
             else:
                 print("⚠️ 攻击器未初始化，跳过怪物检测")
                 monsters = []
@@ -546,33 +481,23 @@ class YaoqiAutomator:
                 print(f"🔄 角色已切换，重新进行速度检测")
                 self.trigger_speed_detection(game_window)
             
-            # 获取当前帧进行YOLO检测
-            with mss.mss() as sct:
-                region = {'left': 0, 'top': 0, 'width': 1067, 'height': 600}
-                screenshot = sct.grab(region)
-                frame_rgb = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2RGB)
+            # 从感知流水线获取最新的检测结果
+            perception = self.pipeline.get_result()
+            if perception is None:
+                print("⚠️ 截图服务未返回画面，跳过本次地图逻辑")
+                return
+            analysis = perception.analysis
             
             # 获取角色位置和状态信息
-            chenghao_box = None
+            chenghao_box = analysis.character_box
             monsters = []
             skill_availability = {}
-            
-            # 使用YOLO检测角色位置
-            if self.yolo_model is not None:
-                results = self.yolo_model.predict(frame_rgb)
-                for result in results:
-                    for box in result.boxes:
-                        cls_id = int(box.cls)
-                        if cls_id in result.names:
-                            cls_name = result.names[cls_id]
-                            if cls_name == 'chenghao':
-                                chenghao_box = list(map(int, box.xyxy[0]))
-                                print(f"✅ 检测到角色位置: {chenghao_box}")
-                                break
+            if chenghao_box is not None:
+                print(f"✅ 检测到角色位置: {chenghao_box}")
             
             # 检测怪物 - 添加安全检查
             if self.attacker is not None:
-                monsters = self.attacker.detect_monsters(frame_rgb)
+                monsters = self.attacker.detect_monsters(None, analysis)
                 print(f"🎯 检测到 {len(monsters)} 个怪物")
             else:
                 print("⚠️ 攻击器未初始化，跳过怪物检测")
@@ -629,13 +554,13 @@ class YaoqiAutomator:
             
             # 检测塞利亚房间
             if 'sailiya' in self.templates:
-                matches = self.detect_template(gray_frame, self.templates['sailiya'])
+                matches = self.template_registry.match(gray_frame, 'sailiya')
                 if matches:
                     print("检测到塞利亚房间，导航到妖气追踪")
                     
                     # 点击妖气追踪选择
                     if 'yaoqizhuizongxuanze' in self.templates:
-                        yaoqi_matches = self.detect_template(gray_frame, self.templates['yaoqizhuizongxuanze'])
+                        yaoqi_matches = self.template_registry.match(gray_frame, 'yaoqizhuizongxuanze')
                         if yaoqi_matches:
                             x1, y1, x2, y2 = yaoqi_matches[0]
                             center_x = x1 + (x2 - x1) // 2
@@ -646,7 +571,7 @@ class YaoqiAutomator:
             
             # 检测妖气追踪频道
             if 'yaoqizhuizongpindao' in self.templates:
-                matches = self.detect_template(gray_frame, self.templates['yaoqizhuizongpindao'])
+                matches = self.template_registry.match(gray_frame, 'yaoqizhuizongpindao')
                 if matches:
                     print("检测到妖气追踪频道")
                     x1, y1, x2, y2 = matches[0]
@@ -735,169 +660,155 @@ class YaoqiAutomator:
             return False
 
         steps = navigation_steps[target_map]
-        with mss.mss() as sct:
-            region = {'left': 0, 'top': 0, 'width': 1067, 'height': 600}
-            frame_count = 0
+        frame_count = 0
 
-            for step in steps:
-                print(f"执行步骤: {step}")
-                if "wait" in step:
-                    start_time = time.time()
-                    while time.time() - start_time < step["wait"]:
-                        detected = {}
-                        try:
-                            screenshot = sct.grab(region)
-                            frame = np.array(screenshot)
-                            if frame is None or frame.size == 0:
-                                print("警告：截图为空，跳过此次检测")
-                                time.sleep(0.1)
-                                continue
-                            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                            detected = detect_objects_template(frame, self.templates)
-                        except Exception as e:
-                            print(f"截图或检测错误: {e}")
+        for step in steps:
+            print(f"执行步骤: {step}")
+            if "wait" in step:
+                start_time = time.time()
+                while time.time() - start_time < step["wait"]:
+                    detected = {}
+                    try:
+                        frame = capture_service.get_latest_frame(copy=False)
+                        if frame is None or frame.size == 0:
+                            print("警告：截图为空，跳过此次检测")
                             time.sleep(0.1)
                             continue
-                        print(f"检测到的对象: {detected}")
-
-                        if "detect" in step and step["detect"] in detected:
-                            x1, y1, x2, y2 = detected[step["detect"]]
-                            print(f"检测到 {step['detect']}，执行动作")
-                            try:
-                                step["action"](x1, y1, x2, y2)
-                                if step["detect"] == "yaoqizhuizongxuanze":
-                                    print("等待验证导航是否成功（检测地图标识）")
-                                    verify_start_time = time.time()
-                                    while time.time() - verify_start_time < 3:
-                                        try:
-                                            screenshot = sct.grab(region)
-                                            frame = np.array(screenshot)
-                                            if frame is not None and frame.size > 0:
-                                                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                                                verify_detected = detect_objects_template(frame, self.templates)
-                                                print(f"验证检测到的对象: {verify_detected}")
-                                                # 检查是否检测到了任何地图标识
-                                                map_detected = any(key in verify_detected for key in ["ditu1", "ditu2", "ditu3", "ditu4", "ditu5", "ditu6", "ditu7", "ditu8", "ditu9", "ditu10", "ditu11", "ditu12"])
-                                                if map_detected:
-                                                    detected_maps = [key for key in verify_detected.keys() if key.startswith("ditu")]
-                                                    print(f"检测到地图标识: {detected_maps}，导航成功")
-                                                    return True
-                                            time.sleep(0.1)
-                                        except Exception as e:
-                                            print(f"验证检测错误: {e}")
-                                            time.sleep(0.1)
-                                    print("未检测到地图标识，导航失败")
-                                    if "fail_action" in steps[-1]:
-                                        try:
-                                            steps[-1]["fail_action"]()
-                                            print("执行最后的失败操作")
-                                        except Exception as e:
-                                            print(f"执行最后的失败操作时出错: {e}")
-                                    return False
-                                break
-                            except Exception as e:
-                                print(f"执行动作失败: {e}")
-                                return False
-                        elif "detect_absence" in step and step["detect_absence"] not in detected:
-                            print(f"未检测到 {step['detect_absence']}，执行动作")
-                            try:
-                                step["action"]()
-                                break
-                            except Exception as e:
-                                print(f"执行动作失败: {e}")
-                                return False
+                        detected = detect_objects_template(frame, self.ui_templates, registry=self.template_registry,
+                                                           gate=self.change_gate)
+                    except Exception as e:
+                        print(f"截图或检测错误: {e}")
                         time.sleep(0.1)
-                    else:
-                        if "fail_action" in step:
-                            print(f"导航超时，执行失败操作")
-                            try:
-                                step["fail_action"]()
-                                print("失败操作执行完成")
-                                return False
-                            except Exception as e:
-                                print(f"执行失败操作时出错: {e}")
-                                return False
                         continue
+                    print(f"检测到的对象: {detected}")
 
-                elif "detect" in step:
-                    while True:
-                        frame_count += 1
-                        detected = {}
+                    if "detect" in step and step["detect"] in detected:
+                        x1, y1, x2, y2 = detected[step["detect"]]
+                        print(f"检测到 {step['detect']}，执行动作")
                         try:
-                            screenshot = sct.grab(region)
-                            frame = np.array(screenshot)
-                            if frame is None or frame.size == 0:
-                                print("警告：截图为空，跳过此次检测")
-                                time.sleep(0.1)
-                                continue
-                            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                            if frame_count % 3 == 0:
-                                detected = detect_objects_template(frame, self.templates)
+                            step["action"](x1, y1, x2, y2)
+                            if step["detect"] == "yaoqizhuizongxuanze":
+                                print("等待验证导航是否成功（检测地图标识）")
+                                verify_start_time = time.time()
+                                while time.time() - verify_start_time < 3:
+                                    try:
+                                        frame = capture_service.get_latest_frame(copy=False)
+                                        if frame is not None and frame.size > 0:
+                                            # 检查是否检测到了任何地图标识
+                                            map_name, confidence = self.map_identifier.identify(frame)
+                                            if map_name is not None:
+                                                print(f"检测到地图标识: {map_name} (置信度 {confidence:.2f})，导航成功")
+                                                return True
+                                        time.sleep(0.1)
+                                    except Exception as e:
+                                        print(f"验证检测错误: {e}")
+                                        time.sleep(0.1)
+                                print("未检测到地图标识，导航失败")
+                                if "fail_action" in steps[-1]:
+                                    try:
+                                        steps[-1]["fail_action"]()
+                                        print("执行最后的失败操作")
+                                    except Exception as e:
+                                        print(f"执行最后的失败操作时出错: {e}")
+                                return False
+                            break
                         except Exception as e:
-                            print(f"截图或检测错误: {e}")
+                            print(f"执行动作失败: {e}")
+                            return False
+                    elif "detect_absence" in step and step["detect_absence"] not in detected:
+                        print(f"未检测到 {step['detect_absence']}，执行动作")
+                        try:
+                            step["action"]()
+                            break
+                        except Exception as e:
+                            print(f"执行动作失败: {e}")
+                            return False
+                    time.sleep(0.1)
+                else:
+                    if "fail_action" in step:
+                        print(f"导航超时，执行失败操作")
+                        try:
+                            step["fail_action"]()
+                            print("失败操作执行完成")
+                            return False
+                        except Exception as e:
+                            print(f"执行失败操作时出错: {e}")
+                            return False
+                    continue
+
+            elif "detect" in step:
+                while True:
+                    frame_count += 1
+                    detected = {}
+                    try:
+                        frame = capture_service.get_latest_frame(copy=False)
+                        if frame is None or frame.size == 0:
+                            print("警告：截图为空，跳过此次检测")
                             time.sleep(0.1)
                             continue
-                        
                         if frame_count % 3 == 0:
-                            print(f"检测到的对象: {detected}")
+                            detected = detect_objects_template(frame, self.ui_templates, registry=self.template_registry,
+                                                               gate=self.change_gate)
+                    except Exception as e:
+                        print(f"截图或检测错误: {e}")
+                        time.sleep(0.1)
+                        continue
                         
-                        if step["detect"] in detected:
-                            if "action" in step and callable(step["action"]):
+                    if frame_count % 3 == 0:
+                        print(f"检测到的对象: {detected}")
+                        
+                    if step["detect"] in detected:
+                        if "action" in step and callable(step["action"]):
+                            try:
+                                # 检查lambda函数的参数数量
                                 try:
-                                    # 检查lambda函数的参数数量
-                                    try:
-                                        # 尝试检查函数签名
-                                        import inspect
-                                        sig = inspect.signature(step["action"])
-                                        param_count = len(sig.parameters)
-                                    except:
-                                        # 如果检查失败，通过函数名猜测
-                                        param_count = 0 if "sailiya" in step.get("detect", "") else 4
+                                    # 尝试检查函数签名
+                                    import inspect
+                                    sig = inspect.signature(step["action"])
+                                    param_count = len(sig.parameters)
+                                except:
+                                    # 如果检查失败，通过函数名猜测
+                                    param_count = 0 if "sailiya" in step.get("detect", "") else 4
                                     
-                                    if param_count >= 4:  # 需要坐标参数
-                                        x1, y1, x2, y2 = detected[step["detect"]]
-                                        print(f"检测到 {step['detect']}，执行动作")
-                                        step["action"](x1, y1, x2, y2)
-                                    else:
-                                        step["action"]()
-                                    break
-                                except Exception as e:
-                                    print(f"执行动作失败: {e}")
-                                    return False
-                        time.sleep(0.1)
+                                if param_count >= 4:  # 需要坐标参数
+                                    x1, y1, x2, y2 = detected[step["detect"]]
+                                    print(f"检测到 {step['detect']}，执行动作")
+                                    step["action"](x1, y1, x2, y2)
+                                else:
+                                    step["action"]()
+                                break
+                            except Exception as e:
+                                print(f"执行动作失败: {e}")
+                                return False
+                    time.sleep(0.1)
 
-                elif "fail_action" in step and "wait" not in step:
-                    continue
+            elif "fail_action" in step and "wait" not in step:
+                continue
 
-            print("导航未完成最终验证，检查当前状态")
-            try:
-                screenshot = sct.grab(region)
-                frame = np.array(screenshot)
-                if frame is not None and frame.size > 0:
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                    detected = detect_objects_template(frame, self.templates)
-                else:
-                    detected = {}
-            except Exception as e:
-                print(f"最终验证截图错误: {e}")
-                detected = {}
-            
-            print(f"最终检测到的对象: {detected}")
-            # 检查是否成功进入妖气追踪（检测地图标识）
-            map_detected = any(key in detected for key in ["ditu1", "ditu2", "ditu3", "ditu4", "ditu5", "ditu6", "ditu7", "ditu8", "ditu9", "ditu10", "ditu11", "ditu12"])
-            if map_detected:
-                detected_maps = [key for key in detected.keys() if key.startswith("ditu")]
-                print(f"界面已改变，检测到地图: {detected_maps}，导航成功")
-                return True
+        print("导航未完成最终验证，检查当前状态")
+        try:
+            frame = capture_service.get_latest_frame(copy=False)
+            if frame is not None and frame.size > 0:
+                map_name, confidence = self.map_identifier.identify(frame)
             else:
-                print("未检测到地图标识，导航可能失败")
-                if "fail_action" in steps[-1]:
-                    try:
-                        steps[-1]["fail_action"]()
-                        print("执行最后的失败操作")
-                    except Exception as e:
-                        print(f"执行最后的失败操作时出错: {e}")
-                return False
+                map_name, confidence = None, 0.0
+        except Exception as e:
+            print(f"最终验证截图错误: {e}")
+            map_name, confidence = None, 0.0
+            
+        # 检查是否成功进入妖气追踪（检测地图标识）
+        if map_name is not None:
+            print(f"界面已改变，检测到地图: {map_name} (置信度 {confidence:.2f})，导航成功")
+            return True
+        else:
+            print("未检测到地图标识，导航可能失败")
+            if "fail_action" in steps[-1]:
+                try:
+                    steps[-1]["fail_action"]()
+                    print("执行最后的失败操作")
+                except Exception as e:
+                    print(f"执行最后的失败操作时出错: {e}")
+            return False
     
     def run_automation(self, stop_event, total_roles, log_func):
         """运行妖气追踪自动化 - 优化版本"""
@@ -917,26 +828,59 @@ class YaoqiAutomator:
             self.log("未找到游戏窗口")
             return
         
-        region = {'left': 0, 'top': 0, 'width': 1067, 'height': 600}
         error_count = 0
         max_errors = 10  # 最大连续错误次数
         
+        # 启动感知流水线：截图和推理在后台持续进行（检测器按检测计划暂停/恢复）
+        self.pipeline.set_detection_enabled(self.detection_planner.declares('yolo'))
+        self.pipeline.start()
+        last_action_time = None
+        
         try:
             while not stop_event.is_set():
                 try:
-                    # 截取屏幕
-                    with mss.mss() as sct:
-                        screenshot = sct.grab(region)
-                        frame = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2BGR)
+                    # 取上一轮操作结束之后的画面和检测结果，避免用过期画面做决策
+                    perception = self.pipeline.get_result(after=last_action_time, timeout=2.0)
+                    if perception is None:
+                        raise RuntimeError("截图服务未返回画面")
+                    frame = perception.frame
+                    
+                    # 按当前状态生成本帧的检测计划
+                    plan = self.detection_planner.plan()
+                    self.pipeline.set_detection_enabled('yolo' in plan)
+                    scene = scene_hashes = None
+                    fanpai = False
+                    if 'fanpai' in plan:
+                        # 首先判断场景：哈希查表能确定时跳过翻牌模板匹配
+                        scene_hashes = self.scene_classifier.compute_hashes(frame)
+                        scene, _ = self.scene_classifier.classify(frame, scene_hashes)
+                        if scene is None:
+                            fanpai = self.detect_fanpai(frame)
+                        else:
+                            fanpai = scene == SCENE_FANPAI
                     
-                    # 首先检测翻牌状态
-                    if self.detect_fanpai(frame):
+                    if fanpai:
+                        if scene is None:
+                            self.scene_classifier.learn(frame, SCENE_FANPAI, scene_hashes)
                         self.reset_map_state()
                         time.sleep(3)  # 等待翻牌动画完成
                         continue
                     
-                    # 检测当前地图
-                    current_map = self.detect_current_map(frame)
+                    # 检测当前地图（锁定状态下沿用已确认的地图）
+                    if 'map' in plan:
+                        current_map = self.detect_current_map(frame)
+                        if self.map_locked and self.detection_planner.state != 'locked':
+                            self.detection_planner.transition('locked')
+                            # 本帧刚锁定：按锁定状态的计划继续（读取小地图、恢复检测器）
+                            plan = self.detection_planner.plan()
+                            self.pipeline.set_detection_enabled('yolo' in plan)
+                    else:
+                        current_map = self.current_confirmed_map
+                        self.map_freshly_confirmed = False
+                    if self.map_freshly_confirmed and scene is None and scene_hashes is not None:
+                        # 本帧地图识别实际匹配成功才确认在副本中，作为样本加入哈希表
+                        # （锁定沿用或门控复用的结果不能证明本帧画面是副本）
+                        self.scene_classifier.learn(frame, SCENE_DUNGEON, scene_hashes)
                     
                     if current_map:
                         # 地图锁定专注模式
@@ -952,10 +896,21 @@ class YaoqiAutomator:
                                 self.log(f"🔄 角色已切换，重新进行速度检测")
                                 self.trigger_speed_detection(game_window)
                             
-                            # 专注执行对应的run_ditu函数
+                            # 专注执行对应地图的路线
                             try:
-                                character_grid, door_states, boss_grid, monsters = self.detect_minimap_advanced(frame)
-                                open_doors = [k for k, v in door_states.items() if v == 'open']
+                                if 'minimap' in plan:
+                                    minimap_roi, _ = plan.crop('minimap', frame)
+                                    character_grid, door_states, boss_grid, monsters = \
+                                        self.detect_minimap_advanced(minimap_roi)
+                                    minimap_events = self.minimap_tracker.events
+                                else:
+                                    # 本帧不读取小地图，沿用跟踪器的状态
+                                    character_grid, door_states, boss_grid = self.minimap_tracker.state()
+                                    minimap_events = []
+                                open_doors = self.minimap_tracker.open_doors
+                                if any(isinstance(event, RoomEntered) for event in minimap_events):
+                                    # 换了房间，上一个房间的跟踪目标全部失效
+                                    self.pipeline.tracker.reset()
                                 
                                 # 🚪 门优先级：如果有开启的门，必须执行跑图逻辑，不能刷怪
                                 if len(open_doors) > 0:
@@ -1008,7 +963,8 @@ class YaoqiAutomator:
                         optimize_memory()
                         self.log(f"📊 执行定期内存清理 (第{self._loop_count}次循环)")
                     
-                    time.sleep(2.0)  # 增加间隔，进一步减少系统压力
+                    last_action_time = time.time()
+                    time.sleep(self.decision_interval)
                     
                 except Exception as e:
                     error_count += 1
@@ -1047,8 +1003,13 @@ class YaoqiAutomator:
         finally:
             # 彻底清理资源
             try:
-                # 停止内存监控
+                # 停止感知流水线和内存监控
+                self.pipeline.stop()
                 memory_manager.stop_monitoring()
+                self.template_registry.save_history()
+                self.scene_classifier.save_table()
+                print(f"🧭 检测计划统计: {self.detection_planner.get_stats()}")
+                print(f"🧮 画面变化门控统计: {self.change_gate.get_stats()}")
                 
                 # 清理战斗系统
                 if hasattr(self, 'attacker'):
@@ -1058,8 +1019,9 @@ class YaoqiAutomator:
                 if hasattr(self, 'speed_calculator'):
                     self.speed_calculator = None
                     
-                # 清理YOLO模型
+                # 释放YOLO模型引用
                 if hasattr(self, 'yolo_model'):
+                    model_registry.release(self.yolo_model)
                     self.yolo_model = None
                     
                 # 最终内存清理
@@ -1089,12 +1051,9 @@ class YaoqiAutomator:
             
             # 线程安全的模型访问
             with self._model_lock:
-                # 转换为RGB格式供YOLO使用
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # 检测怪物（使用完整的检测方法）
+                # 检测怪物（同一帧的检测结果会被后续攻击复用）
                 try:
-                    monsters = self.attacker.detect_monsters(frame_rgb)
+                    monsters = self.attacker.detect_monsters(None, self.frame_analyzer.analyze_bgr(frame))
                 except Exception as detect_error:
                     self.log(f"怪物检测错误: {detect_error}")
                     # 如果YOLO检测失败，使用简化战斗
@@ -1201,16 +1160,16 @@ class YaoqiAutomator:
                         if self.attacker is not None:
                             # 线程安全的资源访问
                             with self._model_lock:
-                                # 获取当前帧进行YOLO检测
-                                with mss.mss() as sct:
-                                    region = {'left': 0, 'top': 0, 'width': 1067, 'height': 600}
-                                    screenshot = sct.grab(region)
-                                    frame_bgr = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2BGR)
-                                    frame_rgb = cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2RGB)
+                                # 从感知流水线获取最新的画面和检测结果
+                                perception = self.pipeline.get_result()
+                                if perception is None:
+                                    raise RuntimeError("截图服务未返回画面")
+                                frame_bgr = perception.frame
+                                analysis = perception.analysis
                                 
-                                # 使用YOLO检测角色和怪物的真实位置
-                                chenghao_x, chenghao_y = self.attacker.get_positions(frame_rgb)
-                                yolo_monsters = self.attacker.detect_monsters(frame_rgb)
+                                # 角色和怪物的真实位置来自同一次检测
+                                chenghao_x, chenghao_y = self.attacker.get_positions(None, analysis)
+                                yolo_monsters = self.attacker.detect_monsters(None, analysis)
                             
                             if yolo_monsters:
                                 # 选择目标怪物（优先Boss）
@@ -1562,441 +1521,34 @@ class YaoqiAutomator:
         # 角色切换时也重置地图状态
         self.reset_map_state()
     
-    # ===== 详细地图逻辑函数（完整实现） =====
+    # ===== 跑图逻辑（路线见 routes/yaoqi_routes.json） =====
     
-    def run_ditu1(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu1 的跑图逻辑，移动 chenghao - 门优先级高于怪物"""
-        print(f"执行 ditu1 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu1检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print("🗡️ ditu1无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu1: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-7" and door_states.get("2-7") == "open":
-            print("ditu1: 触发移动到 (644, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 644, 516, skill_availability, door_states)
-        elif character_grid == "2-1" and (door_states.get("2-1") == "open" or door_states.get("2-2") == "open"):
-            print("ditu1: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu1: 触发移动到 (137, 451)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 137, 451, skill_availability, door_states)
-        elif character_grid == "2-6" and door_states.get("2-5") == "open":
-            print("ditu1: 触发移动到 (68, 400)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 68, 400, skill_availability, door_states)
-        elif character_grid == "2-5" and door_states.get("3-5") == "open":
-            print("ditu1: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "3-5" and door_states.get("3-6") == "open":
-            print("ditu1: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "3-6" and door_states.get("3-5") == "open":
-            print("ditu1: 触发移动到 (1050, 409)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1050, 409, skill_availability, door_states)
-
-    def run_ditu2(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu2 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu2 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu2检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu2无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu2: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-3" and (door_states.get("1-2") == "open" or door_states.get("1-4") == "open"):
-            print("ditu2: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-4" and (door_states.get("1-3") == "open" or door_states.get("1-5") == "open"):
-            print("ditu2: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-5" and (door_states.get("1-4") == "open" or door_states.get("2-5") == "open"):
-            print("ditu2: 触发移动到 (674, 500)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 674, 500, skill_availability, door_states)
-        elif character_grid == "2-5" and (door_states.get("1-5") == "open" or door_states.get("2-6") == "open"):
-            print("ditu2: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "2-6" and (door_states.get("2-5") == "open" or door_states.get("2-7") == "open"):
-            print("ditu2: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu2: 触发移动到 (713, 260)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 713, 260, skill_availability, door_states)
-
-    def run_ditu3(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu3 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu3 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu3检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu3无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu3: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-4" and (door_states.get("1-4") == "open" or door_states.get("1-5") == "open"):
-            print("ditu3: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-7" and door_states.get("2-7") == "open":
-            print("ditu3: 触发移动到 (644, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 644, 516, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu3: 触发移动到 (137, 451)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 137, 451, skill_availability, door_states)
-        elif character_grid == "2-6" and door_states.get("2-5") == "open":
-            print("ditu3: 触发移动到 (68, 400)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 68, 400, skill_availability, door_states)
-        elif character_grid == "2-5" and door_states.get("3-5") == "open":
-            print("ditu3: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "3-5" and door_states.get("3-6") == "open":
-            print("ditu3: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "3-6" and door_states.get("3-5") == "open":
-            print("ditu3: 触发移动到 (1050, 409)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1050, 409, skill_availability, door_states)
-
-    def run_ditu4(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu4 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu4 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu4检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu4无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "2-1" and (door_states.get("2-1") == "open" or door_states.get("2-2") == "open"):
-            print("ditu4: 触发移动到 (右侧门)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1059, 313, skill_availability, door_states)
-        elif character_grid == "2-2" and (door_states.get("2-1") == "open" or door_states.get("2-3") == "open"):
-            print("ditu4: 触发移动到 (右侧门)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1059, 307, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu4: 触发移动到 (137, 451)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 137, 451, skill_availability, door_states)
-        elif character_grid == "2-6" and door_states.get("2-5") == "open":
-            print("ditu4: 触发移动到 (68, 400)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 68, 400, skill_availability, door_states)
-        elif character_grid == "2-5" and door_states.get("3-5") == "open":
-            print("ditu4: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "3-5" and door_states.get("3-6") == "open":
-            print("ditu4: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "3-6" and door_states.get("3-5") == "open":
-            print("ditu4: 触发移动到 (1050, 409)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1050, 409, skill_availability, door_states)
-
-    def run_ditu5(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu5 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu5 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu5检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu5无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu5: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-3" and (door_states.get("1-2") == "open" or door_states.get("2-3") == "open"):
-            print("ditu5: 触发移动到 (644, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 644, 516, skill_availability, door_states)
-        elif character_grid == "2-3" and door_states.get("1-3") == "open":
-            print("ditu5: 触发移动到 (137, 451)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 137, 451, skill_availability, door_states)
-        elif character_grid == "2-6" and door_states.get("2-5") == "open":
-            print("ditu5: 触发移动到 (68, 400)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 68, 400, skill_availability, door_states)
-        elif character_grid == "2-5" and door_states.get("3-5") == "open":
-            print("ditu5: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "3-5" and door_states.get("3-6") == "open":
-            print("ditu5: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "3-6" and door_states.get("3-5") == "open":
-            print("ditu5: 触发移动到 (1050, 409)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1050, 409, skill_availability, door_states)
-
-    def run_ditu6(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu6 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu6 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu6检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu6无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu6: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-3" and (door_states.get("1-2") == "open" or door_states.get("1-4") == "open"):
-            print("ditu6: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-4" and (door_states.get("1-3") == "open" or door_states.get("1-5") == "open"):
-            print("ditu6: 触发移动到 (1011, 197)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1011, 197, skill_availability, door_states)
-        elif character_grid == "1-5" and (door_states.get("1-4") == "open" or door_states.get("1-6") == "open"):
-            print("ditu6: 触发移动到 (1028, 326)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1028, 326, skill_availability, door_states)
-        elif character_grid == "1-6" and (door_states.get("1-5") == "open" or door_states.get("2-6") == "open"):
-            print("ditu6: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "2-6" and (door_states.get("1-6") == "open" or door_states.get("2-7") == "open"):
-            print("ditu6: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu6: 触发移动到 (500, 264)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 500, 264, skill_availability, door_states)
-
-    def run_ditu7(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu7 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu7 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu7检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu7无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu7: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-7" and door_states.get("2-7") == "open":
-            print("ditu7: 触发移动到 (644, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 644, 516, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu7: 触发移动到 (137, 451)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 137, 451, skill_availability, door_states)
-        elif character_grid == "2-6" and door_states.get("2-5") == "open":
-            print("ditu7: 触发移动到 (68, 400)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 68, 400, skill_availability, door_states)
-        elif character_grid == "2-5" and door_states.get("3-5") == "open":
-            print("ditu7: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "3-5" and door_states.get("3-6") == "open":
-            print("ditu7: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "3-6" and door_states.get("3-5") == "open":
-            print("ditu7: 触发移动到 (1050, 409)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1050, 409, skill_availability, door_states)
-
-    def run_ditu8(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu8 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu8 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu8检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu8无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu8: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-6" and (door_states.get("1-6") == "open" or door_states.get("1-7") == "open"):
-            print("ditu8: 741移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "1-7" and door_states.get("2-7") == "open":
-            print("ditu8: 触发移动到 (644, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 644, 516, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu8: 触发移动到 (137, 451)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 137, 451, skill_availability, door_states)
-        elif character_grid == "2-6" and door_states.get("2-5") == "open":
-            print("ditu8: 触发移动到 (68, 400)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 68, 400, skill_availability, door_states)
-        elif character_grid == "2-5" and door_states.get("3-5") == "open":
-            print("ditu8: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "3-5" and door_states.get("3-6") == "open":
-            print("ditu8: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "3-6" and door_states.get("3-5") == "open":
-            print("ditu8: 触发移动到 (1050, 409)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1050, 409, skill_availability, door_states)
-
-    def run_ditu9(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu9 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu9 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu9检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu9无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu9: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-6" and (door_states.get("1-6") == "open" or door_states.get("1-7") == "open"):
-            print("ditu9: 触发移动到 (1028, 326)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1028, 326, skill_availability, door_states)
-        elif character_grid == "1-7" and door_states.get("2-7") == "open":
-            print("ditu9: 触发移动到 (644, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 644, 516, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu9: 触发移动到 (137, 451)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 137, 451, skill_availability, door_states)
-        elif character_grid == "2-6" and door_states.get("2-5") == "open":
-            print("ditu9: 触发移动到 (68, 400)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 68, 400, skill_availability, door_states)
-        elif character_grid == "2-5" and door_states.get("3-5") == "open":
-            print("ditu9: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "3-5" and door_states.get("3-6") == "open":
-            print("ditu9: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "3-6" and door_states.get("3-5") == "open":
-            print("ditu9: 触发移动到 (1050, 409)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1050, 409, skill_availability, door_states)
-
-    def run_ditu10(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu10 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu10 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
+    def run_route(self, map_name, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
+        """按路线表执行跑图逻辑，移动 chenghao - 门优先级高于怪物"""
+        print(f"执行 {map_name} 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
         
         # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu10检测到开启的门: {open_doors}，执行跑图移动")
+        open_mask = door_mask(door_states)
+        if open_mask:
+            print(f"🚪 {map_name}检测到开启的门: {mask_grids(open_mask)}，执行跑图移动")
         else:
             # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu10无开启的门，处理怪物")
+            print(f"🗡️ {map_name}无开启的门，处理怪物")
             if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
                 return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu10: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-3" and (door_states.get("1-2") == "open" or door_states.get("1-4") == "open"):
-            print("ditu10: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-4" and (door_states.get("1-3") == "open" or door_states.get("1-5") == "open"):
-            print("ditu10: 触发移动到 (1011, 197)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1011, 197, skill_availability, door_states)
-        elif character_grid == "1-5" and (door_states.get("1-4") == "open" or door_states.get("1-6") == "open"):
-            print("ditu10: 触发移动到 (1028, 326)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1028, 326, skill_availability, door_states)
-        elif character_grid == "1-6" and (door_states.get("1-5") == "open" or door_states.get("2-6") == "open"):
-            print("ditu10: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "2-6" and (door_states.get("1-6") == "open" or door_states.get("2-7") == "open"):
-            print("ditu10: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu10: 触发移动到 (500, 264)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 500, 264, skill_availability, door_states)
-
-    def run_ditu11(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu11 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu11 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu11检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu11无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
-                return
-        if character_grid == "1-2" and (door_states.get("1-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu11: 触发移动到 (1048, 439)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1048, 439, skill_availability, door_states)
-        elif character_grid == "1-7" and door_states.get("2-7") == "open":
-            print("ditu11: 触发移动到 (644, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 644, 516, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu11: 触发移动到 (137, 451)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 137, 451, skill_availability, door_states)
-        elif character_grid == "2-6" and door_states.get("2-5") == "open":
-            print("ditu11: 触发移动到 (68, 400)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 68, 400, skill_availability, door_states)
-        elif character_grid == "2-5" and door_states.get("3-5") == "open":
-            print("ditu11: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "3-5" and door_states.get("3-6") == "open":
-            print("ditu11: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "3-6" and door_states.get("3-5") == "open":
-            print("ditu11: 触发移动到 (1050, 409)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1050, 409, skill_availability, door_states)
-
-    def run_ditu12(self, character_grid, door_states, game_window, chenghao_box, monsters, skill_availability):
-        """执行 ditu12 的跑图逻辑，移动 chenghao"""
-        print(f"执行 ditu12 逻辑，人物位置: {character_grid}, chenghao_box: {chenghao_box}")
-        
-        # 🚪 优先检查门的状态，有开启的门时不进行战斗
-        open_doors = [k for k, v in door_states.items() if v == 'open']
-        if open_doors:
-            print(f"🚪 ditu12检测到开启的门: {open_doors}，执行跑图移动")
-        else:
-            # 只有在没有开启的门时才考虑战斗
-            print(f"🗡️ ditu12无开启的门，处理怪物")
-            if self.move_chenghao_to_target(game_window, chenghao_box, monsters, None, None, skill_availability, door_states):
+        route = self.route_table.lookup(map_name, character_grid, open_mask)
+        if route is None or self.prefer_minimap_planner:
+            # 路线表没有命中时，按小地图房间图规划到Boss房间的下一跳
+            step = self.minimap_planner.next_target(character_grid, open_mask, self.minimap_tracker.boss_grid)
+            if step is not None:
+                next_grid, direction, (target_x, target_y) = step
+                print(f"🧭 {map_name}: 规划路径下一跳 {next_grid}（{direction}），移动到 ({target_x}, {target_y})")
+                self.move_chenghao_to_target(game_window, chenghao_box, monsters, target_x, target_y, skill_availability, door_states)
                 return
-        if character_grid == "2-2" and (door_states.get("2-2") == "open" or door_states.get("2-3") == "open"):
-            print("ditu12: 触发移动到 (1067, 340)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1067, 340, skill_availability, door_states)
-        elif character_grid == "2-3" and (door_states.get("2-2") == "open" or door_states.get("1-3") == "open"):
-            print("ditu12: 触发移动到 (939, 255)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 939, 255, skill_availability, door_states)
-        elif character_grid == "1-3" and (door_states.get("1-4") == "open" or door_states.get("2-3") == "open"):
-            print("ditu12: 触发移动到 (1067, 340)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1067, 340, skill_availability, door_states)
-        elif character_grid == "1-5" and (door_states.get("1-4") == "open" or door_states.get("1-6") == "open"):
-            print("ditu12: 触发移动到 (1028, 326)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1028, 326, skill_availability, door_states)
-        elif character_grid == "1-6" and (door_states.get("1-5") == "open" or door_states.get("2-6") == "open"):
-            print("ditu12: 触发移动到 (600, 516)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 600, 516, skill_availability, door_states)
-        elif character_grid == "2-6" and (door_states.get("1-6") == "open" or door_states.get("2-7") == "open"):
-            print("ditu12: 触发移动到 (1015, 466)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 1015, 466, skill_availability, door_states)
-        elif character_grid == "2-7" and door_states.get("2-6") == "open":
-            print("ditu12: 触发移动到 (500, 264)")
-            self.move_chenghao_to_target(game_window, chenghao_box, monsters, 500, 264, skill_availability, door_states)
+        if route is not None:
+            print(f"{map_name}: 触发移动到 {route.label}")
+            target_x, target_y = route.target
+            self.move_chenghao_to_target(game_window, chenghao_box, monsters, target_x, target_y, skill_availability, door_states)
 
 
 if __name__ == "__main__":